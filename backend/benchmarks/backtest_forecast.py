@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Backtest the fill-rate forecast by replaying telemetry in time order.
+
+Each reading produces a predicted_full_at exactly as the API would. Once
+the bin actually reaches FORECAST_FULL_PERCENT (before its next emptying),
+every earlier prediction in that fill cycle is scored by how far off it was,
+grouped by how long before the bin filled it was made. A naive "slope of
+the last two readings" forecast is scored alongside for reference.
+
+    python benchmarks/backtest_forecast.py                    # replay the telemetry collection (MONGO_URI/MONGO_DB)
+    python benchmarks/backtest_forecast.py --synthetic 50     # simulated bins, no Mongo needed
+    python benchmarks/backtest_forecast.py --synthetic 50 --tau 2 6 12
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+from collections import defaultdict
+from typing import Iterable, Iterator
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "sensor"))
+
+from forecast import EMPTIED_DROP_PERCENT, FORECAST_FULL_PERCENT, forecast_fields, predict_full_at  # noqa: E402
+
+HORIZONS = ((0, 2), (2, 6), (6, 24), (24, float("inf")))
+
+def mongo_readings() -> Iterator[tuple[str, list[tuple[float, float]]]]:
+    from db import sync_db
+    cursor = sync_db["telemetry"].find({}, {"_id": 0, "bin_id": 1, "ts": 1, "fill_percent": 1}).sort([("bin_id", 1), ("at", 1)])
+    bin_id, series = None, []
+    for doc in cursor:
+        if doc["bin_id"] != bin_id:
+            if series:
+                yield bin_id, series
+            bin_id, series = doc["bin_id"], []
+        series.append((doc["ts"], doc["fill_percent"]))
+    if series:
+        yield bin_id, series
+
+def synthetic_readings(n_bins: int, days: float, interval_s: float, noise: float) -> Iterator[tuple[str, list[tuple[float, float]]]]:
+    from ultrasonic import SimulatedBin  # the sensor's off-Pi fill model
+    for b in range(n_bins):
+        model = SimulatedBin(seed=b)
+        rng = random.Random(1000 + b)
+        series = []
+        t = 0.0
+        while t < days * 86400:
+            fill = min(100.0, max(0.0, model.advance(t) + rng.gauss(0.0, noise)))
+            series.append((t, fill))
+            t += interval_s
+        yield f"sim-{b:03d}", series
+
+def predictions(series: list[tuple[float, float]], tau: float) -> Iterator[tuple[float, float, float, float]]:
+    """(ts, fill, forecast predicted_full_at, naive predicted_full_at) per reading."""
+    doc = None
+    prev = None
+    for ts, fill in series:
+        fields = forecast_fields(doc, fill, ts, tau)
+        naive = None
+        if prev is not None and ts > prev[0] and prev[1] - fill <= EMPTIED_DROP_PERCENT:
+            naive = predict_full_at(fill, ts, (fill - prev[1]) / ((ts - prev[0]) / 3600.0))
+        yield ts, fill, fields["predicted_full_at"], naive
+        doc = {"fill_percent": fill, "last_seen_at": ts, **fields}
+        prev = (ts, fill)
+
+def score(series: list[tuple[float, float]], tau: float, errors: dict):
+    """Add |predicted - actual| hours to errors[(method, horizon)] for each completed fill cycle."""
+    pending = []
+    last_fill = None
+    for ts, fill, forecast, naive in predictions(series, tau):
+        if last_fill is not None and last_fill - fill > EMPTIED_DROP_PERCENT:
+            pending = []  # emptied before it got full; nothing to score
+        if fill >= FORECAST_FULL_PERCENT and pending:
+            for made_at, preds in pending:
+                horizon = (ts - made_at) / 3600.0
+                bucket = next(h for h in HORIZONS if h[0] <= horizon < h[1])
+                for method, predicted in preds.items():
+                    if predicted is not None:
+                        errors[(method, bucket)].append(abs(predicted - ts) / 3600.0)
+                    errors[(method, bucket, "total")].append(predicted is not None)
+            pending = []
+        elif fill < FORECAST_FULL_PERCENT:
+            pending.append((ts, {"ewma": forecast, "naive": naive}))
+        last_fill = fill
+
+def report(sources: Iterable[tuple[str, list]], taus: list[float]):
+    data = list(sources)
+    print(f"{len(data)} bins, {sum(len(s) for _, s in data):,} readings; full at {FORECAST_FULL_PERCENT:g}%\n")
+    print(f"{'method':<14} {'horizon':>9} {'n':>7} {'coverage':>9} {'MAE h':>7} {'median h':>9}")
+    for i, tau in enumerate(taus):
+        errors = defaultdict(list)
+        for _, series in data:
+            score(series, tau, errors)
+        methods = ["ewma"] + (["naive"] if i == 0 else [])
+        for method in methods:
+            label = f"ewma tau={tau:g}h" if method == "ewma" else "naive slope"
+            for bucket in HORIZONS:
+                errs = errors[(method, bucket)]
+                total = errors[(method, bucket, "total")]
+                if not total:
+                    continue
+                hi = "+" if bucket[1] == float("inf") else f"-{bucket[1]}"
+                mae = statistics.fmean(errs) if errs else float("nan")
+                med = statistics.median(errs) if errs else float("nan")
+                print(f"{label:<14} {str(bucket[0]) + hi + 'h':>9} {len(total):>7} {sum(total) / len(total):>8.0%} "
+                      f"{mae:>7.2f} {med:>9.2f}")
+        print()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, metavar="BINS", help="Simulate this many bins instead of reading Mongo")
+    parser.add_argument("--days", type=float, default=14.0, help="Simulated days per bin")
+    parser.add_argument("--interval", type=float, default=600.0, help="Simulated seconds between readings")
+    parser.add_argument("--noise", type=float, default=1.0, help="Simulated fill noise (percent, 1 sigma)")
+    parser.add_argument("--tau", type=float, nargs="+", default=[float(os.getenv("FORECAST_TAU_HOURS", "6"))])
+    args = parser.parse_args()
+
+    if args.synthetic:
+        sources = synthetic_readings(args.synthetic, args.days, args.interval, args.noise)
+    else:
+        sources = mongo_readings()
+    report(sources, args.tau)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark: blocking pymongo in FastAPI's threadpool vs the async client.
+
+Each simulated request does what receive_telemetry does (one update, one insert)
+or what get_bins does (a full scan). The sync path goes through
+run_in_threadpool exactly like a plain `def` FastAPI handler.
+Uses MONGO_URI and a scratch database (MONGO_DB, default wastewise_bench).
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_async_mongo.py --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("MONGO_DB", "wastewise_bench")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+
+import db  # noqa: E402
+
+N_BINS = 500
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def sync_telemetry(i: int):
+    bin_id = f"bench-{i % N_BINS:04d}"
+    db.sync_db["bins"].update_one({"bin_id": bin_id}, {"$set": {"fill_percent": 50.0, "last_seen_at": time.time()}}, upsert=True)
+    db.sync_db["telemetry"].insert_one({"bin_id": bin_id, "fill_percent": 50.0, "distance_cm": 35.0, "ts": time.time()})
+
+def sync_bins(_: int):
+    return list(db.sync_db["bins"].find())
+
+async def async_telemetry(i: int):
+    bin_id = f"bench-{i % N_BINS:04d}"
+    await db.bins_col.update_one({"bin_id": bin_id}, {"$set": {"fill_percent": 50.0, "last_seen_at": time.time()}}, upsert=True)
+    await db.telemetry_col.insert_one({"bin_id": bin_id, "fill_percent": 50.0, "distance_cm": 35.0, "ts": time.time()})
+
+async def async_bins(_: int):
+    return await db.bins_col.find().to_list(None)
+
+async def measure(label: str, call, n_requests: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with sem:
+            t0 = time.perf_counter()
+            await call(i)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<18} {n_requests / elapsed:9.0f} req/s  "
+        f"p50={statistics.median(latencies):7.2f}ms  p99={percentile(latencies, 99):7.2f}ms"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"db={db.MONGO_DB} maxPoolSize={db.MONGO_MAX_POOL_SIZE} concurrency={args.concurrency}")
+    for i in range(N_BINS):
+        sync_telemetry(i)
+
+    await measure("sync telemetry", lambda i: run_in_threadpool(sync_telemetry, i), args.requests, args.concurrency)
+    await measure("async telemetry", async_telemetry, args.requests, args.concurrency)
+    await measure("sync get_bins", lambda i: run_in_threadpool(sync_bins, i), args.requests, args.concurrency)
+    await measure("async get_bins", async_bins, args.requests, args.concurrency)
+
+    db.sync_client.drop_database(db.MONGO_DB)
+    await db.client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
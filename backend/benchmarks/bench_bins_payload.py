@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+/bins serialization benchmark (in-process, no Mongo connection needed).
+
+Encodes N bin documents the way each response path does and reports time
+per response and payload size:
+  models        -- BinOut per document, revalidated by the response model, Pydantic JSON
+                   (the previous /bins path)
+  orjson        -- plain rows, orjson
+  orjson+gzip / orjson+br / msgpack(+gzip) -- the negotiated variants
+  cached        -- the full list served from the per-version body cache
+
+    python benchmarks/bench_bins_payload.py --bins 1000 10000 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Union
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+import payloads  # noqa: E402
+from main import BinOut, BinsDelta, bin_row, doc_to_bin_out  # noqa: E402
+
+def make_doc(i: int) -> dict:
+    now = time.time()
+    return {
+        "bin_id": f"bin-{i:05d}", "name": f"Bin {i}",
+        "location": {"lat": 29.6 + random.random() * 0.1, "lng": -82.4 + random.random() * 0.1},
+        "geo": {"type": "Point", "coordinates": [0.0, 0.0]},
+        "distance_cm": round(random.uniform(10, 60), 1), "fill_percent": random.uniform(0, 100),
+        "last_seen_at": now - random.random() * 600, "last_emptied_at": now - random.random() * 86400,
+        "confidence": round(random.random(), 3), "fill_rate": random.random() * 3, "fill_rate_weight": 1.0,
+        "predicted_full_at": now + random.random() * 86400,
+    }
+
+def timed(fn, repeat: int) -> tuple[float, bytes]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bins", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    random.seed(1)
+    adapter = TypeAdapter(Union[list[BinOut], BinsDelta])
+
+    variants = [("orjson", payloads.JSON_TYPE, None), ("orjson+gzip", payloads.JSON_TYPE, "gzip")]
+    if payloads.brotli is not None:
+        variants.append(("orjson+br", payloads.JSON_TYPE, "br"))
+    if payloads.msgpack is not None:
+        variants += [("msgpack", payloads.MSGPACK_TYPE, None), ("msgpack+gzip", payloads.MSGPACK_TYPE, "gzip")]
+    missing = [m for m in ("brotli", "msgpack") if getattr(payloads, m) is None]
+    if missing:
+        print(f"(not installed, skipped: {', '.join(missing)})")
+
+    print(f"{'bins':>6} {'path':<14} {'ms':>8} {'KB':>9}")
+    for n in args.bins:
+        docs = [make_doc(i) for i in range(n)]
+
+        def models():
+            return adapter.dump_json(adapter.validate_python([doc_to_bin_out(d) for d in docs]))
+        ms, body = timed(models, args.repeat)
+        print(f"{n:>6} {'models':<14} {ms:>8.1f} {len(body) / 1024:>9.1f}")
+
+        for label, media_type, encoding in variants:
+            ms, (body, _) = timed(lambda: payloads.encode([bin_row(d) for d in docs], media_type, encoding), args.repeat)
+            print(f"{n:>6} {label:<14} {ms:>8.1f} {len(body) / 1024:>9.1f}")
+
+        cache = {}
+        cache[("etag", payloads.JSON_TYPE, "gzip")] = payloads.encode([bin_row(d) for d in docs], payloads.JSON_TYPE, "gzip")
+        ms, (body, _) = timed(lambda: cache[("etag", payloads.JSON_TYPE, "gzip")], args.repeat)
+        print(f"{n:>6} {'cached':<14} {ms:>8.3f} {len(body) / 1024:>9.1f}")
+
+if __name__ == "__main__":
+    main()
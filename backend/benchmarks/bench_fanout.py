@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Fan-out benchmark for the /bins/stream broadcast hub (in-process, no Mongo).
+
+Simulates N subscribers and publishes change events, reporting publish cost and
+publish-to-delivery latency. For comparison it also times what N pollers cost:
+each one serializing the full bin list.
+
+    python benchmarks/bench_fanout.py --subscribers 1000 --events 200 --bins 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from broadcast import BroadcastHub, sse_event  # noqa: E402
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def make_bin(i: int) -> dict:
+    return {
+        "bin_id": f"bin-{i:05d}", "name": f"Bin {i}", "lat": 29.64 + i * 1e-5, "lng": -82.34,
+        "distance_cm": 35.0, "fill_percent": 50.0, "ts": time.time(), "last_emptied_at": None,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--bins", type=int, default=5000)
+    parser.add_argument("--changes-per-event", type=int, default=5)
+    args = parser.parse_args()
+
+    hub = BroadcastHub(queue_size=args.events + 1)
+    sent_at: dict[int, float] = {}
+    latencies: list[float] = []
+
+    async def subscriber():
+        q = hub.subscribe()
+        for _ in range(args.events):
+            payload = await q.get()
+            seq = int(payload.split(b'"seq":', 1)[1].split(b",", 1)[0])
+            latencies.append((time.perf_counter() - sent_at[seq]) * 1000)
+
+    tasks = [asyncio.create_task(subscriber()) for _ in range(args.subscribers)]
+    await asyncio.sleep(0)
+
+    changed = [make_bin(i) for i in range(args.changes_per_event)]
+    publish_cost = []
+    start = time.perf_counter()
+    for seq in range(args.events):
+        t0 = time.perf_counter()
+        sent_at[seq] = t0
+        hub.publish(sse_event("bins", {"seq": seq, "version": seq, "bins": changed, "removed": []}))
+        publish_cost.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    deliveries = args.subscribers * args.events
+    print(f"{args.subscribers} subscribers, {args.events} events of {args.changes_per_event} bins")
+    print(f"  publish cost    p50={statistics.median(publish_cost):.3f}ms  p99={percentile(publish_cost, 99):.3f}ms")
+    print(f"  delivery        p50={statistics.median(latencies):.2f}ms  p99={percentile(latencies, 99):.2f}ms")
+    print(f"  throughput      {deliveries / elapsed:,.0f} deliveries/s")
+
+    # Polling equivalent: every viewer re-serializes the whole list each interval
+    all_bins = [make_bin(i) for i in range(args.bins)]
+    t0 = time.perf_counter()
+    for _ in range(min(args.subscribers, 100)):
+        json.dumps(all_bins)
+    per_poll = (time.perf_counter() - t0) / min(args.subscribers, 100)
+    print(f"\nPolling: {args.subscribers} viewers x full list of {args.bins} bins "
+          f"= {per_poll * args.subscribers * 1000:,.0f}ms CPU per poll interval")
+
+if __name__ == "__main__":
+    asyncio.run(main())
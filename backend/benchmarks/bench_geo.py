@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: scalar math-module geometry vs the NumPy paths in geo.py/routing.py.
+
+    python benchmarks/bench_geo.py --bins 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from geo import haversine_km, haversine_km_many, pairwise_haversine_km  # noqa: E402
+from routing import DistanceMatrix, bin_priorities, bin_priority, greedy_route  # noqa: E402
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def scalar_greedy(coords, prizes, candidates, max_stops, penalty):
+    """The original get_route loop, kept here as the reference."""
+    route, visited, current = [0], {0}, 0
+    for _ in range(min(max_stops, len(candidates))):
+        best, best_score = None, -float("inf")
+        for c in candidates:
+            if c in visited:
+                continue
+            score = prizes[c] - penalty * haversine_km(*coords[current], *coords[c])
+            if score > best_score:
+                best, best_score = c, score
+        if best is None:
+            break
+        visited.add(best)
+        route.append(best)
+        current = best
+    route.append(1)
+    return route
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bins", type=int, default=10000)
+    parser.add_argument("--pairwise-bins", type=int, default=2000, help="n for the n x n matrix (8*n^2 bytes)")
+    parser.add_argument("--max-stops", type=int, default=10)
+    args = parser.parse_args()
+    random.seed(1)
+
+    n = args.bins
+    coords = [(29.6462 + random.uniform(-0.05, 0.05), -82.3479 + random.uniform(-0.05, 0.05)) for _ in range(n)]
+    lats = np.array([c[0] for c in coords])
+    lngs = np.array([c[1] for c in coords])
+    now = time.time()
+    fills = [random.uniform(0, 100) for _ in range(n)]
+    emptied = [now - random.uniform(0, 72) * 3600 for _ in range(n)]
+
+    rows = []
+    rows.append(("one-to-all distance", n,
+                 timed(lambda: [haversine_km(coords[0][0], coords[0][1], la, ln) for la, ln in coords]),
+                 timed(lambda: haversine_km_many(lats[0], lngs[0], lats, lngs))))
+
+    m = args.pairwise_bins
+    rows.append(("pairwise matrix", m,
+                 timed(lambda: [[haversine_km(*coords[i], *coords[j]) for j in range(m)] for i in range(m)], repeat=1),
+                 timed(lambda: pairwise_haversine_km(lats[:m], lngs[:m]), repeat=1)))
+
+    fills_np, emptied_np = np.array(fills), np.array(emptied)
+    rows.append(("priority scoring", n,
+                 timed(lambda: [bin_priority(f, e, now) for f, e in zip(fills, emptied)]),
+                 timed(lambda: bin_priorities(fills_np, emptied_np, now))))
+
+    prizes = [bin_priority(f, e, now) for f, e in zip(fills, emptied)]
+    candidates = list(range(2, n))
+    rows.append((f"greedy route ({args.max_stops} stops)", n,
+                 timed(lambda: scalar_greedy(coords, prizes, candidates, args.max_stops, 0.5), repeat=1),
+                 timed(lambda: greedy_route(DistanceMatrix(coords), prizes, 0, 1, candidates, args.max_stops, 0.5))))
+
+    print(f"{'operation':<26} {'n':>6} {'scalar':>11} {'numpy':>10} {'speedup':>8}")
+    for name, size, scalar_ms, vector_ms in rows:
+        print(f"{name:<26} {size:>6} {scalar_ms:>9.1f}ms {vector_ms:>8.2f}ms {scalar_ms / vector_ms:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Heatmap benchmark: raw telemetry aggregation vs rollup buckets.
+
+Loads --rows synthetic readings (default 10M) into a scratch database, builds
+rollups with the same backfill pipeline as `python rollups.py backfill`, then
+times both heatmap queries for several windows.
+Uses MONGO_URI and MONGO_DB (default wastewise_bench); the database is dropped at the end.
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_heatmap.py --rows 10000000 --bins 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("MONGO_DB", "wastewise_bench")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import db  # noqa: E402
+from rollups import RESOLUTIONS, ROLLUP_COLLECTION, backfill_pipeline, window_average_pipeline  # noqa: E402
+
+CHUNK = 50_000
+
+def load_rows(telemetry, n_rows: int, n_bins: int, span_s: float, now: float):
+    interval = span_s * n_bins / n_rows
+    written = 0
+    while written < n_rows:
+        size = min(CHUNK, n_rows - written)
+        docs = []
+        for i in range(written, written + size):
+            ts = now - span_s + (i // n_bins) * interval + random.uniform(0, interval)
+            fill = random.uniform(0, 100)
+            docs.append({"bin_id": f"bench-{i % n_bins:05d}", "distance_cm": 60 - fill / 2, "fill_percent": fill, "ts": ts})
+        telemetry.insert_many(docs, ordered=False)
+        written += size
+        print(f"\r  loaded {written:,}/{n_rows:,}", end="", flush=True)
+    print()
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--bins", type=int, default=2000)
+    parser.add_argument("--days", type=float, default=30.0, help="History span the rows are spread over")
+    parser.add_argument("--windows", type=int, nargs="+", default=[120, 1440, 10080], help="Windows in minutes")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+    random.seed(1)
+
+    telemetry = db.sync_db["telemetry"]
+    rollups = db.sync_db[ROLLUP_COLLECTION]
+    now = time.time()
+
+    print(f"Loading {args.rows:,} readings for {args.bins} bins over {args.days} days into {db.MONGO_DB}...")
+    telemetry.create_index([("bin_id", 1), ("ts", 1)])
+    load_rows(telemetry, args.rows, args.bins, args.days * 86400, now)
+
+    rollups.create_index([("bin_id", 1), ("res", 1), ("bucket", 1)], unique=True)
+    rollups.create_index([("res", 1), ("bucket", 1)])
+    t0 = time.perf_counter()
+    for res in RESOLUTIONS:
+        telemetry.aggregate(backfill_pipeline(res), allowDiskUse=True)
+    print(f"Built {rollups.estimated_document_count():,} rollup buckets in {time.perf_counter() - t0:.1f}s\n")
+
+    print(f"{'window':>10} {'raw':>10} {'rollups':>10} {'speedup':>8}")
+    for minutes in args.windows:
+        cutoff = now - minutes * 60
+        raw_pipeline = [
+            {"$match": {"ts": {"$gte": cutoff}}},
+            {"$group": {"_id": "$bin_id", "avg_fill": {"$avg": "$fill_percent"}}},
+        ]
+        raw_ms = timed(lambda: list(telemetry.aggregate(raw_pipeline, allowDiskUse=True)))
+        rollup_ms = timed(lambda: list(rollups.aggregate(window_average_pipeline(cutoff, now))))
+        print(f"{minutes:>8}m {raw_ms:>8.0f}ms {rollup_ms:>8.1f}ms {raw_ms / rollup_ms:>7.0f}x")
+
+    if not args.keep:
+        db.sync_client.drop_database(db.MONGO_DB)
+
+if __name__ == "__main__":
+    main()
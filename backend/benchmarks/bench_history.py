@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Bin history benchmark: pulling raw rows vs the downsampled history stream.
+
+Loads a year of 30-second readings for one bin (~1.05M rows) into time-series
+collections in a scratch database, builds the hourly/daily tiers, then times
+the raw fetch a chart would otherwise do against /bins/{bin_id}/history's
+query for several ranges. Uses MONGO_URI and MONGO_DB (default
+wastewise_bench); the database is dropped at the end. Needs MongoDB 5.0+.
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_history.py --days 365 --interval 30
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+
+os.environ.setdefault("MONGO_DB", "wastewise_bench")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import retention  # noqa: E402
+from db import MONGO_DB, client, db  # noqa: E402
+from history import stream_history  # noqa: E402
+
+BIN_ID = "bench-bin"
+CHUNK = 50_000
+
+async def load(days: float, interval: float, now: float):
+    # No TTL while benchmarking so the full year stays queryable
+    for name, spec in retention.collection_specs().items():
+        await db.create_collection(name, timeseries=spec["timeseries"])
+        await db[name].create_index([("bin_id", 1), ("at", 1)])
+    n = int(days * 86400 / interval)
+    start = now - days * 86400
+    for lo in range(0, n, CHUNK):
+        docs = []
+        for i in range(lo, min(n, lo + CHUNK)):
+            ts = start + i * interval
+            fill = 50 + 50 * math.sin(i / 2000)
+            docs.append({"bin_id": BIN_ID, "at": retention.ts_to_datetime(ts), "ts": ts,
+                         "distance_cm": 60 - fill / 2, "fill_percent": fill})
+        await db[retention.TELEMETRY_COLLECTION].insert_many(docs, ordered=False)
+        print(f"\r  loaded {min(n, lo + CHUNK):,}/{n:,}", end="", flush=True)
+    print()
+    t0 = time.perf_counter()
+    written = await retention.downsample(db, now)
+    print(f"Built {written:,} tier buckets in {time.perf_counter() - t0:.1f}s\n")
+
+async def raw_fetch(start: float, end: float) -> tuple[int, int]:
+    cursor = db[retention.TELEMETRY_COLLECTION].find(
+        {"bin_id": BIN_ID, "at": {"$gte": retention.ts_to_datetime(start), "$lt": retention.ts_to_datetime(end)}},
+        {"_id": 0, "ts": 1, "fill_percent": 1},
+    )
+    rows = await cursor.to_list(None)
+    return len(rows), len(repr(rows))
+
+async def history_fetch(start: float, end: float, max_points: int) -> tuple[int, int]:
+    size = 0
+    chunks = 0
+    async for chunk in stream_history(db, BIN_ID, start, end, max_points):
+        size += len(chunk)
+        chunks += 1
+    return chunks - 2, size
+
+async def timed(coro_fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = await coro_fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=365)
+    parser.add_argument("--interval", type=float, default=30.0, help="Seconds between readings")
+    parser.add_argument("--ranges", type=float, nargs="+", default=[1, 7, 30, 365], help="Query ranges in days")
+    parser.add_argument("--max-points", type=int, default=500)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    now = time.time()
+    print(f"Loading {args.days:g} days of {args.interval:g}s readings into {MONGO_DB}...")
+    try:
+        await load(args.days, args.interval, now)
+        print(f"{'range':>7} {'raw rows':>10} {'raw time':>10} {'points':>7} {'history':>9} {'bytes raw/hist':>18}")
+        for days in args.ranges:
+            start = now - days * 86400
+            raw_ms, (rows, raw_bytes) = await timed(lambda: raw_fetch(start, now))
+            hist_ms, (points, hist_bytes) = await timed(lambda: history_fetch(start, now, args.max_points))
+            print(f"{days:>6g}d {rows:>10,} {raw_ms:>8.0f}ms {points:>7} {hist_ms:>7.0f}ms "
+                  f"{raw_bytes:>9,}/{hist_bytes:<8,}")
+    finally:
+        if not args.keep:
+            await client.drop_database(MONGO_DB)
+        await client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
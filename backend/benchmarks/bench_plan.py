@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Fleet route planning benchmark (in-process, no Mongo).
+
+Plans random city-scale bins over a fleet spread across depots and reports,
+for each construction method, bins served, total km and solve time. Results
+are shown with construction only (--time-budget-ms 0) and with local search.
+First checks that a fleet too small for every bin keeps the fullest ones.
+
+    python benchmarks/bench_plan.py --sizes 1000 10000 --bins-per-vehicle 40
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from geo import haversine_km  # noqa: E402
+from routing import bin_priorities  # noqa: E402
+from vrp import PLAN_METHODS, plan_routes  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+SPEED_KMH = 20.0
+SERVICE_HOURS = 2 / 60
+
+def make_problem(n: int, spread_deg: float, n_depots: int, bins_per_vehicle: int, capacity: float, shift_h: float):
+    center = (29.6462, -82.3479)
+    bins = [(center[0] + random.uniform(-spread_deg, spread_deg), center[1] + random.uniform(-spread_deg, spread_deg))
+            for _ in range(n)]
+    depots = [(center[0] + random.uniform(-spread_deg, spread_deg) / 2, center[1] + random.uniform(-spread_deg, spread_deg) / 2)
+              for _ in range(n_depots)]
+    demands = [random.uniform(0.5, 1.0) for _ in range(n)]
+    prizes = [random.random() for _ in range(n)]
+    vehicles = [(v % n_depots, capacity, shift_h) for v in range(max(n_depots, n // bins_per_vehicle))]
+    return depots, bins, demands, prizes, vehicles
+
+def total_km(depots, bins, vehicles, routes) -> float:
+    km = 0.0
+    for (depot, _, _), route in zip(vehicles, routes):
+        path = [depots[depot], *(bins[b] for b in route), depots[depot]]
+        km += sum(haversine_km(*a, *b) for a, b in zip(path, path[1:]))
+    return km
+
+def check_keeps_fullest():
+    """Regression check: a fleet too small for every bin keeps the fullest ones."""
+    depot = (29.6462, -82.3479)
+    fills = np.array([55.0, 55.0, 80.0, 91.0])
+    bins = [(depot[0] + 0.001, depot[1]), (depot[0] + 0.045, depot[1]),
+            (depot[0] + 0.01, depot[1] + 0.01), (depot[0] - 0.01, depot[1])]
+    prizes = bin_priorities(fills, np.full(len(fills), time.time() - 3600.0), time.time())
+    for method in PLAN_METHODS:
+        routes, unassigned = plan_routes([depot], bins, (fills / 100.0).tolist(), prizes.tolist(),
+                                         [(0, 2.0, 8.0)], SPEED_KMH, SERVICE_HOURS, method, 0.2)
+        served = sorted(b for r in routes for b in r)
+        assert served == [2, 3], f"{method}: served bins {served}, expected the 80% and 91% bins"
+    print("check: under-capacity plans keep the fullest bins")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--depots", type=int, default=3)
+    parser.add_argument("--bins-per-vehicle", type=int, default=40, help="Fleet size is bins / this")
+    parser.add_argument("--capacity", type=float, default=30.0, help="Full bins per vehicle")
+    parser.add_argument("--shift-hours", type=float, default=8.0)
+    parser.add_argument("--time-budget-ms", type=int, default=2000, help="Local search budget")
+    parser.add_argument("--spread-deg", type=float, default=0.1, help="Half-width of the bin area (0.1 ~ 10km)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    check_keeps_fullest()
+
+    print(f"{'bins':>6} {'vehicles':>8} {'method':>8} {'search':>7}  {'served':>7} {'km':>8} {'time':>8}")
+    for n in args.sizes:
+        depots, bins, demands, prizes, vehicles = make_problem(
+            n, args.spread_deg, args.depots, args.bins_per_vehicle, args.capacity, args.shift_hours)
+        for method in PLAN_METHODS:
+            for budget_ms in (0, args.time_budget_ms):
+                t0 = time.perf_counter()
+                routes, _ = plan_routes(depots, bins, demands, prizes, vehicles, SPEED_KMH, SERVICE_HOURS,
+                                        method, budget_ms / 1000.0)
+                elapsed = time.perf_counter() - t0
+                served = sum(len(r) for r in routes)
+                km = total_km(depots, bins, vehicles, routes)
+                print(f"{n:>6} {len(vehicles):>8} {method:>8} {budget_ms:>5}ms  {served / n:>7.1%} {km:>8.0f} "
+                      f"{elapsed * 1000:>6.0f}ms")
+
+if __name__ == "__main__":
+    main()
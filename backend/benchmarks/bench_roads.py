@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Road-network routing benchmark (in-process, no Mongo).
+
+Loads a road graph (an OSM extract via --osm, or a generated street grid)
+and replays /route-style requests between random bins. Each request builds
+a distance matrix, solves, and draws the road polyline, with:
+  straight -- great-circle distances (no road graph)
+  cold     -- road distances with empty caches for every request
+  warm     -- road distances with the caches shared across requests
+
+    python benchmarks/bench_roads.py --bins 300 --requests 50
+    python benchmarks/bench_roads.py --osm gainesville.osm.bz2 --bins 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from roads import RoadDistanceMatrix, RoadGraph, RoadRouter  # noqa: E402
+from routing import DistanceMatrix, bin_priorities, greedy_route, pctsp_route, route_length  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+PENALTY = 0.5
+MAX_STOPS = 10
+
+def write_grid_osm(path: str, size: int, spacing_deg: float, origin: tuple[float, float]):
+    """A size x size street grid; every third street is one-way, alternating direction."""
+    def node_id(i, j):
+        return i * size + j + 1
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6">\n')
+        for i in range(size):
+            for j in range(size):
+                f.write(f'<node id="{node_id(i, j)}" lat="{origin[0] + i * spacing_deg:.7f}" '
+                        f'lon="{origin[1] + j * spacing_deg:.7f}"/>\n')
+        way = 1
+        for axis in range(2):
+            for i in range(size):
+                refs = [node_id(i, j) if axis == 0 else node_id(j, i) for j in range(size)]
+                oneway = "yes" if i % 6 == 0 else "-1" if i % 6 == 3 else "no"
+                f.write(f'<way id="{way}">' + "".join(f'<nd ref="{r}"/>' for r in refs) +
+                        f'<tag k="highway" v="residential"/><tag k="oneway" v="{oneway}"/></way>\n')
+                way += 1
+        f.write("</osm>\n")
+
+def solve(dist, prizes, n_fixed, solver):
+    candidates = list(range(n_fixed, dist.n))
+    if solver == "pctsp":
+        return pctsp_route(dist, prizes, 0, 1, candidates, MAX_STOPS, PENALTY, 0.05)
+    return greedy_route(dist, prizes, 0, 1, candidates, MAX_STOPS, PENALTY)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--osm", help="OSM extract (.osm/.osm.gz/.osm.bz2); default: a generated street grid")
+    parser.add_argument("--grid", type=int, default=120, help="Generated grid size (streets per side)")
+    parser.add_argument("--bins", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--pairs", type=int, default=10, help="Distinct start/end pairs the requests cycle through")
+    parser.add_argument("--radius-km", type=float, default=1.0, help="Bins within this distance of the start join a request")
+    parser.add_argument("--solver", choices=("greedy", "pctsp"), default="greedy")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.osm
+        if path is None:
+            path = os.path.join(tmp, "grid.osm")
+            write_grid_osm(path, args.grid, 0.001, (29.60, -82.40))
+        t0 = time.perf_counter()
+        graph = RoadGraph.load(path)
+        print(f"Road graph: {graph.n:,} nodes, {graph.n_edges:,} edges, loaded in {time.perf_counter() - t0:.2f}s")
+
+        lo_lat, hi_lat = np.percentile(graph.lats, [10, 90])
+        lo_lng, hi_lng = np.percentile(graph.lngs, [10, 90])
+        bins = [(random.uniform(lo_lat, hi_lat), random.uniform(lo_lng, hi_lng)) for _ in range(args.bins)]
+        fills = np.array([random.uniform(0, 100) for _ in bins])
+        prizes_all = bin_priorities(fills, np.full(len(bins), np.nan), time.time())
+        pairs = [tuple(random.sample(range(len(bins)), 2)) for _ in range(args.pairs)]
+
+        def request_coords(start, end):
+            all_dist = DistanceMatrix(bins).row(start)
+            near = [i for i in np.flatnonzero(all_dist <= args.radius_km).tolist() if i not in (start, end)]
+            ids = [start, end, *near]
+            return [bins[i] for i in ids], prizes_all[ids].tolist()
+
+        warm = RoadRouter(graph)
+        print(f"{'mode':<9} {'p50 ms':>8} {'mean ms':>8} {'km':>8} {'hit rate':>9}")
+        for mode in ("straight", "cold", "warm"):
+            times, kms = [], []
+            for k in range(args.requests):
+                coords, prizes = request_coords(*pairs[k % len(pairs)])
+                router = warm if mode == "warm" else RoadRouter(graph)
+                t0 = time.perf_counter()
+                if mode == "straight":
+                    dist = DistanceMatrix(coords)
+                    order = solve(dist, prizes, 2, args.solver)
+                    polyline = [list(coords[i]) for i in order]
+                else:
+                    dist = RoadDistanceMatrix(coords, router)
+                    order = solve(dist, prizes, 2, args.solver)
+                    polyline = router.polyline([coords[i] for i in order])
+                times.append((time.perf_counter() - t0) * 1000)
+                kms.append(route_length(order, dist))
+                assert polyline
+            hits = warm.distances.hits + warm.paths.hits
+            total = hits + warm.distances.misses + warm.paths.misses
+            rate = f"{hits / total:.0%}" if mode == "warm" and total else "-"
+            print(f"{mode:<9} {statistics.median(times):>8.1f} {statistics.fmean(times):>8.1f} "
+                  f"{statistics.fmean(kms):>8.2f} {rate:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Route solver benchmark (in-process, no Mongo).
+
+Reports route score (sum of priorities - penalty * km) and solve time for the
+greedy and pctsp solvers on random city-scale fleets.
+
+    python benchmarks/bench_route.py --sizes 50 500 5000 --max-stops 10 50
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from routing import DistanceMatrix, greedy_route, pctsp_route, route_score  # noqa: E402
+
+PENALTY = 0.5
+
+def make_fleet(n: int, spread_deg: float) -> tuple[list[tuple[float, float]], list[float]]:
+    coords = [(29.6462 + random.uniform(-spread_deg, spread_deg), -82.3479 + random.uniform(-spread_deg, spread_deg))
+              for _ in range(n)]
+    prizes = [random.random() for _ in range(n)]
+    return coords, prizes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--max-stops", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--time-budget-ms", type=int, default=500)
+    parser.add_argument("--spread-deg", type=float, default=0.03, help="Half-width of the bin area (0.03 ~ 3km)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    print(f"{'bins':>6} {'stops':>5}  {'greedy score':>12} {'time':>8}  {'pctsp score':>12} {'time':>8}")
+    for n in args.sizes:
+        coords, prizes = make_fleet(n, args.spread_deg)
+        candidates = list(range(2, n))
+        for k in args.max_stops:
+            dist = DistanceMatrix(coords)
+            t0 = time.perf_counter()
+            g = greedy_route(dist, prizes, 0, 1, candidates, k, PENALTY)
+            tg = time.perf_counter() - t0
+
+            dist = DistanceMatrix(coords)
+            t0 = time.perf_counter()
+            p = pctsp_route(dist, prizes, 0, 1, candidates, k, PENALTY, args.time_budget_ms / 1000.0)
+            tp = time.perf_counter() - t0
+
+            print(f"{n:>6} {k:>5}  {route_score(g, prizes, dist, PENALTY, 1):>12.3f} {tg * 1000:>6.0f}ms  "
+                  f"{route_score(p, prizes, dist, PENALTY, 1):>12.3f} {tp * 1000:>6.0f}ms")
+
+if __name__ == "__main__":
+    main()
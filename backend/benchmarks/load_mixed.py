@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Mixed-traffic load test with stored baselines.
+Run this with the backend server running against a scratch database, e.g.
+
+    cd backend && MONGO_URI=mongodb://localhost:27017 MONGO_DB=wastewise_bench uvicorn main:app
+    python benchmarks/load_mixed.py --save-baseline      # record on the reference machine
+    python benchmarks/load_mixed.py                      # later runs compare against it
+
+Registers --sensors bins, then for --duration seconds runs, concurrently:
+  sensors  -- every bin posts POST /telemetry each --interval seconds, on a fixed
+              schedule, so a slow server does not lower the offered load
+  pollers  -- dashboards polling GET /bins (If-None-Match, gzip) and GET /heatmap
+  routers  -- clients requesting GET /route between random bins, alternating greedy and pctsp
+and reports throughput and p50/p95/p99 per endpoint, after --warmup seconds.
+
+The baseline file keeps the last saved result per scenario (the load
+arguments). A run regresses when an endpoint's p95 grows or its throughput
+drops by more than --tolerance, or it returns errors; the script then exits
+with status 1.
+
+Baselines are only comparable on the machine and database they were
+recorded on; the first --save-baseline run creates baselines/load_mixed.json.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "load_mixed.json")
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+class Recorder:
+    """Latencies and errors per endpoint label, ignoring the warmup period."""
+    def __init__(self, warmup_until: float):
+        self.warmup_until = warmup_until
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def request(self, label: str, client: httpx.AsyncClient, method: str, url: str, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            r = await client.request(method, url, **kwargs)
+            ok = r.status_code < 400
+        except httpx.HTTPError:
+            r, ok = None, False
+        if t0 >= self.warmup_until:
+            self.latencies[label].append((time.perf_counter() - t0) * 1000)
+            if not ok:
+                self.errors[label] += 1
+        return r
+
+    def summary(self, seconds: float) -> dict[str, dict]:
+        out = {}
+        for label, values in sorted(self.latencies.items()):
+            out[label] = {
+                "requests": len(values),
+                "errors": self.errors[label],
+                "rps": round(len(values) / seconds, 1),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+            }
+        return out
+
+def bin_ids(n: int) -> list[str]:
+    return [f"load-{i:05d}" for i in range(n)]
+
+async def register_bins(client: httpx.AsyncClient, ids: list[str], spread_deg: float):
+    rng = random.Random(1)
+    center = (29.6462, -82.3479)
+    bins = [{
+        "bin_id": bid, "name": f"Load {bid}",
+        "lat": center[0] + rng.uniform(-spread_deg, spread_deg),
+        "lng": center[1] + rng.uniform(-spread_deg, spread_deg),
+        "fill_percent": rng.uniform(0, 100),
+    } for bid in ids]
+    for i in range(0, len(bins), 1000):
+        r = await client.post("/bins/register/batch", json=bins[i:i + 1000], timeout=60)
+        r.raise_for_status()
+
+async def sensor(rec: Recorder, client: httpx.AsyncClient, bin_id: str, interval: float, stop_at: float,
+                 inflight: set):
+    fill = random.uniform(0, 100)
+    # Fixed schedule with a random phase; readings are not delayed by slow responses
+    next_at = time.perf_counter() + random.uniform(0, interval)
+    while True:
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        if time.perf_counter() >= stop_at:
+            return
+        next_at += interval
+        fill = 5.0 if fill >= 100 else min(100.0, fill + random.uniform(0, 3))
+        reading = {"bin_id": bin_id, "distance_cm": round(60.0 - fill * 0.5, 1), "fill_percent": round(fill, 1), "ts": time.time()}
+        task = asyncio.create_task(rec.request("POST /telemetry", client, "POST", "/telemetry", json=reading))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+
+async def poller(rec: Recorder, client: httpx.AsyncClient, interval: float, heatmap_every: int, stop_at: float):
+    etag = None
+    await asyncio.sleep(random.uniform(0, interval))
+    polls = 0
+    while time.perf_counter() < stop_at:
+        headers = {"Accept-Encoding": "gzip"}
+        if etag:
+            headers["If-None-Match"] = etag
+        r = await rec.request("GET /bins", client, "GET", "/bins", headers=headers)
+        if r is not None and r.status_code == 200:
+            etag = r.headers.get("etag")
+        polls += 1
+        if polls % heatmap_every == 0:
+            await rec.request("GET /heatmap", client, "GET", "/heatmap")
+        await asyncio.sleep(interval)
+
+async def router(rec: Recorder, client: httpx.AsyncClient, ids: list[str], think: float, stop_at: float):
+    n = 0
+    while time.perf_counter() < stop_at:
+        start, end = random.sample(ids, 2)
+        solver = ("greedy", "pctsp")[n % 2]
+        n += 1
+        await rec.request(f"GET /route ({solver})", client, "GET", "/route",
+                          params={"start": start, "end": end, "solver": solver})
+        await asyncio.sleep(think)
+
+def compare(result: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    problems = []
+    for label, cur in result.items():
+        if cur["errors"]:
+            problems.append(f"{label}: {cur['errors']} errors")
+        base = baseline.get(label)
+        if base is None:
+            continue
+        if cur["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            problems.append(f"{label}: p95 {cur['p95_ms']:.1f}ms vs baseline {base['p95_ms']:.1f}ms")
+        if cur["rps"] < base["rps"] * (1 - tolerance):
+            problems.append(f"{label}: {cur['rps']:.1f} req/s vs baseline {base['rps']:.1f}")
+    return problems
+
+async def run(args) -> dict[str, dict]:
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        ids = bin_ids(args.sensors)
+        print(f"Registering {len(ids)} bins...")
+        await register_bins(client, ids, args.spread_deg)
+
+        now = time.perf_counter()
+        rec = Recorder(now + args.warmup)
+        stop_at = now + args.warmup + args.duration
+        print(f"Running {args.warmup:.0f}s warmup + {args.duration:.0f}s: {args.sensors} sensors every {args.interval}s, "
+              f"{args.pollers} pollers every {args.poll_interval}s, {args.routers} route clients")
+        inflight: set[asyncio.Task] = set()
+        tasks = [sensor(rec, client, bid, args.interval, stop_at, inflight) for bid in ids]
+        tasks += [poller(rec, client, args.poll_interval, args.heatmap_every, stop_at) for _ in range(args.pollers)]
+        tasks += [router(rec, client, ids, args.route_think, stop_at) for _ in range(args.routers)]
+        await asyncio.gather(*tasks)
+        # Let in-flight telemetry posts finish
+        await asyncio.gather(*inflight)
+    return rec.summary(args.duration)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--sensors", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between readings per sensor")
+    parser.add_argument("--pollers", type=int, default=20)
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--heatmap-every", type=int, default=5, help="Pollers also fetch /heatmap every this many polls")
+    parser.add_argument("--routers", type=int, default=4)
+    parser.add_argument("--route-think", type=float, default=0.5, help="Pause between one client's /route requests")
+    parser.add_argument("--spread-deg", type=float, default=0.05, help="Half-width of the bin area (0.05 ~ 5km)")
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline for its scenario")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95/throughput change vs the baseline")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    result = asyncio.run(run(args))
+
+    print(f"\n{'endpoint':<22} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, r in result.items():
+        print(f"{label:<22} {r['requests']:>8} {r['errors']:>6} {r['rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+    # Every argument that shapes the load; runs differing in any of them are not comparable
+    scenario = (f"sensors={args.sensors} interval={args.interval} pollers={args.pollers} "
+                f"poll_interval={args.poll_interval} heatmap_every={args.heatmap_every} "
+                f"routers={args.routers} route_think={args.route_think} spread_deg={args.spread_deg} "
+                f"connections={args.connections} duration={args.duration} warmup={args.warmup} seed={args.seed}")
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines[scenario] = {
+            "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "machine": f"{platform.node()} {platform.machine()} python {platform.python_version()}",
+            "endpoints": result,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline for '{scenario}' to {args.baseline}")
+        return
+
+    base = baselines.get(scenario)
+    if base is None:
+        print(f"\nNo baseline for '{scenario}' in {args.baseline} (record one with --save-baseline)")
+        return
+    print(f"\nBaseline from {base['recorded_at']} on {base['machine']}")
+    problems = compare(result, base["endpoints"], args.tolerance)
+    if problems:
+        print("REGRESSIONS:")
+        for p in problems:
+            print(f"  {p}")
+        raise SystemExit(1)
+    print(f"No regressions (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Load test: single-reading POST /telemetry vs POST /telemetry/batch.
+Run this with the backend server running (ideally against a scratch database).
+
+    python benchmarks/load_telemetry.py --readings 5000 --bins 500 --batch-size 200
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+def make_readings(n: int, n_bins: int) -> list[dict]:
+    now = time.time()
+    readings = []
+    for i in range(n):
+        fill = round(random.uniform(0, 100), 1)
+        readings.append({
+            "bin_id": f"load-{i % n_bins:05d}",
+            "distance_cm": round(60.0 - fill * 0.5, 1),
+            "fill_percent": fill,
+            "ts": now + i * 0.001,
+        })
+    return readings
+
+def run(label: str, url: str, payloads: list, concurrency: int, n_readings: int):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def post(payload):
+        r = session.post(url, json=payload, timeout=30)
+        r.raise_for_status()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(post, payloads))
+    elapsed = time.perf_counter() - start
+
+    rate = n_readings / elapsed
+    print(f"{label:<8} {len(payloads):>7} requests  {elapsed:8.2f}s  {rate:10.0f} readings/s")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--readings", type=int, default=5000)
+    parser.add_argument("--bins", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    readings = make_readings(args.readings, args.bins)
+    batches = [readings[i:i + args.batch_size] for i in range(0, len(readings), args.batch_size)]
+
+    print(f"{args.readings} readings across {args.bins} bins, concurrency={args.concurrency}")
+    single = run("single", f"{args.url}/telemetry", readings, args.concurrency, args.readings)
+    batch = run("batch", f"{args.url}/telemetry/batch", batches, args.concurrency, args.readings)
+    print(f"\nSpeedup: {batch / single:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Sensor fleet simulator for capacity planning.
+Run this with the backend server running against a scratch database.
+
+Emulates thousands of bins with the sensor's own models: SimulatedBin fill
+curves (steady fill plus dropped-in bags, emptied near full) with the rate
+following the time of day, noisy sample bursts through FillEstimator and
+fill_percent_from_distance, and AdaptiveReporter's deadband/heartbeat
+decisions. Like the real uploader,
+each sensor posts its queued readings to /telemetry/batch. Sensors go
+offline for a while now and then and upload their backlog on return, and
+every upload sees some network jitter. A crew marks each emptying through
+/bins/{bin_id}/emptied.
+
+Simulated time runs --speedup times faster than real time, so readings that
+would come every few minutes come every few seconds. Readings are stamped
+with simulated time so the backend's fill rates and forecasts see the
+simulated pace, which runs ahead of the wall clock. A /bins/stream
+subscriber records ingest-to-visible latency: from the moment a sensor
+hands a reading to the network until the stream shows it.
+
+    python benchmarks/simulate_fleet.py --bins 10000 --speedup 60 --duration 120
+    python benchmarks/simulate_fleet.py --bins 100000 --speedup 10 --concurrency 500
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict, deque
+
+# sensor/ goes first so `main` is the sensor's main.py
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "sensor"))
+
+import httpx  # noqa: E402
+
+from estimator import FillEstimator  # noqa: E402
+from forecast import EMPTIED_DROP_PERCENT  # noqa: E402  (the backend's emptying threshold)
+from main import (  # noqa: E402  (sensor/main.py)
+    DEADBAND_PCT, EMPTY_DISTANCE_CM, FULL_DISTANCE_CM, HEARTBEAT_INTERVAL,
+    READ_INTERVAL_MAX, READ_INTERVAL_MIN, SAMPLES, fill_percent_from_distance,
+)
+from outbox import BATCH_SIZE  # noqa: E402
+from reporting import AdaptiveReporter  # noqa: E402
+from ultrasonic import SimulatedBin  # noqa: E402
+
+# Matches the backend's MAX_REGISTER_BATCH
+REGISTER_CHUNK = 1000
+
+# Standard deviation of a single ultrasonic sample
+NOISE_CM = 0.5
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def diurnal(ts: float) -> float:
+    """Fill activity at a time of day (UTC hours), averaging 1: quiet at night, busiest mid-afternoon."""
+    hour = ts / 3600.0 % 24.0
+    return 1.0 + 0.8 * math.cos(2 * math.pi * (hour - 14.0) / 24.0)
+
+class FleetBin(SimulatedBin):
+    """SimulatedBin whose fill rate follows the time of day."""
+    def __init__(self, base_rate_pct_h: float, bags_per_h: float, rng: random.Random):
+        super().__init__(EMPTY_DISTANCE_CM, FULL_DISTANCE_CM, base_rate_pct_h, bags_per_h, rng=rng)
+        self.base_rate_pct_h = base_rate_pct_h
+
+    def advance(self, now: float) -> float:
+        self.rate_pct_h = self.base_rate_pct_h * diurnal(now)
+        return super().advance(now)
+
+class Fleet:
+    def __init__(self, args, client: httpx.AsyncClient):
+        self.args = args
+        self.client = client
+        self.rng = random.Random(args.seed)
+        self.sem = asyncio.Semaphore(args.concurrency)
+        self.real_start = time.perf_counter()
+        self.sim_start = time.time()
+        self.warmup_until = self.real_start + args.warmup
+        self.stop_at = self.warmup_until + args.duration
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.visible: list[float] = []
+        # bin_id -> (reading ts, handed-off at) of uploads not yet seen on the stream
+        self.pending: dict[str, deque] = defaultdict(deque)
+        self.readings = 0
+        self.superseded = 0
+        self.outages = 0
+        self.max_backlog = 0
+        self.crew_tasks: set[asyncio.Task] = set()
+
+    def sim_now(self) -> float:
+        return self.sim_start + (time.perf_counter() - self.real_start) * self.args.speedup
+
+    def jitter(self) -> float:
+        if self.args.jitter_ms <= 0:
+            return 0.0
+        return self.rng.lognormvariate(math.log(self.args.jitter_ms / 1000.0), 0.6)
+
+    async def post(self, label: str, url: str, payload=None) -> bool:
+        await asyncio.sleep(self.jitter())
+        async with self.sem:
+            t0 = time.perf_counter()
+            try:
+                r = await self.client.post(url, json=payload)
+                ok = r.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+        if t0 >= self.warmup_until:
+            self.latencies[label].append((time.perf_counter() - t0) * 1000)
+            if not ok:
+                self.errors[label] += 1
+        return ok
+
+    async def register(self, bins: list[tuple[str, FleetBin]]):
+        center = (29.6462, -82.3479)
+        spread = self.args.spread_deg
+        for i in range(0, len(bins), REGISTER_CHUNK):
+            chunk = [{
+                "bin_id": bin_id, "name": f"Sim {bin_id}",
+                "lat": center[0] + self.rng.uniform(-spread, spread),
+                "lng": center[1] + self.rng.uniform(-spread, spread),
+                "fill_percent": round(model.fill, 1),
+            } for bin_id, model in bins[i:i + REGISTER_CHUNK]]
+            r = await self.client.post("/bins/register/batch", json=chunk, timeout=120)
+            r.raise_for_status()
+
+    async def sensor(self, bin_id: str, model: FleetBin):
+        args, rng = self.args, self.rng
+        reporter = AdaptiveReporter(args.deadband, args.heartbeat, READ_INTERVAL_MIN, READ_INTERVAL_MAX)
+        estimator = FillEstimator()
+        backlog: list[dict] = []
+        offline_until = 0.0
+        prev_fill = None
+        next_at = time.perf_counter() + rng.uniform(0, READ_INTERVAL_MAX / args.speedup)
+        while True:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            if time.perf_counter() >= self.stop_at:
+                return
+            now = self.sim_now()
+            interval = reporter.read_interval
+            next_at += interval / args.speedup
+
+            if now >= offline_until and rng.random() < args.outages_per_day * interval / 86400.0:
+                offline_until = now + rng.expovariate(1.0 / (args.outage_minutes * 60.0))
+                self.outages += 1
+
+            samples = [model.distance_cm(now) + rng.gauss(0.0, NOISE_CM) for _ in range(SAMPLES)]
+            d, confidence = estimator.update(samples, now)
+            fill = fill_percent_from_distance(d)
+            # A drop the backend would also read as an emptying
+            if prev_fill is not None and fill < prev_fill - EMPTIED_DROP_PERCENT:
+                task = asyncio.create_task(self.post("POST /bins/{id}/emptied", f"/bins/{bin_id}/emptied"))
+                self.crew_tasks.add(task)
+                task.add_done_callback(self.crew_tasks.discard)
+            prev_fill = fill
+            if reporter.observe(fill, now):
+                backlog.append({
+                    "bin_id": bin_id, "distance_cm": round(d, 1), "fill_percent": round(fill, 1),
+                    "confidence": confidence, "ts": now,
+                })
+                self.max_backlog = max(self.max_backlog, len(backlog))
+
+            if backlog and now >= offline_until:
+                batch = backlog[:BATCH_SIZE]
+                handed_off = time.perf_counter()
+                if handed_off >= self.warmup_until:
+                    self.pending[bin_id].append((batch[-1]["ts"], handed_off))
+                if await self.post("POST /telemetry/batch", "/telemetry/batch", batch):
+                    del backlog[:len(batch)]
+                    self.readings += len(batch)
+
+    def seen(self, bin_id: str, ts: float, at: float):
+        q = self.pending.get(bin_id)
+        while q and q[0][0] <= ts:
+            sent_ts, handed_off = q.popleft()
+            if sent_ts == ts:
+                self.visible.append((at - handed_off) * 1000)
+            else:
+                self.superseded += 1  # a newer reading landed first, or the upload failed
+
+    async def watch(self, ready: asyncio.Event):
+        async with self.client.stream("GET", "/bins/stream", timeout=None) as r:
+            event = None
+            async for line in r.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[7:]
+                    ready.set()
+                elif line.startswith("data: ") and event == "bins":
+                    at = time.perf_counter()
+                    for b in json.loads(line[6:])["bins"]:
+                        self.seen(b["bin_id"], b["ts"], at)
+
+    async def progress(self):
+        last_readings, last_t = 0, time.perf_counter()
+        while True:
+            await asyncio.sleep(10)
+            t = time.perf_counter()
+            rate = (self.readings - last_readings) / (t - last_t)
+            last_readings, last_t = self.readings, t
+            vis = f"{percentile(self.visible, 50):.0f}ms" if self.visible else "-"
+            print(f"[{t - self.real_start:5.0f}s] sim {time.strftime('%H:%M', time.gmtime(self.sim_now()))} UTC  "
+                  f"{rate:8.0f} readings/s  visible p50 {vis}  outages {self.outages}", flush=True)
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 1, max_keepalive_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        fleet = Fleet(args, client)
+        rng = fleet.rng
+        bins = [
+            (f"sim-{i:06d}", FleetBin(rng.lognormvariate(math.log(args.fill_rate), 0.6), rng.uniform(0.1, 1.0), rng))
+            for i in range(args.bins)
+        ]
+        print(f"Registering {len(bins):,} bins...")
+        await fleet.register(bins)
+
+        ready = asyncio.Event()
+        watcher = asyncio.create_task(fleet.watch(ready))
+        await ready.wait()
+        fleet.real_start = time.perf_counter()
+        fleet.warmup_until = fleet.real_start + args.warmup
+        fleet.stop_at = fleet.warmup_until + args.duration
+        print(f"Simulating {args.warmup:.0f}s warmup + {args.duration:.0f}s at {args.speedup:g}x "
+              f"({(args.warmup + args.duration) * args.speedup / 3600:.1f} simulated hours)")
+        progress = asyncio.create_task(fleet.progress())
+        await asyncio.gather(*(fleet.sensor(bin_id, model) for bin_id, model in bins))
+        await asyncio.gather(*fleet.crew_tasks)
+        # Longer than --duration when the backend is too slow for the offered load
+        elapsed = time.perf_counter() - fleet.warmup_until
+        await asyncio.sleep(1.0)  # let the stream catch up
+        progress.cancel()
+        watcher.cancel()
+
+    print(f"\n{'endpoint':<24} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, values in sorted(fleet.latencies.items()):
+        print(f"{label:<24} {len(values):>8} {fleet.errors[label]:>6} {len(values) / elapsed:>8.1f} "
+              f"{percentile(values, 50):>8.1f} {percentile(values, 95):>8.1f} {percentile(values, 99):>8.1f}")
+    print(f"\nReadings stored: {fleet.readings:,} ({fleet.readings / (elapsed + args.warmup):,.0f}/s); "
+          f"outages: {fleet.outages:,}; largest sensor backlog: {fleet.max_backlog}")
+    if fleet.visible:
+        v = fleet.visible
+        print(f"Ingest-to-visible over /bins/stream: {len(v):,} uploads, p50 {percentile(v, 50):.1f}ms "
+              f"p95 {percentile(v, 95):.1f}ms p99 {percentile(v, 99):.1f}ms max {max(v):.1f}ms")
+    unseen = sum(len(q) for q in fleet.pending.values())
+    print(f"Not seen on the stream: {fleet.superseded:,} superseded by a newer reading, {unseen:,} never shown")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--bins", type=int, default=10000)
+    parser.add_argument("--speedup", type=float, default=60.0, help="Simulated seconds per real second")
+    parser.add_argument("--duration", type=float, default=120.0, help="Measured real seconds")
+    parser.add_argument("--warmup", type=float, default=10.0)
+    parser.add_argument("--deadband", type=float, default=DEADBAND_PCT, help="Sensor DEADBAND_PCT")
+    parser.add_argument("--heartbeat", type=float, default=HEARTBEAT_INTERVAL, help="Sensor HEARTBEAT_INTERVAL (simulated s)")
+    parser.add_argument("--fill-rate", type=float, default=3.0, help="Median fill rate, %% per hour (log-normal across bins)")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="Median network delay before each upload")
+    parser.add_argument("--outages-per-day", type=float, default=1.0, help="Offline periods per sensor per simulated day")
+    parser.add_argument("--outage-minutes", type=float, default=30.0, help="Mean offline period (simulated)")
+    parser.add_argument("--spread-deg", type=float, default=0.1, help="Half-width of the bin area (0.1 ~ 10km)")
+    parser.add_argument("--concurrency", type=int, default=200, help="Max requests in flight")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+In-process broadcast hub for Server-Sent Events.
+
+Events are encoded once and the same bytes are queued for every subscriber,
+so the cost of a change is independent of how many dashboards are open.
+"""
+import asyncio
+import json
+import os
+from typing import Optional
+
+# Pending events per subscriber before it is considered lagging
+BROADCAST_QUEUE_SIZE = int(os.getenv("BROADCAST_QUEUE_SIZE", "256"))
+
+# Queued in place of dropped events; the subscriber should send a fresh snapshot
+RESYNC = None
+
+def sse_event(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+class BroadcastHub:
+    def __init__(self, queue_size: int = BROADCAST_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: set[asyncio.Queue] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        self._subscribers.discard(q)
+
+    def publish(self, payload: bytes) -> int:
+        """Queue an encoded event for every subscriber. Never blocks."""
+        for q in self._subscribers:
+            try:
+                q.put_nowait(payload)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and tell it to resync from a snapshot
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(RESYNC)
+        return len(self._subscribers)
@@ -0,0 +1,58 @@
+"""
+MongoDB clients and collections.
+
+The API awaits the async client so a request waiting on Mongo does not hold
+a threadpool worker; its commands are timed for /metrics. The blocking client is kept for scripts and benchmarks.
+"""
+import os
+
+import certifi
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, MongoClient
+
+from metrics import MongoCommandTimer
+from rollups import ROLLUP_COLLECTION
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.getenv("MONGO_DB", "wastewise")
+
+# Connection pool sizing, per process (each uvicorn worker gets its own pool)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+
+def uses_tls(uri: str) -> bool:
+    """Atlas (mongodb+srv) and URIs asking for TLS; a plain local mongod has none."""
+    query = uri.partition("?")[2].lower()
+    return uri.startswith("mongodb+srv://") or "tls=true" in query or "ssl=true" in query
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    }
+    # Setting a CA file turns TLS on, so only pass it when the URI uses TLS
+    if uses_tls(MONGO_URI):
+        options["tlsCAFile"] = certifi.where()
+    return options
+
+# ----------------------------
+# ASYNC (API handlers)
+# ----------------------------
+
+# Command timings feed /metrics and the Server-Timing header
+client = AsyncMongoClient(MONGO_URI, event_listeners=[MongoCommandTimer()], **client_options())
+db = client[MONGO_DB]
+bins_col = db["bins"]
+telemetry_col = db["telemetry"]
+rollups_col = db[ROLLUP_COLLECTION]
+
+# ----------------------------
+# SYNC (scripts, benchmarks)
+# ----------------------------
+
+sync_client = MongoClient(MONGO_URI, **client_options())
+sync_db = sync_client[MONGO_DB]
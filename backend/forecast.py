@@ -0,0 +1,74 @@
+"""
+Per-bin fill-rate forecasting.
+
+Each reading updates an exponentially weighted fill rate (% per hour) kept
+on the bin document, in O(1) from the previous reading's fill and time. The
+weight of a reading grows with the time since the previous one
+(alpha = 1 - exp(-dt / tau)), so irregular, change-driven reporting does not
+bias the rate toward bursts of readings. The average is bias-corrected by
+its accumulated weight (stored alongside), so a new bin's rate is not pulled
+toward zero while history builds up; it is only used for predictions once
+about an hour of readings has been seen. Drops large enough to be an
+emptying are skipped rather than counted as negative fill.
+"""
+import math
+import os
+from typing import Optional
+
+import numpy as np
+
+# Time constant of the rate average: roughly how far back it "remembers"
+FORECAST_TAU_HOURS = float(os.getenv("FORECAST_TAU_HOURS", "6"))
+
+# predicted_full_at is when a bin is expected to reach this fill
+FORECAST_FULL_PERCENT = float(os.getenv("FORECAST_FULL_PERCENT", "90"))
+
+# A fill drop bigger than this between readings means the bin was emptied
+EMPTIED_DROP_PERCENT = 20.0
+
+# Rates below this (%/h) are treated as "not filling" (no predicted_full_at)
+MIN_FILL_RATE = 0.05
+
+# Hours of readings the average needs before it is used for predictions
+MIN_HISTORY_HOURS = 1.0
+
+def update_fill_rate(rate: float, weight: float, prev_fill: Optional[float], prev_ts: Optional[float],
+                     fill: float, ts: float, tau_hours: float = FORECAST_TAU_HOURS) -> tuple[float, float]:
+    """New (rate %/h, weight) after a reading at ts; `rate` is the bias-corrected average."""
+    if prev_fill is None or not prev_ts or ts <= prev_ts:
+        return rate, weight
+    if prev_fill - fill > EMPTIED_DROP_PERCENT:
+        return rate, weight
+    dt_hours = (ts - prev_ts) / 3600.0
+    alpha = 1.0 - math.exp(-dt_hours / tau_hours)
+    new_weight = (1.0 - alpha) * weight + alpha
+    raw = (1.0 - alpha) * rate * weight + alpha * (fill - prev_fill) / dt_hours
+    return raw / new_weight, new_weight
+
+def predict_full_at(fill: float, ts: float, rate: float, weight: float = 1.0,
+                    tau_hours: float = FORECAST_TAU_HOURS) -> Optional[float]:
+    if fill >= FORECAST_FULL_PERCENT:
+        return ts
+    # `weight` reaches this after MIN_HISTORY_HOURS of readings
+    if rate < MIN_FILL_RATE or weight < 1.0 - math.exp(-MIN_HISTORY_HOURS / tau_hours):
+        return None
+    return ts + (FORECAST_FULL_PERCENT - fill) / rate * 3600.0
+
+def forecast_fields(doc: Optional[dict], fill: float, ts: float, tau_hours: float = FORECAST_TAU_HOURS) -> dict:
+    """Forecast fields for a bin after a reading; `doc` is the bin before it."""
+    doc = doc or {}
+    # An emptying since the last reading restarts the level at the emptied fill
+    prev_ts = max(doc.get("last_seen_at") or 0.0, doc.get("last_emptied_at") or 0.0)
+    rate, weight = update_fill_rate(
+        doc.get("fill_rate", 0.0), doc.get("fill_rate_weight", 0.0),
+        doc.get("fill_percent"), prev_ts, fill, ts, tau_hours,
+    )
+    return {
+        "fill_rate": rate,
+        "fill_rate_weight": weight,
+        "predicted_full_at": predict_full_at(fill, ts, rate, weight, tau_hours),
+    }
+
+def project_fill(fill_percent: np.ndarray, fill_rate: np.ndarray, hours: np.ndarray) -> np.ndarray:
+    """Expected fill after `hours` at each bin's current rate (never below now, capped at 100)."""
+    return np.clip(fill_percent + np.maximum(fill_rate, 0.0) * hours, fill_percent, 100.0)
@@ -0,0 +1,126 @@
+"""
+Downsampled fill history for a single bin.
+
+A request for [start, end) at most `max_points` wide is answered from the
+coarsest telemetry tier whose period still fits the bucket width (and whose
+retention reaches back to `start`). The part of the range that tier has not
+built yet is read from the next finer tier, ending with raw readings, so the
+newest hour is never missing. Every source is grouped server-side into the
+same bucket grid, so at most `max_points` min/max/avg points leave Mongo.
+"""
+import json
+import time
+from typing import AsyncIterator
+
+from retention import (
+    DAILY_COLLECTION, DAY, HOURLY_COLLECTION, TELEMETRY_COLLECTION, TELEMETRY_DAILY_DAYS,
+    TELEMETRY_HOURLY_DAYS, TELEMETRY_RAW_DAYS, TIER_STATE_COLLECTION, ts_to_datetime,
+)
+from rollups import HOUR
+
+# (collection, watermark name in telemetry_tiers, period seconds, retention days), finest first
+SOURCES = (
+    (TELEMETRY_COLLECTION, None, 0, TELEMETRY_RAW_DAYS),
+    (HOURLY_COLLECTION, "hourly", HOUR, TELEMETRY_HOURLY_DAYS),
+    (DAILY_COLLECTION, "daily", DAY, TELEMETRY_DAILY_DAYS),
+)
+
+def choose_source(start: float, width: float, now: float) -> int:
+    """Index into SOURCES of the coarsest tier at least as fine as `width` that still holds `start`."""
+    chosen = 0
+    for i, (_, _, period, _) in enumerate(SOURCES):
+        if period <= width:
+            chosen = i
+    # Finer tiers may have expired `start` already; fall back to coarser ones
+    while chosen < len(SOURCES) - 1:
+        days = SOURCES[chosen][3]
+        if not days or start >= now - days * DAY:
+            break
+        chosen += 1
+    return chosen
+
+def bucket_pipeline(bin_id: str, start: float, end: float, origin: float, width: float, from_raw: bool) -> list[dict]:
+    """Group one source's [start, end) for a bin into buckets of `width` seconds counted from `origin`."""
+    if from_raw:
+        acc = {
+            "min": {"$min": "$fill_percent"},
+            "max": {"$max": "$fill_percent"},
+            "sum": {"$sum": "$fill_percent"},
+            "count": {"$sum": 1},
+        }
+        fields = {"at": 1, "fill_percent": 1}
+    else:
+        acc = {
+            "min": {"$min": "$min"},
+            "max": {"$max": "$max"},
+            "sum": {"$sum": "$sum"},
+            "count": {"$sum": "$count"},
+        }
+        fields = {"at": 1, "min": 1, "max": 1, "sum": 1, "count": 1}
+    return [
+        # Served by the (bin_id, at) index
+        {"$match": {"bin_id": bin_id, "at": {"$gte": ts_to_datetime(start), "$lt": ts_to_datetime(end)}}},
+        {"$project": {"_id": 0, **fields}},
+        {"$group": {
+            "_id": {"$floor": {"$divide": [{"$subtract": ["$at", ts_to_datetime(origin)]}, width * 1000]}},
+            **acc,
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+async def history_segments(db, start: float, end: float, width: float, now: float) -> list[tuple[str, float, float, bool]]:
+    """(collection, start, end, from_raw) ranges covering [start, end), oldest first."""
+    chosen = choose_source(start, width, now)
+    state = {d["_id"]: d["through"] async for d in db[TIER_STATE_COLLECTION].find({})}
+    segments = []
+    for i in range(chosen, -1, -1):
+        name, tier, _, _ = SOURCES[i]
+        # A tier is complete up to its watermark; raw readings are complete up to now
+        through = state.get(tier, start) if tier else end
+        stop = min(end, through)
+        if stop > start:
+            segments.append((name, start, stop, tier is None))
+            start = stop
+        if start >= end:
+            break
+    return segments
+
+async def _buckets(db, bin_id: str, segments, origin: float, width: float) -> AsyncIterator[dict]:
+    """Buckets in time order; a bucket split across two segments is merged."""
+    carry = None
+    for name, start, end, from_raw in segments:
+        cursor = await db[name].aggregate(bucket_pipeline(bin_id, start, end, origin, width, from_raw))
+        async for b in cursor:
+            if carry is not None and carry["_id"] == b["_id"]:
+                b = {
+                    "_id": b["_id"],
+                    "min": min(carry["min"], b["min"]),
+                    "max": max(carry["max"], b["max"]),
+                    "sum": carry["sum"] + b["sum"],
+                    "count": carry["count"] + b["count"],
+                }
+            elif carry is not None:
+                yield carry
+            carry = b
+    if carry is not None:
+        yield carry
+
+async def stream_history(db, bin_id: str, start: float, end: float, max_points: int) -> AsyncIterator[bytes]:
+    """JSON body for GET /bins/{bin_id}/history, written one point at a time."""
+    now = time.time()
+    width = max((end - start) / max_points, 1.0)
+    segments = await history_segments(db, start, end, width, now)
+    head = {"bin_id": bin_id, "from": start, "to": end, "bucket_seconds": width}
+    yield json.dumps(head, separators=(",", ":"))[:-1].encode() + b',"points":['
+    first = True
+    async for b in _buckets(db, bin_id, segments, start, width):
+        point = {
+            "ts": start + b["_id"] * width,
+            "min": b["min"],
+            "max": b["max"],
+            "avg": round(b["sum"] / b["count"], 2),
+            "count": b["count"],
+        }
+        yield (b"" if first else b",") + json.dumps(point, separators=(",", ":")).encode()
+        first = False
+    yield b"]}"
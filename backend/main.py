@@ -1,27 +1,39 @@
-import certifi
-import math
+import asyncio
+import logging
+import multiprocessing
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
 
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
+import numpy as np
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from pymongo import MongoClient
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Optional, Union
 
-load_dotenv()
+from broadcast import RESYNC, BroadcastHub, sse_event
+from cache import LRUCache, TTLCache
+from db import bins_col, client, rollups_col, telemetry_col
+from forecast import forecast_fields, project_fill, predict_full_at
+from geo import haversine_km
+from metrics import SOLVER_SECONDS, SOLVER_STOPS, TELEMETRY_READINGS, MetricsMiddleware, register_caches, timed
+from history import stream_history
+from payloads import encode, etag, etag_matches, headers_for, negotiate
+from registry import BinRegistry
+from roads import RoadDistanceMatrix, RoadGraph, RoadRouter
+from retention import downsample_forever, ensure_collections as ensure_telemetry_collections, ts_to_datetime
+from rollups import ensure_indexes as ensure_rollup_indexes, rollup_ops, window_average_pipeline
+from routing import ROUTE_SOLVERS, DistanceMatrix, RouteState, bin_priorities, greedy_route, pctsp_route
+from vrp import PLAN_METHODS, plan_routes, route_duration_hours
 
-# ----------------------------
-# MONGODB CONNECTION
-# ----------------------------
-
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-db = client["wastewise"]
-bins_col = db["bins"]
-telemetry_col = db["telemetry"]
+log = logging.getLogger(__name__)
 
 # ----------------------------
 # PYDANTIC MODELS
@@ -32,12 +44,14 @@ class TelemetryIn(BaseModel):
     distance_cm: float
     fill_percent: float
     ts: float
+    confidence: Optional[float] = None  # 0-1 from the sensor's estimator, if it has one
 
 class BinRegister(BaseModel):
     bin_id: str
     name: str
-    lat: float
-    lng: float
+    # The 2dsphere index on `geo` rejects anything outside these ranges
+    lat: float = Field(ge=-90, le=90)
+    lng: float = Field(ge=-180, le=180)
     fill_percent: float = 0.0
 
 class BinOut(BaseModel):
@@ -49,6 +63,17 @@ class BinOut(BaseModel):
     fill_percent: float
     ts: float
     last_emptied_at: Optional[float] = None
+    confidence: Optional[float] = None
+    predicted_full_at: Optional[float] = None
+
+class NearbyBin(BinOut):
+    distance_km: float
+
+class BinsDelta(BaseModel):
+    version: str  # cursor for the next ?since=
+    full: bool  # True when `since` was unknown and `bins` holds every bin
+    bins: list[BinOut]
+    removed: list[str]
 
 class HeatmapPoint(BaseModel):
     lat: float
@@ -63,11 +88,45 @@ class RouteStop(BaseModel):
     fill_percent: float
     priority: float
     order: int
+    projected_fill_percent: Optional[float] = None  # expected fill on arrival (forecast=true)
 
 class RouteOut(BaseModel):
     stops: list[RouteStop]
     polyline: list[list[float]]
 
+class DepotIn(BaseModel):
+    depot_id: str
+    lat: float
+    lng: float
+
+class VehicleIn(BaseModel):
+    vehicle_id: str
+    depot_id: str
+    capacity: float = Field(gt=0)  # in full bins: a bin at 60% takes 0.6
+    shift_minutes: float = Field(default=480, gt=0)
+
+class RoutePlanIn(BaseModel):
+    depots: list[DepotIn]
+    vehicles: list[VehicleIn]
+    method: str = "savings"
+    min_fill: float = 50.0  # only bins at least this full are collected
+    bin_ids: Optional[list[str]] = None  # plan only these bins (default: every located bin)
+    time_budget_ms: int = Field(default=2000, ge=0, le=30000)
+
+class VehicleRoute(BaseModel):
+    vehicle_id: str
+    depot_id: str
+    stops: list[RouteStop]
+    load: float
+    distance_km: float
+    duration_minutes: float
+    polyline: list[list[float]]  # depot -> stops -> depot
+
+class RoutePlanOut(BaseModel):
+    routes: list[VehicleRoute]
+    unassigned: list[str]  # candidate bins no vehicle had room or time for
+    distance_km: float
+
 # ----------------------------
 # SEED DATA
 # ----------------------------
@@ -104,56 +163,282 @@ SEED_EMPTIED_HOURS_AGO: dict[str, float] = {
 # Recommended: 0.5 for campus-scale (0-2km), 0.1 for city-scale (5-10km)
 DISTANCE_PENALTY_PER_KM = 0.5
 
+# Upper bound on the max_stops a /route request may ask for
+MAX_ROUTE_STOPS = 500
+
+# /route only considers bins within this many km of the start or end bin
+ROUTE_RADIUS_KM = float(os.getenv("ROUTE_RADIUS_KM", "5.0"))
+
+# /route only visits bins at least this full
+ROUTE_MIN_FILL = 10.0
+
+# Computed /route responses kept for identical requests while no bin changes enough to matter
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "256"))
+
+# Longest a cached /route response is reused (priorities also drift with time since emptying)
+ROUTE_CACHE_SECONDS = float(os.getenv("ROUTE_CACHE_SECONDS", "300"))
+
+# Average collection vehicle speed (including stops), for arrival-time forecasts
+ROUTE_SPEED_KMH = float(os.getenv("ROUTE_SPEED_KMH", "20"))
+
+# Optional OSM extract (.osm/.osm.gz/.osm.bz2) for road distances and polylines in /route;
+# without one, routes use straight-line distances
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH", "")
+
+# Road node pairs whose distance is kept for reuse across /route requests
+ROAD_CACHE_SIZE = int(os.getenv("ROAD_CACHE_SIZE", "200000"))
+
+# Minutes a truck spends emptying each bin on a POST /routes/plan route
+SERVICE_MINUTES_PER_STOP = float(os.getenv("SERVICE_MINUTES_PER_STOP", "2"))
+
+# Worker processes for POST /routes/plan, so large plans don't block the event loop
+PLAN_WORKERS = int(os.getenv("PLAN_WORKERS", "2"))
+
+# Upper bound on vehicles in a single POST /routes/plan
+MAX_PLAN_VEHICLES = 500
+
+# Upper bound on readings accepted by a single POST /telemetry/batch
+MAX_TELEMETRY_BATCH = 1000
+
+# Upper bound on bins accepted by a single POST /bins/register/batch
+MAX_REGISTER_BATCH = 1000
+
+# Upper bound on bins in one page of /bins?limit=
+MAX_BINS_PAGE = 1000
+
+# Upper bound on points a single /bins/{bin_id}/history response may return
+MAX_HISTORY_POINTS = 5000
+
+# How long a computed /heatmap response is reused for the same window
+HEATMAP_CACHE_SECONDS = float(os.getenv("HEATMAP_CACHE_SECONDS", "10"))
+
+def geo_point(lat: float, lng: float) -> dict:
+    """GeoJSON point for the 2dsphere-indexed `geo` field (kept alongside `location`)."""
+    return {"type": "Point", "coordinates": [lng, lat]}
+
 def _fill_to_distance(fill_pct: float) -> float:
     empty_dist = 60.0
     full_dist = 10.0
     return round(empty_dist - (fill_pct / 100.0) * (empty_dist - full_dist), 1)
 
-def seed_bins():
+async def seed_bins():
     """Upsert seed bins using $setOnInsert so live data is never overwritten."""
     now = time.time()
+    ops = []
     for bin_id, info in BIN_REGISTRY.items():
         fill = SEED_FILLS[bin_id]
         hours_ago = SEED_EMPTIED_HOURS_AGO[bin_id]
-        bins_col.update_one(
+        ops.append(UpdateOne(
             {"bin_id": bin_id},
             {"$setOnInsert": {
                 "name": info["name"],
                 "location": {"lat": info["lat"], "lng": info["lng"]},
+                "geo": geo_point(info["lat"], info["lng"]),
                 "fill_percent": fill,
                 "distance_cm": _fill_to_distance(fill),
                 "last_seen_at": now,
                 "last_emptied_at": now - hours_ago * 3600,
             }},
             upsert=True,
-        )
+        ))
+    await bins_col.bulk_write(ops, ordered=False)
+    # Bins stored before coordinates were validated can't be 2dsphere-indexed;
+    # leave them without a geo point (so out of geo queries) instead of failing startup
+    out_of_range = {"location": {"$exists": True}, "$or": [
+        {"location.lat": {"$not": {"$gte": -90, "$lte": 90}}},
+        {"location.lng": {"$not": {"$gte": -180, "$lte": 180}}},
+    ]}
+    async for doc in bins_col.find(out_of_range, {"bin_id": 1, "location": 1}):
+        log.warning("Bin %s has out-of-range coordinates %s; not indexing its location", doc["bin_id"], doc["location"])
+    await bins_col.update_many(out_of_range, {"$unset": {"geo": ""}})
+    # Backfill GeoJSON points for bins registered before the geo field existed
+    await bins_col.update_many(
+        {"location.lat": {"$gte": -90, "$lte": 90}, "location.lng": {"$gte": -180, "$lte": 180},
+         "geo": {"$exists": False}},
+        [{"$set": {"geo": {"type": "Point", "coordinates": ["$location.lng", "$location.lat"]}}}],
+    )
     # Create indexes idempotently
-    bins_col.create_index("bin_id", unique=True)
-    telemetry_col.create_index([("bin_id", 1), ("ts", 1)])
+    await bins_col.create_index("bin_id", unique=True)
+    await bins_col.create_index([("geo", "2dsphere")])
+    # Paged /bins listings: keyset sort on bin_id, then the range filters (equality-sort-range order)
+    await bins_col.create_index([("bin_id", 1), ("fill_percent", 1), ("last_seen_at", 1)])
+    await ensure_telemetry_collections(telemetry_col.database)
+    await ensure_rollup_indexes(rollups_col)
+
+# In-memory bin state served by the read endpoints (write-through from the API)
+registry = BinRegistry()
+
+# Recent /heatmap responses keyed by window length
+heatmap_cache = TTLCache(ttl=HEATMAP_CACHE_SECONDS, maxsize=64)
+
+# /route responses keyed by request parameters and route_state.version
+route_cache = LRUCache(maxsize=ROUTE_CACHE_SIZE, ttl=ROUTE_CACHE_SECONDS)
+route_state = RouteState(min_fill=ROUTE_MIN_FILL)
+
+# Encoded full /bins bodies keyed by (registry cursor, media type, encoding)
+bins_body_cache = LRUCache(maxsize=8)
+
+# Live bin updates for /bins/stream subscribers
+hub = BroadcastHub()
+STREAM_KEEPALIVE_SECONDS = 15.0
+_pending_changes: set[str] = set()
+
+# Fleet plans are CPU-bound; spawn keeps workers from inheriting the event loop and Mongo client
+plan_pool = ProcessPoolExecutor(max_workers=PLAN_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+# Road network searches for /route; set at startup when ROAD_GRAPH_PATH is configured
+roads: Optional[RoadRouter] = None
 
 # ----------------------------
 # HELPERS
 # ----------------------------
 
-def doc_to_bin_out(doc: dict) -> BinOut:
+def telemetry_fields(data: TelemetryIn, prev: Optional[dict]) -> dict:
+    """Bin document fields set by a sensor reading; `prev` is the bin before it (for the forecast)."""
+    return {
+        "fill_percent": data.fill_percent,
+        "distance_cm": data.distance_cm,
+        "last_seen_at": data.ts,
+        "confidence": data.confidence,
+        **forecast_fields(prev, data.fill_percent, data.ts),
+    }
+
+def parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    """Parse "min_lat,min_lng,max_lat,max_lng"."""
+    try:
+        min_lat, min_lng, max_lat, max_lng = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="bbox must be 'min_lat,min_lng,max_lat,max_lng'")
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=422, detail="bbox minimums must not exceed maximums")
+    return min_lat, min_lng, max_lat, max_lng
+
+async def list_bins_page(
+    limit: Optional[int],
+    after: Optional[str],
+    fields: list[str],
+    min_fill: Optional[float],
+    max_fill: Optional[float],
+    stale_seconds: Optional[float],
+    bbox: Optional[str],
+) -> list[dict]:
+    """One keyset page of bins (ordered by bin_id) with only `fields`, filtered in Mongo."""
+    query: dict = {}
+    if after is not None:
+        query["bin_id"] = {"$gt": after}
+    fill: dict = {}
+    if min_fill is not None:
+        fill["$gte"] = min_fill
+    if max_fill is not None:
+        fill["$lte"] = max_fill
+    if fill:
+        query["fill_percent"] = fill
+    if stale_seconds is not None:
+        # Never-seen bins (no last_seen_at) count as stale too
+        query["last_seen_at"] = {"$not": {"$gte": time.time() - stale_seconds}}
+    if bbox is not None:
+        min_lat, min_lng, max_lat, max_lng = parse_bbox(bbox)
+        query["geo"] = {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [[
+            [min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat],
+        ]]}}}
+    projection = {"_id": 0, **{BIN_FIELD_SOURCES[f]: 1 for f in fields}}
+    cursor = bins_col.find(query, projection).sort("bin_id", 1)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    rows = []
+    async for doc in cursor:
+        row = bin_row(doc)
+        rows.append({f: row[f] for f in fields})
+    return rows
+
+def telemetry_doc(data: TelemetryIn) -> dict:
+    """Telemetry history document for a sensor reading (`at` is the time-series timeField)."""
+    doc = {
+        "bin_id": data.bin_id,
+        "at": ts_to_datetime(data.ts),
+        "distance_cm": data.distance_cm,
+        "fill_percent": data.fill_percent,
+        "ts": data.ts,
+    }
+    if data.confidence is not None:
+        doc["confidence"] = data.confidence
+    return doc
+
+def bin_row(doc: dict) -> dict:
+    """BinOut fields for a bin document as a plain dict (the /bins fast path skips the model)."""
     loc = doc.get("location", {})
-    return BinOut(
-        bin_id=doc["bin_id"],
-        name=doc.get("name", "Unknown"),
-        lat=loc.get("lat", 0.0),
-        lng=loc.get("lng", 0.0),
-        distance_cm=doc.get("distance_cm", 0.0),
-        fill_percent=doc.get("fill_percent", 0.0),
-        ts=doc.get("last_seen_at", 0.0),
-        last_emptied_at=doc.get("last_emptied_at"),
-    )
+    return {
+        "bin_id": doc["bin_id"],
+        "name": doc.get("name", "Unknown"),
+        "lat": loc.get("lat", 0.0),
+        "lng": loc.get("lng", 0.0),
+        "distance_cm": doc.get("distance_cm", 0.0),
+        "fill_percent": doc.get("fill_percent", 0.0),
+        "ts": doc.get("last_seen_at", 0.0),
+        "last_emptied_at": doc.get("last_emptied_at"),
+        "confidence": doc.get("confidence"),
+        "predicted_full_at": doc.get("predicted_full_at"),
+    }
+
+def doc_to_bin_out(doc: dict) -> BinOut:
+    return BinOut(**bin_row(doc))
+
+# Bin document fields each BinOut field is read from (for Mongo projections)
+BIN_FIELD_SOURCES: dict[str, str] = {
+    "bin_id": "bin_id",
+    "name": "name",
+    "lat": "location.lat",
+    "lng": "location.lng",
+    "distance_cm": "distance_cm",
+    "fill_percent": "fill_percent",
+    "ts": "last_seen_at",
+    "last_emptied_at": "last_emptied_at",
+    "confidence": "confidence",
+    "predicted_full_at": "predicted_full_at",
+}
+
+def parse_fields(fields: Optional[str]) -> list[str]:
+    """BinOut fields named in ?fields= (bin_id always included), or all of them."""
+    if not fields:
+        return list(BIN_FIELD_SOURCES)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in BIN_FIELD_SOURCES]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["bin_id", *dict.fromkeys(f for f in names if f != "bin_id")]
 
-def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    R = 6371.0
-    dlat = math.radians(lat2 - lat1)
-    dlng = math.radians(lng2 - lng1)
-    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+def _queue_bin_change(bin_id: str):
+    """Registry listener: coalesce changes made in one event-loop tick into one event."""
+    if not hub.subscriber_count:
+        return
+    if not _pending_changes:
+        asyncio.get_running_loop().call_soon(_flush_bin_changes)
+    _pending_changes.add(bin_id)
+
+def _flush_bin_changes():
+    changed, removed = [], []
+    for bin_id in _pending_changes:
+        doc = registry.get(bin_id)
+        if doc is None:
+            removed.append(bin_id)
+        else:
+            changed.append(doc_to_bin_out(doc).model_dump())
+    _pending_changes.clear()
+    hub.publish(sse_event("bins", {"version": registry.cursor, "bins": changed, "removed": removed}))
+
+registry.listeners.append(_queue_bin_change)
+
+def _track_route_state(bin_id: str):
+    """Registry listener: invalidate cached routes only for changes that can alter them."""
+    route_state.observe(bin_id, registry.get(bin_id), time.time())
+
+registry.listeners.append(_track_route_state)
+
+def _snapshot_event() -> bytes:
+    return sse_event("snapshot", {
+        "version": registry.cursor,
+        "bins": [doc_to_bin_out(d).model_dump() for d in registry.all()],
+    })
 
 # ----------------------------
 # APP
@@ -161,10 +446,22 @@ def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: seed the database
-    seed_bins()
+    # Startup: seed the database and load bin state into memory
+    global roads
+    await seed_bins()
+    if ROAD_GRAPH_PATH:
+        graph = await run_in_threadpool(RoadGraph.load, ROAD_GRAPH_PATH)
+        roads = RoadRouter(graph, cache_size=ROAD_CACHE_SIZE)
+        log.info("Loaded road graph: %d nodes, %d edges", graph.n, graph.n_edges)
+    await registry.load(bins_col)
+    sync_task = asyncio.create_task(registry.sync_forever(bins_col))
+    downsample_task = asyncio.create_task(downsample_forever(telemetry_col.database))
     yield
-    # Shutdown: cleanup (if needed)
+    # Shutdown: stop background tasks and release the connection pool
+    sync_task.cancel()
+    downsample_task.cancel()
+    plan_pool.shutdown(wait=False, cancel_futures=True)
+    await client.close()
 
 app = FastAPI(title="Smart Waste Management API", lifespan=lifespan)
 
@@ -174,118 +471,389 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Bins-Version", "X-Cache", "X-Next-After", "Server-Timing"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # ----------------------------
 # ENDPOINTS
 # ----------------------------
 
 @app.post("/telemetry")
-def receive_telemetry(data: TelemetryIn):
-    bins_col.update_one(
-        {"bin_id": data.bin_id},
-        {"$set": {
-            "fill_percent": data.fill_percent,
-            "distance_cm": data.distance_cm,
-            "last_seen_at": data.ts,
-        }},
-        upsert=True,
+async def receive_telemetry(data: TelemetryIn):
+    fields = telemetry_fields(data, registry.get(data.bin_id))
+    # Independent writes, so issue them concurrently
+    await asyncio.gather(
+        bins_col.update_one({"bin_id": data.bin_id}, {"$set": fields}, upsert=True),
+        telemetry_col.insert_one(telemetry_doc(data)),
+        rollups_col.bulk_write(rollup_ops([(data.bin_id, data.ts, data.fill_percent)]), ordered=False),
     )
-    telemetry_col.insert_one({
-        "bin_id": data.bin_id,
-        "distance_cm": data.distance_cm,
-        "fill_percent": data.fill_percent,
-        "ts": data.ts,
-    })
+    registry.update(data.bin_id, fields)
+    TELEMETRY_READINGS.labels("single").inc()
     return {"status": "ok", "bin_id": data.bin_id}
 
-@app.get("/bins", response_model=list[BinOut])
-def get_bins():
-    docs = bins_col.find()
-    return [doc_to_bin_out(d) for d in docs]
+@app.post("/telemetry/batch")
+async def receive_telemetry_batch(readings: list[TelemetryIn]):
+    """
+    Ingest many sensor readings with one bulk write per collection.
+    Only the newest reading per bin updates the bin document, and only if it
+    is newer than what is stored (outbox replays can arrive out of order);
+    every reading is appended to telemetry history and the heatmap rollups.
+    """
+    if len(readings) > MAX_TELEMETRY_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(readings)} readings (max {MAX_TELEMETRY_BATCH})"
+        )
+    if not readings:
+        return {"status": "ok", "received": 0, "bins_updated": 0, "results": []}
+
+    # Index of the newest reading for each bin
+    newest: dict[str, int] = {}
+    for i, r in enumerate(readings):
+        j = newest.get(r.bin_id)
+        if j is None or r.ts >= readings[j].ts:
+            newest[r.bin_id] = i
+
+    statuses = ["ok" if newest[r.bin_id] == i else "superseded" for i, r in enumerate(readings)]
+    # A bin already holding a newer reading keeps it; this batch only adds history
+    for i in newest.values():
+        seen = (registry.get(readings[i].bin_id) or {}).get("last_seen_at")
+        if seen is not None and seen >= readings[i].ts:
+            statuses[i] = "superseded"
+
+    # Every reading feeds the fill-rate forecast, in time order; the newest one's fields are written
+    state: dict[str, Optional[dict]] = {}
+    fields: dict[str, dict] = {}
+    for i in sorted(range(len(readings)), key=lambda i: readings[i].ts):
+        r = readings[i]
+        prev = state[r.bin_id] if r.bin_id in state else registry.get(r.bin_id)
+        fields[r.bin_id] = telemetry_fields(r, prev)
+        state[r.bin_id] = {**(prev or {}), **fields[r.bin_id]}
+
+    update_idx = list(newest.values())
+    # Two ops per bin: $set only over an older reading (the filter re-checks what
+    # the registry said, in case another worker stored a newer one), and
+    # $setOnInsert for a bin that doesn't exist yet
+    ops = []
+    for i in update_idx:
+        r = readings[i]
+        ops.append(UpdateOne({"bin_id": r.bin_id, "last_seen_at": {"$not": {"$gte": r.ts}}}, {"$set": fields[r.bin_id]}))
+        ops.append(UpdateOne({"bin_id": r.bin_id}, {"$setOnInsert": fields[r.bin_id]}, upsert=True))
+    try:
+        await bins_col.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            statuses[update_idx[err["index"] // 2]] = "error"
+    bins_updated = 0
+    for i in update_idx:
+        if statuses[i] == "ok":
+            registry.update(readings[i].bin_id, fields[readings[i].bin_id])
+            bins_updated += 1
+
+    # Readings reported as errors get resent, so they must not be in history yet
+    history_idx = [i for i, st in enumerate(statuses) if st != "error"]
+    try:
+        if history_idx:
+            await telemetry_col.insert_many([telemetry_doc(readings[i]) for i in history_idx], ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            statuses[history_idx[err["index"]]] = "error"
+
+    stored = [(r.bin_id, r.ts, r.fill_percent) for i, r in enumerate(readings) if statuses[i] != "error"]
+    if stored:
+        await rollups_col.bulk_write(rollup_ops(stored), ordered=False)
+
+    results = [
+        {"index": i, "bin_id": r.bin_id, "status": statuses[i]}
+        for i, r in enumerate(readings)
+    ]
+    failed = sum(1 for st in statuses if st == "error")
+    TELEMETRY_READINGS.labels("batch").inc(len(readings) - failed)
+    return {
+        "status": "partial" if failed else "ok",
+        "received": len(readings),
+        "bins_updated": bins_updated,
+        "results": results,
+    }
+
+@app.get("/bins", response_model=Union[list[BinOut], BinsDelta])
+async def get_bins(
+    request: Request,
+    since: Optional[str] = Query(default=None, description="Only return bins changed after this cursor (X-Bins-Version)"),
+    bbox: Optional[str] = Query(default=None, description="min_lat,min_lng,max_lat,max_lng"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_BINS_PAGE, description="Page size; the next cursor is in X-Next-After"),
+    after: Optional[str] = Query(default=None, description="Return bins with bin_id after this cursor"),
+    fields: Optional[str] = Query(default=None, description="Comma-separated fields to return (bin_id is always included)"),
+    min_fill: Optional[float] = Query(default=None, description="Only bins at least this full"),
+    max_fill: Optional[float] = Query(default=None, description="Only bins at most this full"),
+    stale_seconds: Optional[float] = Query(default=None, gt=0, description="Only bins not heard from in this many seconds"),
+):
+    """
+    List bins. Supports If-None-Match (304 when nothing changed),
+    ?since=<cursor> deltas (the current cursor is in X-Bins-Version)
+    and ?bbox= to limit results to a map viewport. Rows are encoded directly
+    (see payloads.py): JSON or MessagePack per Accept, gzip/brotli per
+    Accept-Encoding.
+
+    Any of limit, after, fields, min_fill, max_fill or stale_seconds makes
+    this a paged listing: bins ordered by bin_id, read from Mongo with only
+    the requested fields. Pass X-Next-After back as ?after= for the next page.
+    """
+    media_type, encoding = negotiate(request.headers.get("accept", ""), request.headers.get("accept-encoding", ""))
+    paged = any(v is not None for v in (limit, after, fields, min_fill, max_fill, stale_seconds))
+    if paged:
+        if since is not None:
+            raise HTTPException(status_code=422, detail="since cannot be combined with paging or filters")
+        rows = await list_bins_page(limit, after, parse_fields(fields), min_fill, max_fill, stale_seconds, bbox)
+        headers = {"X-Bins-Version": registry.cursor, "Cache-Control": "no-cache"}
+        if limit is not None and len(rows) == limit:
+            headers["X-Next-After"] = rows[-1]["bin_id"]
+        with timed("encode"):
+            body, applied = encode(rows, media_type, encoding)
+        return Response(content=body, headers={**headers, **headers_for(media_type, applied)})
+
+    # Each format and encoding gets its own ETag, so a cache can't hand one out for another
+    tag = etag(registry.cursor, media_type, encoding)
+    headers = {
+        "ETag": tag,
+        "X-Bins-Version": registry.cursor,
+        "Cache-Control": "no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers={**headers, "Vary": "Accept, Accept-Encoding"})
+
+    if since is None and bbox is None:
+        # The full list is encoded once per registry version and format
+        key = (registry.cursor, media_type, encoding)
+        cached = bins_body_cache.get(key)
+        if cached is None:
+            with timed("encode"):
+                cached = encode([bin_row(d) for d in registry.all()], media_type, encoding)
+            bins_body_cache.set(key, cached)
+        body, applied = cached
+        return Response(content=body, headers={**headers, **headers_for(media_type, applied)})
+
+    in_view = None
+    if bbox is not None:
+        in_view = set(registry.spatial.bbox(*parse_bbox(bbox)))
+
+    def visible(docs: list[dict]) -> list[dict]:
+        return [bin_row(d) for d in docs if in_view is None or d["bin_id"] in in_view]
+
+    if since is None:
+        content = [bin_row(registry.get(b)) for b in in_view]
+    else:
+        delta = registry.changed_since(since)
+        if delta is None:
+            content = {"version": registry.cursor, "full": True, "bins": visible(registry.all()), "removed": []}
+        else:
+            changed, removed = delta
+            content = {"version": registry.cursor, "full": False, "bins": visible(changed), "removed": removed}
+    with timed("encode"):
+        body, applied = encode(content, media_type, encoding)
+    return Response(content=body, headers={**headers, **headers_for(media_type, applied)})
+
+@app.get("/bins/nearest", response_model=list[NearbyBin])
+async def get_nearest_bins(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    k: int = Query(default=5, ge=1, le=100),
+):
+    """The k located bins closest to (lat, lng), nearest first."""
+    return [
+        NearbyBin(**doc_to_bin_out(registry.get(bin_id)).model_dump(), distance_km=round(dist_km, 3))
+        for bin_id, dist_km in registry.spatial.nearest(lat, lng, k)
+    ]
+
+@app.get("/bins/stream")
+async def stream_bins():
+    """
+    Server-Sent Events: one `snapshot` event on connect, then a `bins` event
+    with the changed/removed bins whenever telemetry, emptying or admin
+    changes land.
+    """
+    async def events():
+        q = hub.subscribe()
+        try:
+            yield _snapshot_event()
+            while True:
+                try:
+                    payload = await asyncio.wait_for(q.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield _snapshot_event() if payload is RESYNC else payload
+        finally:
+            hub.unsubscribe(q)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/bins/{bin_id}", response_model=BinOut)
-def get_bin(bin_id: str):
-    doc = bins_col.find_one({"bin_id": bin_id})
+async def get_bin(bin_id: str):
+    doc = registry.get(bin_id)
     if not doc:
-        raise HTTPException(status_code=404, detail=f"Bin '{bin_id}' not found")
+        # May have been registered through another worker since the last resync
+        doc = await bins_col.find_one({"bin_id": bin_id})
+        if not doc:
+            raise HTTPException(status_code=404, detail=f"Bin '{bin_id}' not found")
+        registry.put(doc)
     return doc_to_bin_out(doc)
 
+@app.get("/bins/{bin_id}/history")
+async def get_bin_history(
+    bin_id: str,
+    start: Optional[float] = Query(default=None, alias="from"),
+    end: Optional[float] = Query(default=None, alias="to"),
+    max_points: int = Query(default=500, ge=1, le=MAX_HISTORY_POINTS),
+):
+    """
+    Fill history between `from` and `to` (unix seconds; default the last 24h),
+    downsampled in Mongo to at most `max_points` min/max/avg buckets.
+    Also works for deleted bins whose telemetry is still retained.
+    """
+    end = time.time() if end is None else end
+    start = end - 86400 if start is None else start
+    if start >= end:
+        raise HTTPException(status_code=422, detail="'from' must be before 'to'")
+    return StreamingResponse(
+        stream_history(telemetry_col.database, bin_id, start, end, max_points),
+        media_type="application/json",
+    )
+
 @app.post("/bins/{bin_id}/emptied", response_model=BinOut)
-def mark_emptied(bin_id: str):
+async def mark_emptied(bin_id: str):
     now = time.time()
-    doc = bins_col.find_one_and_update(
+    prev = registry.get(bin_id) or {}
+    doc = await bins_col.find_one_and_update(
         {"bin_id": bin_id},
-        {"$set": {"last_emptied_at": now, "fill_percent": 0.0, "distance_cm": _fill_to_distance(0.0)}},
+        {"$set": {
+            "last_emptied_at": now,
+            "fill_percent": 0.0,
+            "distance_cm": _fill_to_distance(0.0),
+            "predicted_full_at": predict_full_at(0.0, now, prev.get("fill_rate", 0.0), prev.get("fill_rate_weight", 0.0)),
+        }},
         return_document=True,
     )
     if not doc:
         raise HTTPException(status_code=404, detail=f"Bin '{bin_id}' not found")
+    registry.put(doc)
     return doc_to_bin_out(doc)
 
+def registration_update(data: BinRegister, now: float) -> dict:
+    """
+    Upsert for a bin registration: metadata is always set, while fill and
+    timestamps are only written when the bin is new, so telemetry on a bin
+    auto-created by a sensor is kept.
+    """
+    return {
+        "$set": {
+            "name": data.name,
+            "location": {"lat": data.lat, "lng": data.lng},
+            "geo": geo_point(data.lat, data.lng),
+        },
+        "$setOnInsert": {
+            "fill_percent": data.fill_percent,
+            "distance_cm": _fill_to_distance(data.fill_percent),
+            "last_seen_at": now,
+            "last_emptied_at": now,
+        },
+    }
+
+def _apply_registration(bin_id: str, update: dict, created: bool):
+    """Mirror a registration upsert into the registry."""
+    if created:
+        registry.put({"bin_id": bin_id, **update["$set"], **update["$setOnInsert"]})
+    else:
+        registry.update(bin_id, update["$set"])
+
 @app.post("/bins/register")
-def register_bin(data: BinRegister):
+async def register_bin(data: BinRegister):
     """
     Register bin metadata (name, location).
     Upserts to handle bins that were auto-created by telemetry.
     """
-    now = time.time()
+    update = registration_update(data, time.time())
+    result = await bins_col.update_one({"bin_id": data.bin_id}, update, upsert=True)
+    created = result.upserted_id is not None
+    _apply_registration(data.bin_id, update, created)
+    return {"status": "created" if created else "updated", "bin_id": data.bin_id}
 
-    # Check if bin exists
-    existing = bins_col.find_one({"bin_id": data.bin_id})
-
-    if existing:
-        # Update metadata only, preserve telemetry data
-        bins_col.update_one(
-            {"bin_id": data.bin_id},
-            {"$set": {
-                "name": data.name,
-                "location": {"lat": data.lat, "lng": data.lng},
-            }}
+@app.post("/bins/register/batch")
+async def register_bins_batch(bins: list[BinRegister]):
+    """
+    Register many bins with one unordered bulk upsert (same rules as
+    /bins/register). If a bin_id repeats, the last entry wins.
+    """
+    if len(bins) > MAX_REGISTER_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(bins)} bins (max {MAX_REGISTER_BATCH})"
         )
-        return {"status": "updated", "bin_id": data.bin_id}
-    else:
-        # Create new bin with metadata and specified fill
-        fill_pct = data.fill_percent
-        distance = _fill_to_distance(fill_pct)
+    last: dict[str, int] = {b.bin_id: i for i, b in enumerate(bins)}
+    statuses = ["superseded"] * len(bins)
+    now = time.time()
+    op_idx = list(last.values())
+    updates = [registration_update(bins[i], now) for i in op_idx]
+    ops = [UpdateOne({"bin_id": bins[i].bin_id}, u, upsert=True) for i, u in zip(op_idx, updates)]
 
-        doc = {
-            "bin_id": data.bin_id,
-            "name": data.name,
-            "location": {"lat": data.lat, "lng": data.lng},
-            "fill_percent": fill_pct,
-            "distance_cm": distance,
-            "last_seen_at": now,
-            "last_emptied_at": now,
-        }
-        bins_col.insert_one(doc)
-        return {"status": "created", "bin_id": data.bin_id}
+    upserted: set[int] = set()
+    failed: set[int] = set()
+    if ops:
+        try:
+            result = await bins_col.bulk_write(ops, ordered=False)
+            upserted = set(result.upserted_ids)
+        except BulkWriteError as e:
+            upserted = {u["index"] for u in e.details.get("upserted", [])}
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+    for k, (i, u) in enumerate(zip(op_idx, updates)):
+        if k in failed:
+            statuses[i] = "error"
+            continue
+        statuses[i] = "created" if k in upserted else "updated"
+        _apply_registration(bins[i].bin_id, u, k in upserted)
+
+    results = [{"index": i, "bin_id": b.bin_id, "status": statuses[i]} for i, b in enumerate(bins)]
+    return {
+        "status": "partial" if failed else "ok",
+        "received": len(bins),
+        "created": statuses.count("created"),
+        "updated": statuses.count("updated"),
+        "results": results,
+    }
 
 @app.delete("/bins/{bin_id}")
-def delete_bin(bin_id: str):
+async def delete_bin(bin_id: str):
     """
     Delete a bin from the registry.
-    Telemetry history is preserved for audit trail.
+    Telemetry history is kept for audit trail (subject to the retention tiers).
     """
-    result = bins_col.delete_one({"bin_id": bin_id})
+    result = await bins_col.delete_one({"bin_id": bin_id})
     if result.deleted_count == 0:
         raise HTTPException(
             status_code=404,
             detail=f"Bin '{bin_id}' not found"
         )
+    registry.remove(bin_id)
     return {"status": "deleted", "bin_id": bin_id}
 
 @app.get("/heatmap", response_model=list[HeatmapPoint])
-def get_heatmap(minutes: int = Query(default=120, ge=1)):
-    cutoff = time.time() - minutes * 60
-    pipeline = [
-        {"$match": {"ts": {"$gte": cutoff}}},
-        {"$group": {"_id": "$bin_id", "avg_fill": {"$avg": "$fill_percent"}}},
-    ]
-    agg_results = {r["_id"]: r["avg_fill"] for r in telemetry_col.aggregate(pipeline)}
+async def get_heatmap(minutes: int = Query(default=120, ge=1)):
+    """Average fill per bin over the last `minutes`, summed from rollup buckets."""
+    cached = heatmap_cache.get(minutes)
+    if cached is not None:
+        return cached
+
+    now = time.time()
+    cursor = await rollups_col.aggregate(window_average_pipeline(now - minutes * 60, now))
+    agg_results = {r["_id"]: r["avg_fill"] async for r in cursor}
 
     points = []
-    for doc in bins_col.find():
+    for doc in registry.all():
         bin_id = doc["bin_id"]
         fill = agg_results.get(bin_id, doc.get("fill_percent", 0.0))
         loc = doc.get("location", {})
@@ -294,89 +862,204 @@ def get_heatmap(minutes: int = Query(default=120, ge=1)):
             lng=loc.get("lng", 0.0),
             weight=round(fill / 100.0, 3),
         ))
+    heatmap_cache.set(minutes, points)
     return points
 
 @app.get("/route", response_model=RouteOut)
-def get_route(
+async def get_route(
+    response: Response,
     start: str = Query(..., description="Starting bin_id"),
     end: str = Query(..., description="Ending bin_id"),
+    solver: str = Query(default="greedy", description=f"One of: {', '.join(ROUTE_SOLVERS)}"),
+    max_stops: int = Query(default=10, ge=1, le=MAX_ROUTE_STOPS),
+    time_budget_ms: int = Query(default=200, ge=10, le=5000, description="Solver time budget (pctsp)"),
+    radius_km: float = Query(default=ROUTE_RADIUS_KM, gt=0, description="Only consider bins this close to start or end"),
+    forecast: bool = Query(default=False, description="Prioritize by the fill expected when the truck arrives"),
 ):
-    all_docs = {d["bin_id"]: d for d in bins_col.find()}
-    if start not in all_docs:
+    if solver not in ROUTE_SOLVERS:
+        raise HTTPException(status_code=422, detail=f"Unknown solver '{solver}'")
+    if start not in registry:
         raise HTTPException(status_code=404, detail=f"Start bin '{start}' not found")
-    if end not in all_docs:
+    if end not in registry:
         raise HTTPException(status_code=404, detail=f"End bin '{end}' not found")
 
+    cache_key = (start, end, solver, max_stops, time_budget_ms, radius_km, forecast, route_state.version)
+    cached = route_cache.get(cache_key)
+    if cached is not None:
+        response.headers["X-Cache"] = "HIT"
+        return cached
+    response.headers["X-Cache"] = "MISS"
+
+    # Node 0 is start, node 1 is end (unless start == end), then bins near either
+    nearby: set[str] = set()
+    for bid in {start, end}:
+        loc = registry.get(bid).get("location", {})
+        nearby.update(registry.spatial.within_km(loc.get("lat", 0.0), loc.get("lng", 0.0), radius_km))
+    ids = [start] if start == end else [start, end]
+    ids += sorted(nearby - {start, end})
+    docs = [registry.get(bid) for bid in ids]
+    coords = [(d.get("location", {}).get("lat", 0.0), d.get("location", {}).get("lng", 0.0)) for d in docs]
+    current_fills = np.array([d.get("fill_percent", 0.0) for d in docs])
+    emptied = np.array([d.get("last_emptied_at") or np.nan for d in docs], dtype=float)
+    rates = np.array([d.get("fill_rate", 0.0) for d in docs])
     now = time.time()
+    # Road distances may run shortest-path searches, so everything touching them stays off the event loop
+    with timed("score"):
+        dist = await run_in_threadpool(RoadDistanceMatrix, coords, roads) if roads else DistanceMatrix(coords)
+        if forecast:
+            # Arrival estimated as driving directly from the start; the route only gets longer
+            eta_hours = await run_in_threadpool(dist.row, 0) / ROUTE_SPEED_KMH
+            fills = project_fill(current_fills, rates, eta_hours)
+            prizes = bin_priorities(fills, emptied, now + eta_hours * 3600.0)
+        else:
+            fills = current_fills
+            prizes = bin_priorities(fills, emptied, now)
+    end_idx = ids.index(end)
 
-    def compute_priority(doc: dict) -> float:
-        fill = doc.get("fill_percent", 0.0)
-        emptied_at = doc.get("last_emptied_at")
-        if emptied_at:
-            hours_since = (now - emptied_at) / 3600.0
+    # Candidates: bins with fill >= ROUTE_MIN_FILL, excluding start and end
+    n_fixed = 1 if start == end else 2
+    candidates = (np.flatnonzero(fills[n_fixed:] >= ROUTE_MIN_FILL) + n_fixed).tolist()
+
+    with timed("solve", SOLVER_SECONDS.labels(solver)):
+        if solver == "pctsp":
+            order = await run_in_threadpool(
+                pctsp_route, dist, prizes, 0, end_idx, candidates, max_stops,
+                DISTANCE_PENALTY_PER_KM, time_budget_ms / 1000.0,
+            )
+        elif roads:
+            order = await run_in_threadpool(
+                greedy_route, dist, prizes, 0, end_idx, candidates, max_stops, DISTANCE_PENALTY_PER_KM,
+            )
         else:
-            hours_since = 48.0
-        return 0.7 * (fill / 100.0) + 0.3 * min(hours_since / 24.0, 1.0)
+            order = greedy_route(dist, prizes, 0, end_idx, candidates, max_stops, DISTANCE_PENALTY_PER_KM)
+    SOLVER_STOPS.labels(solver).observe(len(order))
 
-    # Candidates: bins with fill >= 10%, excluding start and end
-    candidates = {}
-    for bid, doc in all_docs.items():
-        if bid in (start, end):
-            continue
-        if doc.get("fill_percent", 0.0) >= 10.0:
-            candidates[bid] = doc
-
-    # Greedy route building
-    route_ids = [start]
-    current = all_docs[start]
-    visited = {start}
-
-    for _ in range(min(10, len(candidates))):
-        best_bid = None
-        best_score = -float("inf")
-        cur_loc = current.get("location", {})
-        cur_lat = cur_loc.get("lat", 0.0)
-        cur_lng = cur_loc.get("lng", 0.0)
-
-        for bid, doc in candidates.items():
-            if bid in visited:
-                continue
-            loc = doc.get("location", {})
-            dist_km = haversine_km(cur_lat, cur_lng, loc.get("lat", 0.0), loc.get("lng", 0.0))
-            score = compute_priority(doc) - DISTANCE_PENALTY_PER_KM * dist_km
-            if score > best_score:
-                best_score = score
-                best_bid = bid
-
-        if best_bid is None:
-            break
-        visited.add(best_bid)
-        route_ids.append(best_bid)
-        current = candidates[best_bid]
-
-    if end not in visited:
-        route_ids.append(end)
+    projected = [None] * len(order)
+    if forecast:
+        # Expected fill at each stop's arrival along the chosen route
+        arrival_km = np.concatenate([[0.0], np.cumsum([dist(a, b) for a, b in zip(order, order[1:])])])
+        projected = np.round(project_fill(current_fills[order], rates[order], arrival_km / ROUTE_SPEED_KMH), 1).tolist()
 
     # Build response
     stops = []
-    polyline = []
-    for order, bid in enumerate(route_ids):
-        doc = all_docs[bid]
-        loc = doc.get("location", {})
-        lat = loc.get("lat", 0.0)
-        lng = loc.get("lng", 0.0)
+    for position, idx in enumerate(order):
+        doc = docs[idx]
+        lat, lng = coords[idx]
         stops.append(RouteStop(
-            bin_id=bid,
+            bin_id=ids[idx],
             name=doc.get("name", "Unknown"),
             lat=lat,
             lng=lng,
             fill_percent=doc.get("fill_percent", 0.0),
-            priority=round(compute_priority(doc), 3),
-            order=order,
+            priority=round(float(prizes[idx]), 3),
+            order=position,
+            projected_fill_percent=projected[position],
         ))
-        polyline.append([lat, lng])
+    if roads:
+        with timed("polyline"):
+            polyline = await run_in_threadpool(roads.polyline, [coords[idx] for idx in order])
+    else:
+        polyline = [list(coords[idx]) for idx in order]
+
+    out = RouteOut(stops=stops, polyline=polyline)
+    route_cache.set(cache_key, out)
+    return out
+
+def cache_stats() -> dict[str, dict]:
+    stats = {
+        "route": route_cache.stats(),
+        "heatmap": heatmap_cache.stats(),
+        "bins_body": bins_body_cache.stats(),
+    }
+    if roads:
+        stats["road_distances"] = roads.distances.stats()
+        stats["road_paths"] = roads.paths.stats()
+    return stats
+
+register_caches(cache_stats)
 
-    return RouteOut(stops=stops, polyline=polyline)
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters for the in-process caches."""
+    stats = cache_stats()
+    stats["route"]["state_version"] = route_state.version
+    return stats
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: request and Mongo latency, ingest, caches, route solvers (see metrics.py)."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.post("/routes/plan", response_model=RoutePlanOut)
+async def plan_fleet_routes(plan: RoutePlanIn):
+    """Split bins over a fleet of capacity- and shift-limited vehicles (see vrp.py)."""
+    if plan.method not in PLAN_METHODS:
+        raise HTTPException(status_code=422, detail=f"Unknown method '{plan.method}'")
+    if not plan.vehicles or len(plan.vehicles) > MAX_PLAN_VEHICLES:
+        raise HTTPException(status_code=422, detail=f"Plan needs 1-{MAX_PLAN_VEHICLES} vehicles")
+    depot_index = {d.depot_id: i for i, d in enumerate(plan.depots)}
+    for v in plan.vehicles:
+        if v.depot_id not in depot_index:
+            raise HTTPException(status_code=422, detail=f"Vehicle '{v.vehicle_id}' has unknown depot '{v.depot_id}'")
+
+    if plan.bin_ids is not None:
+        missing = [bid for bid in plan.bin_ids if bid not in registry]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Bins not found: {', '.join(missing[:10])}")
+        docs = [registry.get(bid) for bid in dict.fromkeys(plan.bin_ids)]
+    else:
+        docs = registry.all()
+    # Bins created by telemetry alone have no location to drive to
+    docs = [d for d in docs if "location" in d and d.get("fill_percent", 0.0) >= plan.min_fill]
+
+    depots = [(d.lat, d.lng) for d in plan.depots]
+    coords = [(d["location"].get("lat", 0.0), d["location"].get("lng", 0.0)) for d in docs]
+    fills = np.array([d.get("fill_percent", 0.0) for d in docs], dtype=float)
+    emptied = np.array([d.get("last_emptied_at") or np.nan for d in docs], dtype=float)
+    prizes = bin_priorities(fills, emptied, time.time())
+    demands = np.clip(fills, 0.0, 100.0) / 100.0
+    vehicles = [(depot_index[v.depot_id], v.capacity, v.shift_minutes / 60.0) for v in plan.vehicles]
+
+    with timed("solve", SOLVER_SECONDS.labels(plan.method)):
+        routes, unassigned = await asyncio.get_running_loop().run_in_executor(
+            plan_pool, plan_routes, depots, coords, demands.tolist(), prizes.tolist(), vehicles,
+            ROUTE_SPEED_KMH, SERVICE_MINUTES_PER_STOP / 60.0, plan.method, plan.time_budget_ms / 1000.0,
+        )
+    for route in routes:
+        SOLVER_STOPS.labels(plan.method).observe(len(route))
+
+    out = []
+    total_km = 0.0
+    for v, (depot_idx, _, _), route in zip(plan.vehicles, vehicles, routes):
+        path = [depots[depot_idx], *(coords[i] for i in route), depots[depot_idx]]
+        km = sum(haversine_km(*a, *b) for a, b in zip(path, path[1:]))
+        total_km += km
+        hours = route_duration_hours(km, len(route), ROUTE_SPEED_KMH, SERVICE_MINUTES_PER_STOP / 60.0)
+        out.append(VehicleRoute(
+            vehicle_id=v.vehicle_id,
+            depot_id=v.depot_id,
+            stops=[
+                RouteStop(
+                    bin_id=docs[i]["bin_id"],
+                    name=docs[i].get("name", "Unknown"),
+                    lat=coords[i][0],
+                    lng=coords[i][1],
+                    fill_percent=docs[i].get("fill_percent", 0.0),
+                    priority=round(float(prizes[i]), 3),
+                    order=position,
+                )
+                for position, i in enumerate(route)
+            ],
+            load=round(float(demands[route].sum()), 3),
+            distance_km=round(km, 3),
+            duration_minutes=round(hours * 60.0, 1),
+            polyline=[list(p) for p in path],
+        ))
+    return RoutePlanOut(
+        routes=out,
+        unassigned=[docs[i]["bin_id"] for i in unassigned],
+        distance_km=round(total_km, 3),
+    )
 
 # ----------------------------
 # RUN
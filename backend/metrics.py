@@ -0,0 +1,153 @@
+"""
+Prometheus metrics and Server-Timing headers.
+
+MetricsMiddleware times every HTTP request per route template. It also
+answers with a Server-Timing header listing where the time went:
+  app    -- handler, including response serialization
+  mongo  -- time spent in Mongo commands for this request
+  and any spans a handler adds with timed(), e.g. solve or encode.
+Mongo commands are timed by MongoCommandTimer, a pymongo CommandListener
+passed to the API's client.
+
+Metrics are per process. /metrics exposes this worker's registry, so run
+each worker on its own port or scrape them all if you add workers.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to the response headers, per route",
+    ["method", "route", "status"],
+)
+MONGO_SECONDS = Histogram(
+    "mongo_command_duration_seconds", "Mongo command round trips",
+    ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+MONGO_FAILURES = Counter("mongo_command_failures_total", "Mongo commands that failed", ["command", "collection"])
+TELEMETRY_READINGS = Counter("telemetry_readings_total", "Sensor readings stored", ["endpoint"])
+SOLVER_SECONDS = Histogram(
+    "route_solver_duration_seconds", "Route solver time (/route solvers and /routes/plan methods)",
+    ["solver"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+SOLVER_STOPS = Histogram(
+    "route_solver_stops", "Stops on the routes a solver returned",
+    ["solver"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000),
+)
+
+# Server-Timing spans (name -> seconds) of the request being handled
+_timings: ContextVar[Optional[dict[str, float]]] = ContextVar("server_timings", default=None)
+
+def record(name: str, seconds: float):
+    """Add seconds to the current request's Server-Timing span `name` (no-op outside a request)."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+@contextmanager
+def timed(name: str, histogram: Optional[Histogram] = None):
+    """Time a block into the Server-Timing span `name`, and into histogram if given."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        record(name, elapsed)
+        if histogram is not None:
+            histogram.observe(elapsed)
+
+def server_timing(timings: dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+class MetricsMiddleware:
+    """ASGI middleware: request latency histogram and Server-Timing header."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: dict[str, float] = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+        elapsed = None
+
+        async def send_with_timing(message):
+            nonlocal status, elapsed
+            if message["type"] == "http.response.start":
+                # Streams (e.g. /bins/stream) are timed to their first byte, not their whole life
+                status = message["status"]
+                elapsed = time.perf_counter() - start
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing({"app": elapsed, **timings}))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status),
+            ).observe(elapsed if elapsed is not None else time.perf_counter() - start)
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Times Mongo commands into MONGO_SECONDS and the issuing request's `mongo` span."""
+    def __init__(self):
+        # (connection, request id) -> (command, collection, request timings)
+        self._pending: dict[tuple, tuple[str, str, Optional[dict[str, float]]]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get("collection", "")  # getMore names it here
+        self._pending[(event.connection_id, event.request_id)] = (
+            event.command_name, target if isinstance(target, str) else "", _timings.get(),
+        )
+
+    def _finish(self, event, failed: bool):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        command, collection, timings = pending
+        seconds = event.duration_micros / 1e6
+        MONGO_SECONDS.labels(command, collection).observe(seconds)
+        if failed:
+            MONGO_FAILURES.labels(command, collection).inc()
+        if timings is not None:
+            timings["mongo"] = timings.get("mongo", 0.0) + seconds
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finish(event, failed=True)
+
+class CacheCollector:
+    """Exports hits, misses and entries of the in-process caches, read at scrape time."""
+    def __init__(self, stats: Callable[[], dict[str, dict]]):
+        self.stats = stats
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache lookups that hit", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache lookups that missed", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entries held", labels=["cache"])
+        for name, s in self.stats().items():
+            hits.add_metric([name], s["hits"])
+            misses.add_metric([name], s["misses"])
+            entries.add_metric([name], s["size"])
+        yield from (hits, misses, entries)
+
+def register_caches(stats: Callable[[], dict[str, dict]]):
+    REGISTRY.register(CacheCollector(stats))
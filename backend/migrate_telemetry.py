@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Move telemetry history from a plain `telemetry` collection into the
+time-series tiers (see retention.py).
+
+    python migrate_telemetry.py [--drop-legacy]
+
+Stop the backend first: readings posted mid-migration would recreate
+`telemetry` as a plain collection. The old collection is renamed to
+`telemetry_legacy` and copied bin by bin, so an interrupted run can simply be
+started again. Every reading is copied, the hourly/daily tiers are built from
+them, and only then is raw retention switched on and older raw rows expired.
+"""
+import argparse
+import asyncio
+
+from pymongo import ASCENDING
+
+import retention
+from db import client, db
+
+LEGACY_COLLECTION = "telemetry_legacy"
+BATCH_SIZE = 10_000
+
+async def collection_types() -> dict[str, str]:
+    return {c["name"]: c.get("type", "collection") async for c in await db.list_collections()}
+
+async def copy_bin(bin_id: str) -> int:
+    """Copy one bin's readings newer than what the time-series collection already has."""
+    raw = db[retention.TELEMETRY_COLLECTION]
+    last = await raw.find_one({"bin_id": bin_id}, {"ts": 1}, sort=[("at", -1)])
+    query = {"bin_id": bin_id}
+    if last is not None:
+        query["ts"] = {"$gt": last["ts"]}
+    copied = 0
+    batch = []
+    cursor = db[LEGACY_COLLECTION].find(query, {"_id": 0}).sort("ts", ASCENDING).batch_size(BATCH_SIZE)
+    async for doc in cursor:
+        doc["at"] = retention.ts_to_datetime(doc["ts"])
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            await raw.insert_many(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+    if batch:
+        await raw.insert_many(batch, ordered=False)
+        copied += len(batch)
+    return copied
+
+async def migrate(drop_legacy: bool):
+    types = await collection_types()
+    if types.get(retention.TELEMETRY_COLLECTION) == "timeseries" and LEGACY_COLLECTION not in types:
+        print("telemetry is already a time-series collection; nothing to migrate.")
+        return
+    if retention.TELEMETRY_COLLECTION in types and types[retention.TELEMETRY_COLLECTION] != "timeseries":
+        if LEGACY_COLLECTION in types:
+            raise SystemExit(f"Both telemetry and {LEGACY_COLLECTION} are plain collections; resolve manually.")
+        print(f"Renaming telemetry -> {LEGACY_COLLECTION}")
+        await db[retention.TELEMETRY_COLLECTION].rename(LEGACY_COLLECTION)
+        types = await collection_types()
+
+    # Create every tier without TTL so nothing expires before it is downsampled
+    for name, spec in retention.collection_specs().items():
+        if name not in types:
+            await db.create_collection(name, timeseries=spec["timeseries"])
+        await db[name].create_index([("bin_id", 1), ("at", 1)])
+
+    bin_ids = await db[LEGACY_COLLECTION].distinct("bin_id")
+    total = 0
+    for i, bin_id in enumerate(bin_ids, 1):
+        total += await copy_bin(bin_id)
+        print(f"\r  copied {total:,} readings ({i}/{len(bin_ids)} bins)", end="", flush=True)
+    print()
+
+    print("Building hourly and daily tiers...")
+    written = await retention.downsample(db)
+    print(f"  wrote {written:,} buckets")
+
+    # Switch retention on; the TTL monitor then expires raw rows past TELEMETRY_RAW_DAYS
+    await retention.ensure_collections(db)
+    await retention.prune_rollups(db)
+
+    if drop_legacy:
+        await db[LEGACY_COLLECTION].drop()
+        print(f"Dropped {LEGACY_COLLECTION}")
+    else:
+        print(f"Kept {LEGACY_COLLECTION}; rerun with --drop-legacy once satisfied")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drop-legacy", action="store_true", help=f"Drop {LEGACY_COLLECTION} after copying")
+    args = parser.parse_args()
+    try:
+        await migrate(args.drop_legacy)
+    finally:
+        await client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Fast encoding for large API responses.
+
+Callers pass plain dicts and lists, not Pydantic models. They are serialized
+with orjson, or with MessagePack when the client sends
+Accept: application/msgpack. Bodies of COMPRESS_MIN_BYTES or more are
+compressed with brotli or gzip, according to Accept-Encoding.
+
+msgpack and brotli are optional installs. Without them, that format or
+encoding is never picked.
+"""
+import gzip
+from typing import Any, Optional
+
+import orjson
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+_MSGPACK_ALIASES = (MSGPACK_TYPE, "application/x-msgpack")
+
+# Smaller bodies aren't worth the CPU (and often grow when compressed)
+COMPRESS_MIN_BYTES = 1024
+
+# Fast settings: most of the size win at a fraction of the max-level CPU cost
+GZIP_LEVEL = 1
+BROTLI_QUALITY = 4
+
+def _accepted(header: str) -> dict[str, float]:
+    """Header tokens -> q value, e.g. 'gzip, br;q=0.5' -> {'gzip': 1.0, 'br': 0.5}."""
+    out = {}
+    for part in header.split(","):
+        token, *params = (p.strip() for p in part.split(";"))
+        if not token:
+            continue
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        out[token.lower()] = q
+    return out
+
+def negotiate(accept: str, accept_encoding: str) -> tuple[str, Optional[str]]:
+    """(media type, content encoding or None) to answer a request with."""
+    media_type = JSON_TYPE
+    if msgpack is not None:
+        types = _accepted(accept)
+        if any(types.get(t, 0.0) > 0.0 for t in _MSGPACK_ALIASES):
+            media_type = MSGPACK_TYPE
+    encodings = _accepted(accept_encoding)
+    encoding = None
+    if brotli is not None and encodings.get("br", 0.0) > 0.0:
+        encoding = "br"
+    elif encodings.get("gzip", 0.0) > 0.0:
+        encoding = "gzip"
+    return media_type, encoding
+
+def encode(content: Any, media_type: str, encoding: Optional[str]) -> tuple[bytes, Optional[str]]:
+    """(body, Content-Encoding actually applied) for content."""
+    if media_type == MSGPACK_TYPE:
+        body = msgpack.packb(content)
+    else:
+        body = orjson.dumps(content)
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+
+# Per-representation ETag suffixes: one bins version as gzip, brotli or identity,
+# JSON or MessagePack, is a different body and must not share a strong ETag
+_TYPE_TAGS = {JSON_TYPE: "", MSGPACK_TYPE: "-mp"}
+_ENCODING_TAGS = {None: "", "gzip": "-gz", "br": "-br"}
+
+def etag(version: str, media_type: str, encoding: Optional[str]) -> str:
+    """Strong ETag for `version` served as (media type, negotiated encoding)."""
+    return f'"{version}{_TYPE_TAGS[media_type]}{_ENCODING_TAGS[encoding]}"'
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """True if an If-None-Match header lists tag (or is *). Comparison is weak, so a W/ added by a proxy still matches."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == tag:
+            return True
+    return False
+
+def headers_for(media_type: str, applied: Optional[str]) -> dict[str, str]:
+    headers = {"Content-Type": media_type, "Vary": "Accept, Accept-Encoding"}
+    if applied:
+        headers["Content-Encoding"] = applied
+    return headers
@@ -0,0 +1,185 @@
+"""
+In-memory copy of the bins collection.
+
+Loaded once at startup and updated write-through by the API so read endpoints
+never scan Mongo. Each uvicorn worker holds its own copy; a change stream
+(replica sets / Atlas) or a periodic resync keeps workers consistent.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from spatial import GridIndex
+
+log = logging.getLogger(__name__)
+
+# Fallback full reload interval when change streams are unavailable (standalone mongod)
+REGISTRY_RESYNC_SECONDS = float(os.getenv("REGISTRY_RESYNC_SECONDS", "30"))
+
+class BinRegistry:
+    """
+    Bin documents keyed by bin_id (stored without Mongo's _id).
+
+    Every change bumps a process-wide version counter and stamps the bin with
+    it, so pollers can ask for only what changed since the version they hold.
+    """
+    def __init__(self):
+        self._docs: dict[str, dict] = {}
+        self._ids: dict[object, str] = {}  # Mongo _id -> bin_id, for change-stream deletes
+        self._versions: OrderedDict[str, int] = OrderedDict()  # bin_id -> version, oldest first
+        self._removed: dict[str, int] = {}  # tombstones: bin_id -> version it was deleted at
+        self.version = 0
+        # Versions are per process; the epoch keeps cursors and ETags from matching across workers
+        self.epoch = uuid.uuid4().hex[:8]
+        self.loaded_at = 0.0
+        # Located bins only (telemetry-created bins have no location until registered)
+        self.spatial = GridIndex()
+        # Called with the bin_id of every changed or removed bin
+        self.listeners: list[Callable[[str], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, bin_id: str) -> bool:
+        return bin_id in self._docs
+
+    def get(self, bin_id: str) -> Optional[dict]:
+        return self._docs.get(bin_id)
+
+    def all(self) -> list[dict]:
+        return list(self._docs.values())
+
+    @property
+    def cursor(self) -> str:
+        """`<epoch>-<version>`: what clients pass back as ?since= (a bare version could be another process's)."""
+        return f"{self.epoch}-{self.version}"
+
+    def _bump(self, bin_id: str):
+        self.version += 1
+        self._versions[bin_id] = self.version
+        self._versions.move_to_end(bin_id)
+        self._removed.pop(bin_id, None)
+        self._index(self._docs[bin_id])
+        self._notify(bin_id)
+
+    def _index(self, doc: dict):
+        loc = doc.get("location")
+        if loc and "lat" in loc and "lng" in loc:
+            self.spatial.insert(doc["bin_id"], loc["lat"], loc["lng"])
+        else:
+            self.spatial.remove(doc["bin_id"])
+
+    def _notify(self, bin_id: str):
+        for listener in self.listeners:
+            listener(bin_id)
+
+    def put(self, doc: dict):
+        """Insert or replace a full bin document."""
+        doc = dict(doc)
+        if "_id" in doc:
+            self._ids[doc.pop("_id")] = doc["bin_id"]
+        if self._docs.get(doc["bin_id"]) != doc:
+            self._docs[doc["bin_id"]] = doc
+            self._bump(doc["bin_id"])
+
+    def update(self, bin_id: str, fields: dict):
+        """Apply a $set-style update, creating the bin if needed (mirrors upsert=True)."""
+        doc = self._docs.get(bin_id)
+        if doc is None:
+            self._docs[bin_id] = {"bin_id": bin_id, **fields}
+        else:
+            doc.update(fields)
+        self._bump(bin_id)
+
+    def remove(self, bin_id: str) -> bool:
+        if self._docs.pop(bin_id, None) is None:
+            return False
+        self._ids = {k: v for k, v in self._ids.items() if v != bin_id}
+        self._versions.pop(bin_id, None)
+        self.spatial.remove(bin_id)
+        self.version += 1
+        self._removed[bin_id] = self.version
+        self._notify(bin_id)
+        return True
+
+    def replace_all(self, docs: list[dict]):
+        """Swap in a fresh snapshot, bumping only bins that actually changed."""
+        seen = set()
+        for doc in docs:
+            seen.add(doc["bin_id"])
+            self.put(doc)
+        for bin_id in [b for b in self._docs if b not in seen]:
+            self.remove(bin_id)
+        self.loaded_at = time.time()
+
+    def changed_since(self, cursor: str) -> Optional[tuple[list[dict], list[str]]]:
+        """
+        Bins changed and bin_ids removed after `cursor` (see `cursor`).
+        Returns None if the cursor is not from this process's history, e.g.
+        issued by another worker or before a restart (the caller should send
+        everything).
+        """
+        epoch, _, version = cursor.rpartition("-")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        version = int(version)
+        if version > self.version:
+            return None
+        changed = []
+        for bin_id in reversed(self._versions):
+            if self._versions[bin_id] <= version:
+                break
+            changed.append(self._docs[bin_id])
+        removed = [b for b, v in self._removed.items() if v > version]
+        return changed, removed
+
+    async def load(self, col):
+        self.replace_all(await col.find().to_list(None))
+
+    async def sync_forever(self, col):
+        """Follow the collection's change stream, or poll if the server has none."""
+        while True:
+            try:
+                await self._follow_change_stream(col)
+            except OperationFailure as e:
+                log.info("Change streams unavailable (%s); resyncing every %ss", e, REGISTRY_RESYNC_SECONDS)
+                await self._poll(col)
+                return
+            except PyMongoError as e:
+                log.warning("Registry change stream dropped (%s); reloading", e)
+                await asyncio.sleep(1.0)
+                try:
+                    await self.load(col)
+                except PyMongoError:
+                    pass
+
+    async def _follow_change_stream(self, col):
+        async with await col.watch(full_document="updateLookup") as stream:
+            # Catch up on anything written between the startup load and the watch
+            await self.load(col)
+            async for change in stream:
+                op = change["operationType"]
+                if op in ("insert", "update", "replace") and change.get("fullDocument"):
+                    self.put(change["fullDocument"])
+                elif op == "delete":
+                    bin_id = self._ids.get(change["documentKey"]["_id"])
+                    if bin_id is not None:
+                        self.remove(bin_id)
+                    else:
+                        await self.load(col)
+                elif op in ("drop", "invalidate"):
+                    await self.load(col)
+
+    async def _poll(self, col):
+        while True:
+            await asyncio.sleep(REGISTRY_RESYNC_SECONDS)
+            try:
+                await self.load(col)
+            except PyMongoError as e:
+                log.warning("Registry resync failed: %s", e)
@@ -0,0 +1,241 @@
+"""
+Telemetry storage tiers and retention.
+
+Raw readings live in a MongoDB time-series collection (metaField `bin_id`,
+timeField `at`) and expire after TELEMETRY_RAW_DAYS. A background task
+downsamples them into hourly min/max/avg buckets (kept TELEMETRY_HOURLY_DAYS),
+and hourly buckets into daily ones (kept TELEMETRY_DAILY_DAYS, 0 = forever).
+Each tier records how far it has been built in `telemetry_tiers`, so the task
+resumes where it left off. A worker leases a window before writing it and
+only moves the watermark once its buckets are stored; a window whose write
+failed is cleared and redone on the next pass.
+
+Existing plain `telemetry` collections are converted by migrate_telemetry.py.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+from pymongo import DeleteMany, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+
+from rollups import HOUR, MINUTE, ROLLUP_COLLECTION
+
+log = logging.getLogger(__name__)
+
+DAY = 86400
+
+TELEMETRY_COLLECTION = "telemetry"
+HOURLY_COLLECTION = "telemetry_hourly"
+DAILY_COLLECTION = "telemetry_daily"
+TIER_STATE_COLLECTION = "telemetry_tiers"
+
+TELEMETRY_RAW_DAYS = float(os.getenv("TELEMETRY_RAW_DAYS", "30"))
+TELEMETRY_HOURLY_DAYS = float(os.getenv("TELEMETRY_HOURLY_DAYS", "365"))
+TELEMETRY_DAILY_DAYS = float(os.getenv("TELEMETRY_DAILY_DAYS", "0"))
+TELEMETRY_DOWNSAMPLE_SECONDS = float(os.getenv("TELEMETRY_DOWNSAMPLE_SECONDS", "3600"))
+
+# A period is only downsampled once this long has passed since it closed,
+# so late (buffered) sensor readings still make it into the bucket
+SETTLE_SECONDS = HOUR
+
+# How long a worker may hold a window before another may take it over
+LEASE_SECONDS = 600
+
+# Identifies this process's leases
+_OWNER = uuid.uuid4().hex
+
+# (name, target collection, source collection, period seconds)
+TIERS = (
+    ("hourly", HOURLY_COLLECTION, TELEMETRY_COLLECTION, HOUR),
+    ("daily", DAILY_COLLECTION, HOURLY_COLLECTION, DAY),
+)
+
+def ts_to_datetime(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+def _floor(ts: float, period: int) -> float:
+    return float(ts // period * period)
+
+def collection_specs() -> dict[str, dict]:
+    """create_collection options per telemetry tier."""
+    return {
+        TELEMETRY_COLLECTION: {
+            "timeseries": {"timeField": "at", "metaField": "bin_id", "granularity": "seconds"},
+            "expireAfterSeconds": int(TELEMETRY_RAW_DAYS * DAY),
+        },
+        HOURLY_COLLECTION: {
+            "timeseries": {"timeField": "at", "metaField": "bin_id", "granularity": "hours"},
+            "expireAfterSeconds": int(TELEMETRY_HOURLY_DAYS * DAY) or None,
+        },
+        DAILY_COLLECTION: {
+            "timeseries": {"timeField": "at", "metaField": "bin_id", "granularity": "hours"},
+            "expireAfterSeconds": int(TELEMETRY_DAILY_DAYS * DAY) or None,
+        },
+    }
+
+async def ensure_collections(db):
+    """
+    Create the time-series tiers, or bring their retention in line with config.
+    A legacy plain `telemetry` collection is left alone (and logged) until migrated.
+    """
+    existing = {c["name"]: c async for c in await db.list_collections()}
+    for name, spec in collection_specs().items():
+        info = existing.get(name)
+        if info is None:
+            opts = {k: v for k, v in spec.items() if v is not None}
+            await db.create_collection(name, **opts)
+        elif info.get("type") != "timeseries":
+            log.warning("%s is not a time-series collection; run `python migrate_telemetry.py`", name)
+            continue
+        elif info.get("options", {}).get("expireAfterSeconds") != spec["expireAfterSeconds"]:
+            await db.command("collMod", name, expireAfterSeconds=spec["expireAfterSeconds"] or "off")
+        await db[name].create_index([("bin_id", 1), ("at", 1)])
+
+def downsample_pipeline(start: float, end: float, period: int, from_raw: bool) -> list[dict]:
+    """
+    Group [start, end) of a source tier into `period` buckets per bin.
+    Raw rows contribute one fill_percent each; coarser tiers merge min/max/sum/count.
+    """
+    if from_raw:
+        acc = {
+            "min": {"$min": "$fill_percent"},
+            "max": {"$max": "$fill_percent"},
+            "sum": {"$sum": "$fill_percent"},
+            "count": {"$sum": 1},
+        }
+    else:
+        acc = {
+            "min": {"$min": "$min"},
+            "max": {"$max": "$max"},
+            "sum": {"$sum": "$sum"},
+            "count": {"$sum": "$count"},
+        }
+    unit = "hour" if period == HOUR else "day"
+    return [
+        {"$match": {"at": {"$gte": ts_to_datetime(start), "$lt": ts_to_datetime(end)}}},
+        {"$group": {
+            "_id": {"bin_id": "$bin_id", "at": {"$dateTrunc": {"date": "$at", "unit": unit}}},
+            **acc,
+        }},
+        {"$project": {
+            "_id": 0,
+            "bin_id": "$_id.bin_id",
+            "at": "$_id.at",
+            "ts": {"$divide": [{"$toLong": "$_id.at"}, 1000]},
+            "min": 1,
+            "max": 1,
+            "avg": {"$divide": ["$sum", "$count"]},
+            "sum": 1,
+            "count": 1,
+        }},
+    ]
+
+async def _claim(state, tier: str, start: float, end: float, now: float) -> dict | None:
+    """
+    Lease the window [start, end) of a tier so two workers never both write
+    it. Returns the state as it was before the claim, or None if the
+    watermark moved or another worker holds a live lease.
+    """
+    return await state.find_one_and_update(
+        {"_id": tier, "through": start, "$or": [{"lease_until": {"$exists": False}}, {"lease_until": {"$lt": now}}]},
+        {"$set": {"owner": _OWNER, "lease_until": now + LEASE_SECONDS, "writing": end}},
+        return_document=ReturnDocument.BEFORE,
+    )
+
+async def _commit(state, tier: str, start: float, end: float):
+    """Move the watermark past a window whose buckets are stored, releasing the lease."""
+    await state.update_one(
+        {"_id": tier, "through": start, "owner": _OWNER},
+        {"$set": {"through": end}, "$unset": {"owner": "", "lease_until": "", "writing": ""}},
+    )
+
+async def _release(state, tier: str):
+    """Give up a lease after a failed write; `writing` stays so the next claim cleans up."""
+    await state.update_one({"_id": tier, "owner": _OWNER}, {"$unset": {"owner": "", "lease_until": ""}})
+
+async def _clear_window(target, start: float, end: float):
+    """Remove buckets an earlier, failed attempt may have stored for [start, end)."""
+    try:
+        await target.delete_many({"at": {"$gte": ts_to_datetime(start), "$lt": ts_to_datetime(end)}})
+    except OperationFailure as e:
+        # Time-series deletes by time need MongoDB 7.0; redoing the window beats never finishing it
+        log.warning("Could not clear partly written %s window: %s", target.name, e)
+
+async def _watermark(state, tier: str, source, period: int) -> float | None:
+    doc = await state.find_one({"_id": tier})
+    if doc is None:
+        # First run: start from the oldest reading in the source tier
+        first = await source.find_one({}, {"ts": 1}, sort=[("at", 1)])
+        if first is None:
+            return None
+        try:
+            await state.insert_one({"_id": tier, "through": _floor(first["ts"], period)})
+        except DuplicateKeyError:
+            pass
+        doc = await state.find_one({"_id": tier})
+    return doc["through"]
+
+async def downsample(db, now: float | None = None) -> int:
+    """Build every tier up to its settled end; returns bucket documents written."""
+    now = time.time() if now is None else now
+    state = db[TIER_STATE_COLLECTION]
+    written = 0
+    # Each tier may only cover what its source tier has finished
+    source_through = now - SETTLE_SECONDS
+    for tier, target, source, period in TIERS:
+        start = await _watermark(state, tier, db[source], period)
+        if start is None:
+            source_through = 0.0
+            continue
+        end = _floor(source_through, period)
+        # A day at a time keeps each aggregation and insert small
+        while start < end:
+            stop = min(end, start + DAY)
+            before = await _claim(state, tier, start, stop, time.time())
+            if before is None:
+                break
+            try:
+                if "writing" in before:
+                    await _clear_window(db[target], start, before["writing"])
+                cursor = await db[source].aggregate(downsample_pipeline(start, stop, period, source == TELEMETRY_COLLECTION))
+                buckets = await cursor.to_list(None)
+                if buckets:
+                    await db[target].insert_many(buckets, ordered=False)
+            except Exception:
+                await _release(state, tier)
+                raise
+            await _commit(state, tier, start, stop)
+            written += len(buckets)
+            start = stop
+        source_through = (await state.find_one({"_id": tier}))["through"]
+    return written
+
+async def prune_rollups(db, now: float | None = None):
+    """Drop heatmap rollup buckets past the raw / hourly retention windows."""
+    now = time.time() if now is None else now
+    ops = [DeleteMany({"res": MINUTE, "bucket": {"$lt": now - TELEMETRY_RAW_DAYS * DAY}})]
+    if TELEMETRY_HOURLY_DAYS:
+        ops.append(DeleteMany({"res": HOUR, "bucket": {"$lt": now - TELEMETRY_HOURLY_DAYS * DAY}}))
+    await db[ROLLUP_COLLECTION].bulk_write(ops, ordered=False)
+
+async def is_timeseries(db, name: str) -> bool:
+    async for info in await db.list_collections(filter={"name": name}):
+        return info.get("type") == "timeseries"
+    return False
+
+async def downsample_forever(db):
+    while True:
+        try:
+            # Rows in an unmigrated plain collection have no `at` and would be skipped for good
+            if await is_timeseries(db, TELEMETRY_COLLECTION):
+                written = await downsample(db)
+                await prune_rollups(db)
+                if written:
+                    log.info("Downsampled %d telemetry buckets", written)
+        except PyMongoError as e:
+            log.warning("Telemetry downsampling failed: %s", e)
+        await asyncio.sleep(TELEMETRY_DOWNSAMPLE_SECONDS)
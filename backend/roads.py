@@ -0,0 +1,311 @@
+"""
+Drivable distances and paths over a local road graph.
+
+The graph is read from an OpenStreetMap XML extract (.osm, .osm.gz or
+.osm.bz2; no network access) with a streaming parser. Only ways a truck can
+drive on are kept, and one-way streets are respected. The parsed graph is
+saved next to the extract as <file>.npz and reused while it is newer than the
+extract.
+
+Bins snap to their nearest road node. A stop-to-many distance row comes from
+one Dijkstra search that stops as soon as every target is settled; a leg's
+path comes from A* with a great-circle heuristic, which is admissible because
+no road is shorter than the straight line. Both are kept in LRU caches keyed
+by road node pair, so repeated /route requests over the same area mostly skip
+the searches.
+"""
+import bz2
+import gzip
+import heapq
+import logging
+import math
+import os
+import xml.etree.ElementTree as ET
+from typing import Optional
+
+import numpy as np
+
+from cache import LRUCache
+from geo import haversine_km, haversine_km_many
+from routing import DistanceMatrix
+
+log = logging.getLogger(__name__)
+
+# OSM highway types a collection truck can use
+DRIVABLE = {
+    "motorway", "trunk", "primary", "secondary", "tertiary", "unclassified", "residential",
+    "motorway_link", "trunk_link", "primary_link", "secondary_link", "tertiary_link",
+    "living_street", "service", "road",
+}
+
+# Highway types that are one-way unless tagged otherwise
+IMPLIED_ONEWAY = {"motorway", "motorway_link", "trunk_link"}
+
+# Grid cell (degrees) for snapping coordinates to road nodes
+SNAP_CELL_DEG = 0.005
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+def parse_osm(path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(lats, lngs, edge sources, edge targets) of the drivable network, directed."""
+    coords: dict[int, tuple[float, float]] = {}
+    edges: list[tuple[int, int]] = []
+    with _open(path) as f:
+        way_nodes: list[int] = []
+        tags: dict[str, str] = {}
+        root = None
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == "node":
+                coords[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+                tags = {}
+                root.clear()
+            elif elem.tag == "nd":
+                way_nodes.append(int(elem.get("ref")))
+            elif elem.tag == "tag":
+                tags[elem.get("k")] = elem.get("v")
+            elif elem.tag == "way":
+                highway = tags.get("highway")
+                if highway in DRIVABLE and tags.get("access") not in ("no", "private"):
+                    oneway = tags.get("oneway")
+                    if oneway is None:
+                        oneway = "yes" if highway in IMPLIED_ONEWAY or tags.get("junction") == "roundabout" else "no"
+                    pairs = list(zip(way_nodes, way_nodes[1:]))
+                    if oneway == "-1":
+                        edges.extend((b, a) for a, b in pairs)
+                    else:
+                        edges.extend(pairs)
+                        if oneway not in ("yes", "true", "1"):
+                            edges.extend((b, a) for a, b in pairs)
+                way_nodes, tags = [], {}
+                root.clear()
+            elif elem.tag == "relation":
+                way_nodes, tags = [], {}
+                root.clear()
+
+    # Keep only nodes on drivable ways, renumbered 0..n-1
+    used = sorted({n for e in edges for n in e if n in coords})
+    index = {osm_id: i for i, osm_id in enumerate(used)}
+    latlng = np.array([coords[n] for n in used], dtype=float).reshape(-1, 2)
+    pairs = np.array([(index[a], index[b]) for a, b in edges if a in index and b in index], dtype=np.intp).reshape(-1, 2)
+    return latlng[:, 0], latlng[:, 1], pairs[:, 0], pairs[:, 1]
+
+def _ring(ci: int, cj: int, ring: int) -> list[tuple[int, int]]:
+    """Grid cells on the square ring `ring` cells out from (ci, cj)."""
+    if ring == 0:
+        return [(ci, cj)]
+    cells = [(a, b) for a in range(ci - ring, ci + ring + 1) for b in (cj - ring, cj + ring)]
+    cells += [(a, b) for b in range(cj - ring + 1, cj + ring) for a in (ci - ring, ci + ring)]
+    return cells
+
+class RoadGraph:
+    """Directed road network in CSR form; edge weights are km."""
+    def __init__(self, lats: np.ndarray, lngs: np.ndarray, src: np.ndarray, dst: np.ndarray):
+        self.lats = lats
+        self.lngs = lngs
+        self.n = len(lats)
+        order = np.lexsort((dst, src))
+        src, dst = src[order], dst[order]
+        weights = np.array([
+            haversine_km(lats[a], lngs[a], lats[b], lngs[b]) for a, b in zip(src.tolist(), dst.tolist())
+        ])
+        # Python lists for the scalar search loops
+        self.indptr = np.searchsorted(src, np.arange(self.n + 1)).tolist()
+        self.indices = dst.tolist()
+        self.weights = weights.tolist()
+        self._lat_list = lats.tolist()
+        self._lng_list = lngs.tolist()
+        self._build_snap_grid()
+
+    @classmethod
+    def load(cls, path: str) -> "RoadGraph":
+        cached = path + ".npz"
+        if os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(path):
+            data = np.load(cached)
+            return cls(data["lats"], data["lngs"], data["src"], data["dst"])
+        lats, lngs, src, dst = parse_osm(path)
+        try:
+            np.savez(cached, lats=lats, lngs=lngs, src=src, dst=dst)
+        except OSError as e:
+            log.warning("Could not save parsed road graph to %s: %s", cached, e)
+        return cls(lats, lngs, src, dst)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.indices)
+
+    def points(self, nodes: list[int]) -> list[list[float]]:
+        return [[self._lat_list[n], self._lng_list[n]] for n in nodes]
+
+    def _build_snap_grid(self):
+        ci = np.floor(self.lats / SNAP_CELL_DEG).astype(np.intp)
+        cj = np.floor(self.lngs / SNAP_CELL_DEG).astype(np.intp)
+        order = np.lexsort((cj, ci))
+        keys = np.stack([ci[order], cj[order]], axis=1)
+        starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+        self._cells = {
+            (int(keys[a, 0]), int(keys[a, 1])): order[a:b]
+            for a, b in zip(np.r_[0, starts], np.r_[starts, self.n])
+        } if self.n else {}
+
+    def snap(self, lat: float, lng: float) -> tuple[int, float]:
+        """Nearest road node and its distance (km) from (lat, lng)."""
+        if not self.n:
+            raise ValueError("Road graph is empty")
+        ci, cj = math.floor(lat / SNAP_CELL_DEG), math.floor(lng / SNAP_CELL_DEG)
+        cand = None
+        for ring in range(20):
+            if any((a, b) in self._cells for a, b in _ring(ci, cj, ring)):
+                # The next ring out can still hold a closer node than this one
+                cand = np.concatenate([
+                    self._cells[c] for r in range(ring + 2) for c in _ring(ci, cj, r) if c in self._cells
+                ])
+                break
+        if cand is None:
+            cand = np.arange(self.n)  # far from every road: check them all
+        dists = haversine_km_many(lat, lng, self.lats[cand], self.lngs[cand])
+        k = int(np.argmin(dists))
+        return int(cand[k]), float(dists[k])
+
+    def dijkstra(self, src: int, targets: set[int]) -> dict[int, float]:
+        """Road km from src to each reachable target; stops once all targets are settled."""
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        best = {src: 0.0}
+        done: set[int] = set()
+        remaining = set(targets)
+        found: dict[int, float] = {}
+        heap = [(0.0, src)]
+        while heap and remaining:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done.add(u)
+            if u in remaining:
+                found[u] = d
+                remaining.discard(u)
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                nd = d + weights[k]
+                if nd < best.get(v, math.inf):
+                    best[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return found
+
+    def astar(self, src: int, dst: int) -> Optional[tuple[float, list[int]]]:
+        """(road km, node path) from src to dst, or None if dst is unreachable."""
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        lats, lngs = self._lat_list, self._lng_list
+        goal_lat, goal_lng = lats[dst], lngs[dst]
+        best = {src: 0.0}
+        prev: dict[int, int] = {}
+        done: set[int] = set()
+        heap = [(haversine_km(lats[src], lngs[src], goal_lat, goal_lng), 0.0, src)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u == dst:
+                path = [u]
+                while u != src:
+                    u = prev[u]
+                    path.append(u)
+                return d, path[::-1]
+            if u in done:
+                continue
+            done.add(u)
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                nd = d + weights[k]
+                if nd < best.get(v, math.inf):
+                    best[v] = nd
+                    prev[v] = u
+                    heapq.heappush(heap, (nd + haversine_km(lats[v], lngs[v], goal_lat, goal_lng), nd, v))
+        return None
+
+class RoadRouter:
+    """RoadGraph searches behind LRU caches of node-pair distances and paths."""
+    def __init__(self, graph: RoadGraph, cache_size: int = 200_000, path_cache_size: int = 5_000):
+        self.graph = graph
+        self.distances = LRUCache(maxsize=cache_size)
+        self.paths = LRUCache(maxsize=path_cache_size)
+
+    def distance_row(self, src: int, targets: list[int]) -> list[float]:
+        """Road km from src to each target (inf where unreachable)."""
+        row = [self.distances.get((src, t)) for t in targets]
+        missing = {t for t, d in zip(targets, row) if d is None}
+        if missing:
+            found = self.graph.dijkstra(src, missing)
+            for t in missing:
+                self.distances.set((src, t), found.get(t, math.inf))
+            row = [found.get(t, math.inf) if d is None else d for t, d in zip(targets, row)]
+        return row
+
+    def path(self, src: int, dst: int) -> Optional[list[int]]:
+        if src == dst:
+            return [src]
+        cached = self.paths.get((src, dst))
+        if cached is not None:
+            return cached
+        result = self.graph.astar(src, dst)
+        if result is None:
+            return None
+        km, nodes = result
+        self.distances.set((src, dst), km)
+        self.paths.set((src, dst), nodes)
+        return nodes
+
+    def polyline(self, coords: list[tuple[float, float]]) -> list[list[float]]:
+        """[lat, lng] points along the roads through coords, in order; straight where there is no road path."""
+        snapped = [self.graph.snap(lat, lng)[0] for lat, lng in coords]
+        out: list[list[float]] = []
+        for k, (lat, lng) in enumerate(coords):
+            out.append([lat, lng])
+            if k + 1 < len(coords):
+                nodes = self.path(snapped[k], snapped[k + 1]) or []
+                out.extend(self.graph.points(nodes))
+        return out
+
+class RoadDistanceMatrix(DistanceMatrix):
+    """
+    DistanceMatrix over road km. Each coordinate snaps to its nearest road
+    node, and the walk to and from the road is added at both ends. Pairs with
+    no road path between them fall back to great-circle km.
+
+    One-way streets make it asymmetric: d(i, j) is always read from row i.
+    """
+    symmetric = False
+
+    def __init__(self, coords: list[tuple[float, float]], router: RoadRouter):
+        super().__init__(coords)
+        self.router = router
+        snaps = [router.graph.snap(lat, lng) for lat, lng in zip(self.lats.tolist(), self.lngs.tolist())]
+        self.nodes = [s[0] for s in snaps]
+        self.offsets = np.array([s[1] for s in snaps])
+
+    def row(self, i: int) -> np.ndarray:
+        r = self._rows.get(i)
+        if r is None:
+            road = np.array(self.router.distance_row(self.nodes[i], self.nodes))
+            r = road + self.offsets[i] + self.offsets
+            unreachable = ~np.isfinite(road)
+            if unreachable.any():
+                r[unreachable] = haversine_km_many(self.lats[i], self.lngs[i], self.lats[unreachable], self.lngs[unreachable])
+            r[i] = 0.0
+            self._rows[i] = r
+        return r
+
+    def __call__(self, i: int, j: int) -> float:
+        r = self._lists.get(i)
+        if r is None:
+            r = self._lists[i] = self.row(i).tolist()
+        return r[j]
+
+    def precompute(self):
+        for i in range(self.n):
+            self.row(i)
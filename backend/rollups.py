@@ -0,0 +1,101 @@
+"""
+Per-bin time-bucketed telemetry rollups.
+
+Every ingested reading $inc's a sum/count into a 1-minute and a 1-hour bucket
+for its bin. A heatmap window is then answered from at most ~120 minute
+buckets at the edges plus whole hours in between, instead of every raw row.
+
+Backfill rollups from existing telemetry with:
+    python rollups.py backfill
+"""
+import math
+import sys
+from collections import defaultdict
+from typing import Iterable
+
+from pymongo import UpdateOne
+
+MINUTE = 60
+HOUR = 3600
+RESOLUTIONS = (MINUTE, HOUR)
+
+ROLLUP_COLLECTION = "telemetry_rollups"
+
+def _floor(ts: float, res: int) -> float:
+    return float(math.floor(ts / res) * res)
+
+def _ceil(ts: float, res: int) -> float:
+    return float(math.ceil(ts / res) * res)
+
+def rollup_ops(readings: Iterable[tuple[str, float, float]]) -> list[UpdateOne]:
+    """Upserts for (bin_id, ts, fill_percent) readings, merged per bucket first."""
+    acc: dict[tuple[str, int, float], list[float]] = defaultdict(lambda: [0.0, 0])
+    for bin_id, ts, fill in readings:
+        for res in RESOLUTIONS:
+            slot = acc[(bin_id, res, _floor(ts, res))]
+            slot[0] += fill
+            slot[1] += 1
+    return [
+        UpdateOne(
+            {"bin_id": bin_id, "res": res, "bucket": bucket},
+            {"$inc": {"sum": total, "count": count}},
+            upsert=True,
+        )
+        for (bin_id, res, bucket), (total, count) in acc.items()
+    ]
+
+def window_match(cutoff: float, now: float) -> dict:
+    """
+    Buckets covering [cutoff, now]: minute buckets for the partial hours at
+    each end, hour buckets for the whole hours between.
+    """
+    start = _floor(cutoff, MINUTE)
+    first_hour = _ceil(start, HOUR)
+    last_hour = _floor(now, HOUR)
+    if first_hour >= last_hour:
+        return {"res": MINUTE, "bucket": {"$gte": start}}
+    return {"$or": [
+        {"res": MINUTE, "bucket": {"$gte": start, "$lt": first_hour}},
+        {"res": HOUR, "bucket": {"$gte": first_hour, "$lt": last_hour}},
+        {"res": MINUTE, "bucket": {"$gte": last_hour}},
+    ]}
+
+def window_average_pipeline(cutoff: float, now: float) -> list[dict]:
+    """Aggregation yielding {_id: bin_id, avg_fill} over the window."""
+    return [
+        {"$match": window_match(cutoff, now)},
+        {"$group": {"_id": "$bin_id", "sum": {"$sum": "$sum"}, "count": {"$sum": "$count"}}},
+        {"$project": {"avg_fill": {"$divide": ["$sum", "$count"]}}},
+    ]
+
+async def ensure_indexes(col):
+    await col.create_index([("bin_id", 1), ("res", 1), ("bucket", 1)], unique=True)
+    await col.create_index([("res", 1), ("bucket", 1)])
+
+def backfill_pipeline(res: int) -> list[dict]:
+    """Rebuild `res` buckets from raw telemetry (replaces existing bucket values)."""
+    return [
+        {"$group": {
+            "_id": {"bin_id": "$bin_id", "bucket": {"$subtract": ["$ts", {"$mod": ["$ts", res]}]}},
+            "sum": {"$sum": "$fill_percent"},
+            "count": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": 0, "bin_id": "$_id.bin_id", "res": {"$literal": res}, "bucket": "$_id.bucket",
+            "sum": 1, "count": 1,
+        }},
+        {"$merge": {"into": ROLLUP_COLLECTION, "on": ["bin_id", "res", "bucket"],
+                    "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["backfill"]:
+        print("usage: python rollups.py backfill")
+        sys.exit(1)
+    from db import sync_db
+    sync_db[ROLLUP_COLLECTION].create_index([("bin_id", 1), ("res", 1), ("bucket", 1)], unique=True)
+    sync_db[ROLLUP_COLLECTION].create_index([("res", 1), ("bucket", 1)])
+    for res in RESOLUTIONS:
+        print(f"Backfilling {res}s buckets...")
+        sync_db["telemetry"].aggregate(backfill_pipeline(res), allowDiskUse=True)
+    print("Done.")
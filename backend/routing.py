@@ -0,0 +1,357 @@
+"""
+Collection route engine.
+
+Nodes are integer indices into a coordinate list. Each candidate bin has a
+prize (its priority) and travel costs DISTANCE_PENALTY_PER_KM points per km,
+so a route's score is sum(prizes of stops) - penalty * route length.
+
+Solvers:
+  greedy  -- repeatedly visit the best prize-minus-distance bin (original behavior)
+  pctsp   -- prize-collecting TSP: greedy construction, then 2-opt, Or-opt and
+             add/drop/swap moves until no gain or the time budget ends; leftover
+             budget retries from a best-insertion construction
+"""
+import math
+import time
+from typing import Optional
+
+import numpy as np
+
+from geo import haversine_km_many, pairwise_haversine_km
+
+ROUTE_SOLVERS = ("greedy", "pctsp")
+
+_EPS = 1e-9
+
+def bin_priority(fill_percent: float, last_emptied_at: Optional[float], now: float) -> float:
+    """Urgency in [0, 1]: 70% fill level, 30% time since last emptied (saturates at 24h)."""
+    if last_emptied_at:
+        hours_since = (now - last_emptied_at) / 3600.0
+    else:
+        hours_since = 48.0
+    return 0.7 * (fill_percent / 100.0) + 0.3 * min(hours_since / 24.0, 1.0)
+
+def bin_priorities(fill_percent: np.ndarray, last_emptied_at: np.ndarray, now: float) -> np.ndarray:
+    """bin_priority for every bin at once; last_emptied_at uses NaN for never."""
+    never = np.isnan(last_emptied_at) | (last_emptied_at == 0)
+    hours_since = np.where(never, 48.0, (now - np.nan_to_num(last_emptied_at)) / 3600.0)
+    return 0.7 * (fill_percent / 100.0) + 0.3 * np.minimum(hours_since / 24.0, 1.0)
+
+class RouteState:
+    """
+    Version of the bin state that /route results depend on. It only moves when
+    a bin appears, disappears or moves, crosses the candidate fill threshold,
+    or lands in a different priority step; routine telemetry that leaves all
+    of those alone keeps cached routes valid.
+    """
+    def __init__(self, min_fill: float = 10.0, priority_step: float = 0.05):
+        self.min_fill = min_fill
+        self.priority_step = priority_step
+        self.version = 0
+        self._keys: dict[str, tuple] = {}
+
+    def _key(self, doc: dict, now: float) -> tuple:
+        fill = doc.get("fill_percent", 0.0)
+        loc = doc.get("location") or {}
+        priority = bin_priority(fill, doc.get("last_emptied_at"), now)
+        return (loc.get("lat"), loc.get("lng"), fill >= self.min_fill, math.floor(priority / self.priority_step))
+
+    def observe(self, bin_id: str, doc: Optional[dict], now: float) -> bool:
+        """Record a bin's current state (None if removed); True if that bumped the version."""
+        key = None if doc is None else self._key(doc, now)
+        if self._keys.get(bin_id) == key:
+            return False
+        if key is None:
+            self._keys.pop(bin_id, None)
+        else:
+            self._keys[bin_id] = key
+        self.version += 1
+        return True
+
+class DistanceMatrix:
+    """
+    Pairwise great-circle distances (km) between coordinates.
+    Rows are computed (vectorized) on first use and cached, so solvers that
+    only touch the nodes on a route pay O(route_len * n) instead of O(n^2).
+    """
+    # d(i, j) == d(j, i), so a cached row j also answers d(i, j) and solvers may reverse segments
+    symmetric = True
+
+    def __init__(self, coords: list[tuple[float, float]]):
+        self.n = len(coords)
+        arr = np.asarray(coords, dtype=float).reshape(self.n, 2)
+        self.lats = arr[:, 0]
+        self.lngs = arr[:, 1]
+        self._rows: dict[int, np.ndarray] = {}
+        self._lists: dict[int, list[float]] = {}  # same rows as Python floats, for scalar lookups
+
+    def row(self, i: int) -> np.ndarray:
+        r = self._rows.get(i)
+        if r is None:
+            r = haversine_km_many(self.lats[i], self.lngs[i], self.lats, self.lngs)
+            self._rows[i] = r
+        return r
+
+    def precompute(self):
+        full = pairwise_haversine_km(self.lats, self.lngs)
+        self._rows = {i: full[i] for i in range(self.n)}
+
+    def __call__(self, i: int, j: int) -> float:
+        r = self._lists.get(i)
+        if r is None:
+            r = self._lists.get(j)
+            if r is not None:
+                return r[i]
+            r = self._lists[i] = self.row(i).tolist()
+        return r[j]
+
+def route_length(path: list[int], dist: DistanceMatrix) -> float:
+    return sum(dist(a, b) for a, b in zip(path, path[1:]))
+
+def route_score(path: list[int], prizes: list[float], dist: DistanceMatrix, penalty: float, end: int) -> float:
+    stops = path[1:-1] if path[-1] == end and end != path[0] else path[1:]
+    return sum(prizes[i] for i in stops) - penalty * route_length(path, dist)
+
+def greedy_route(
+    dist: DistanceMatrix,
+    prizes: list[float],
+    start: int,
+    end: int,
+    candidates: list[int],
+    max_stops: int,
+    penalty: float,
+) -> list[int]:
+    """Nearest-by-score construction: always take the best next bin, up to max_stops."""
+    cands = np.asarray(candidates, dtype=np.intp)
+    cand_prizes = np.asarray(prizes, dtype=float)[cands]
+    available = cands != start
+    route = [start]
+    current = start
+    for _ in range(min(max_stops, len(cands))):
+        scores = cand_prizes - penalty * dist.row(current)[cands]
+        scores[~available] = -np.inf
+        k = int(np.argmax(scores))
+        if not available[k]:
+            break
+        available[k] = False
+        current = int(cands[k])
+        route.append(current)
+    if end not in route:
+        route.append(end)
+    return route
+
+def pctsp_route(
+    dist: DistanceMatrix,
+    prizes: list[float],
+    start: int,
+    end: int,
+    candidates: list[int],
+    max_stops: int,
+    penalty: float,
+    time_budget_s: float = 0.2,
+) -> list[int]:
+    """
+    Prize-collecting TSP heuristic between fixed endpoints.
+    If end == start the route is an open path, like greedy_route.
+    Never scores below greedy_route with the same inputs. On an asymmetric
+    matrix (one-way roads) segment reversals are skipped.
+    """
+    deadline = time.perf_counter() + time_budget_s
+    open_end = None if end == start else end
+
+    initial = greedy_route(dist, prizes, start, end, candidates, max_stops, penalty)
+    solver = _PCTSP(dist, prizes, start, open_end, candidates, max_stops, penalty, deadline, initial)
+    solver.improve()
+    best = [n for n in solver.path if n is not None]
+    if not dist.symmetric and route_score(best, prizes, dist, penalty, end) < route_score(initial, prizes, dist, penalty, end):
+        # Insertion screening reads each distance from the on-route row, which is only an estimate one way
+        best = initial
+
+    if time.perf_counter() < deadline:
+        alt = _PCTSP(dist, prizes, start, open_end, candidates, max_stops, penalty, deadline)
+        alt.construct()
+        alt.improve()
+        alt_path = [n for n in alt.path if n is not None]
+        if route_score(alt_path, prizes, dist, penalty, end) > route_score(best, prizes, dist, penalty, end):
+            best = alt_path
+    return best
+
+class _PCTSP:
+    """
+    Working state for pctsp_route. The path always holds both endpoints;
+    an open path ends in a None sentinel that is zero distance from everything.
+    """
+    def __init__(self, dist, prizes, start, end, candidates, max_stops, penalty, deadline, initial=None):
+        self.dist = dist
+        self.symmetric = dist.symmetric
+        self.prizes_np = np.asarray(prizes, dtype=float)
+        self.prizes = self.prizes_np.tolist()  # Python floats for the scalar moves
+        self.penalty = penalty
+        self.max_stops = max_stops
+        self.deadline = deadline
+        if initial:
+            stops = initial[1:-1] if end is not None else initial[1:]
+            self.path: list[Optional[int]] = [start, *stops, end]
+        else:
+            self.path = [start, end]
+        # Bins that could ever add score on their own
+        on_route = set(self.path)
+        self.unvisited = {c for c in candidates if prizes[c] > 0 and c not in on_route}
+
+    def d(self, a, b) -> float:
+        """Distance; pass the on-route node first so only route rows get computed."""
+        if a is None or b is None:
+            return 0.0
+        return self.dist(a, b)
+
+    def expired(self) -> bool:
+        return time.perf_counter() >= self.deadline
+
+    @property
+    def n_stops(self) -> int:
+        return len(self.path) - 2
+
+    def _insertion(self, c: int) -> tuple[float, int]:
+        """Best (gain, position) for inserting c; position is the index it would take."""
+        best_gain, best_pos = -float("inf"), 1
+        p = self.path
+        for i in range(len(p) - 1):
+            back = self.d(p[i + 1], c) if self.symmetric else self.d(c, p[i + 1])
+            added = self.d(p[i], c) + back - self.d(p[i], p[i + 1])
+            gain = self.prizes[c] - self.penalty * added
+            if gain > best_gain:
+                best_gain, best_pos = gain, i + 1
+        return best_gain, best_pos
+
+    def _insertion_all(self, cands: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """_insertion for many bins at once: arrays of gains and positions."""
+        p = self.path
+        best_added = np.full(len(cands), np.inf)
+        best_pos = np.ones(len(cands), dtype=np.intp)
+        for i in range(len(p) - 1):
+            a, b = p[i], p[i + 1]
+            added = self._row(a, cands) + self._row(b, cands) - self.d(a, b)
+            better = added < best_added
+            best_added[better] = added[better]
+            best_pos[better] = i + 1
+        return self.prizes_np[cands] - self.penalty * best_added, best_pos
+
+    def _row(self, a, cands: np.ndarray):
+        return 0.0 if a is None else self.dist.row(a)[cands]
+
+    def construct(self):
+        """Best-insertion construction: repeatedly insert the bin with the largest gain."""
+        while self.unvisited and self.n_stops < self.max_stops and not self.expired():
+            cands = np.fromiter(self.unvisited, dtype=np.intp)
+            gains, positions = self._insertion_all(cands)
+            k = int(np.argmax(gains))
+            if gains[k] <= _EPS:
+                break
+            c = int(cands[k])
+            self.path.insert(int(positions[k]), c)
+            self.unvisited.discard(c)
+
+    def improve(self):
+        improved = True
+        while improved and not self.expired():
+            improved = False
+            improved |= self._two_opt()
+            improved |= self._or_opt()
+            improved |= self._drop()
+            improved |= self._add_or_swap()
+
+    def _two_opt(self) -> bool:
+        if not self.symmetric:
+            return False  # reversing p[i:j] changes the length of every leg inside it
+        p, d = self.path, self.d
+        improved = False
+        for i in range(1, len(p) - 2):
+            if self.expired():
+                break
+            for j in range(i + 1, len(p) - 1):
+                delta = d(p[i - 1], p[j]) + d(p[i], p[j + 1]) - d(p[i - 1], p[i]) - d(p[j], p[j + 1])
+                if delta < -_EPS:
+                    p[i:j + 1] = reversed(p[i:j + 1])
+                    improved = True
+        return improved
+
+    def _or_opt(self) -> bool:
+        """Move segments of 1-3 stops (reversed too, if distances are symmetric) to a cheaper position."""
+        p, d = self.path, self.d
+        improved = False
+        for seg_len in (1, 2, 3):
+            i = 1
+            while i + seg_len <= len(p) - 1:
+                if self.expired():
+                    return improved
+                seg = p[i:i + seg_len]
+                removed = d(p[i - 1], seg[0]) + d(seg[-1], p[i + seg_len]) - d(p[i - 1], p[i + seg_len])
+                rest = p[:i] + p[i + seg_len:]
+                best_delta, best_at, best_seg = -_EPS, None, None
+                for j in range(len(rest) - 1):
+                    if j == i - 1:
+                        continue
+                    a, b = rest[j], rest[j + 1]
+                    base = d(a, b)
+                    for s in ((seg, seg[::-1]) if self.symmetric else (seg,)):
+                        delta = d(a, s[0]) + d(s[-1], b) - base - removed
+                        if delta < best_delta:
+                            best_delta, best_at, best_seg = delta, j + 1, s
+                if best_at is not None:
+                    p[:] = rest[:best_at] + best_seg + rest[best_at:]
+                    improved = True
+                i += 1
+        return improved
+
+    def _marginal(self, i: int) -> float:
+        """Score lost by removing the stop at position i."""
+        p, d = self.path, self.d
+        saving = d(p[i - 1], p[i]) + d(p[i], p[i + 1]) - d(p[i - 1], p[i + 1])
+        return self.prizes[p[i]] - self.penalty * saving
+
+    def _drop(self) -> bool:
+        improved = False
+        i = 1
+        while i < len(self.path) - 1:
+            if self._marginal(i) < -_EPS:
+                self.unvisited.add(self.path.pop(i))
+                improved = True
+            else:
+                i += 1
+        return improved
+
+    def _add_or_swap(self) -> bool:
+        if not self.unvisited:
+            return False
+        improved = False
+        # Screen every unvisited bin at once; only promising ones get the exact check
+        cands = np.fromiter(self.unvisited, dtype=np.intp)
+        estimates, _ = self._insertion_all(cands)
+        for k in np.argsort(-estimates):
+            if self.expired() or estimates[k] <= _EPS:
+                break
+            u = int(cands[k])
+            gain, pos = self._insertion(u)
+            if self.n_stops < self.max_stops:
+                if gain > _EPS:
+                    self.path.insert(pos, u)
+                    self.unvisited.discard(u)
+                    improved = True
+                continue
+            # Route is full: replace the weakest stop if that nets a gain
+            if self.n_stops == 0:
+                continue
+            weakest = min(range(1, len(self.path) - 1), key=self._marginal)
+            loss = self._marginal(weakest)
+            if gain - loss <= _EPS:
+                continue
+            removed = self.path.pop(weakest)
+            gain_after, pos_after = self._insertion(u)
+            if gain_after - loss > _EPS:
+                self.path.insert(pos_after, u)
+                self.unvisited.discard(u)
+                self.unvisited.add(removed)
+                improved = True
+            else:
+                self.path.insert(weakest, removed)
+        return improved
@@ -0,0 +1,122 @@
+"""
+In-memory uniform grid over bin coordinates.
+
+Answers bounding-box, radius and k-nearest queries by visiting only the grid
+cells that can contain matches; exact distances use geo.haversine_km_many.
+"""
+import math
+
+import numpy as np
+
+from geo import haversine_km_many
+
+KM_PER_DEG_LAT = 111.2
+
+class GridIndex:
+    def __init__(self, cell_deg: float = 0.01):  # ~1.1 km cells
+        self.cell_deg = cell_deg
+        self._cells: dict[tuple[int, int], set[str]] = {}
+        self._points: dict[str, tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def insert(self, key: str, lat: float, lng: float):
+        old = self._points.get(key)
+        if old == (lat, lng):
+            return
+        if old is not None:
+            self.remove(key)
+        self._points[key] = (lat, lng)
+        self._cells.setdefault(self._cell(lat, lng), set()).add(key)
+
+    def remove(self, key: str):
+        old = self._points.pop(key, None)
+        if old is None:
+            return
+        cell = self._cell(*old)
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._points.clear()
+
+    def _keys_in_cells(self, lat_range: tuple[int, int], lng_range: tuple[int, int]) -> list[str]:
+        # Walk whichever is smaller: the requested cell range or the occupied cells
+        n_range = (lat_range[1] - lat_range[0] + 1) * (lng_range[1] - lng_range[0] + 1)
+        keys = []
+        if n_range <= len(self._cells):
+            for ci in range(lat_range[0], lat_range[1] + 1):
+                for cj in range(lng_range[0], lng_range[1] + 1):
+                    keys.extend(self._cells.get((ci, cj), ()))
+        else:
+            for (ci, cj), members in self._cells.items():
+                if lat_range[0] <= ci <= lat_range[1] and lng_range[0] <= cj <= lng_range[1]:
+                    keys.extend(members)
+        return keys
+
+    def bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> list[str]:
+        lo = self._cell(min_lat, min_lng)
+        hi = self._cell(max_lat, max_lng)
+        return [
+            k for k in self._keys_in_cells((lo[0], hi[0]), (lo[1], hi[1]))
+            if min_lat <= self._points[k][0] <= max_lat and min_lng <= self._points[k][1] <= max_lng
+        ]
+
+    def _with_distances(self, keys: list[str], lat: float, lng: float) -> tuple[list[str], np.ndarray]:
+        if not keys:
+            return [], np.empty(0)
+        pts = np.array([self._points[k] for k in keys])
+        return keys, haversine_km_many(lat, lng, pts[:, 0], pts[:, 1])
+
+    def within_km(self, lat: float, lng: float, radius_km: float) -> list[str]:
+        dlat = radius_km / KM_PER_DEG_LAT
+        dlng = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        keys = self.bbox(lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+        keys, dists = self._with_distances(keys, lat, lng)
+        return [k for k, d in zip(keys, dists) if d <= radius_km]
+
+    def nearest(self, lat: float, lng: float, k: int) -> list[tuple[str, float]]:
+        """Up to k (key, distance_km) pairs, closest first, by expanding rings of cells."""
+        if not self._points or k <= 0:
+            return []
+        ci, cj = self._cell(lat, lng)
+        # Smallest km span of one cell near this latitude, to bound unseen rings
+        cell_km = self.cell_deg * KM_PER_DEG_LAT * max(math.cos(math.radians(min(abs(lat) + 1, 89.9))), 1e-6)
+        found: list[str] = []
+        ring = 0
+        while True:
+            if 8 * ring > len(self._cells):
+                # Rings now cost more than scanning every occupied cell
+                found = list(self._points)
+                break
+            found.extend(self._ring_keys(ci, cj, ring))
+            if len(found) >= k:
+                _, dists = self._with_distances(found, lat, lng)
+                kth = float(np.partition(dists, k - 1)[k - 1])
+                # Anything in ring r+1 or beyond is at least r * cell_km away
+                if kth <= ring * cell_km:
+                    break
+            ring += 1
+        keys, dists = self._with_distances(found, lat, lng)
+        order = np.argsort(dists)[:k]
+        return [(keys[i], float(dists[i])) for i in order]
+
+    def _ring_keys(self, ci: int, cj: int, ring: int) -> list[str]:
+        if ring == 0:
+            return list(self._cells.get((ci, cj), ()))
+        keys = []
+        for a in range(ci - ring, ci + ring + 1):
+            for b in (cj - ring, cj + ring):
+                keys.extend(self._cells.get((a, b), ()))
+        for b in range(cj - ring + 1, cj + ring):
+            for a in (ci - ring, ci + ring):
+                keys.extend(self._cells.get((a, b), ()))
+        return keys
@@ -0,0 +1,33 @@
+"""
+Road distances over one-way streets: `python -m pytest backend/test_roads.py`.
+"""
+import numpy as np
+
+from roads import RoadDistanceMatrix, RoadGraph, RoadRouter
+from routing import greedy_route, pctsp_route, route_length, route_score
+
+# A one-way ring 0 -> 1 -> 2 -> 3 -> 0 around a ~1.11km square
+RING = [(0.0, 0.0), (0.01, 0.0), (0.01, 0.01), (0.0, 0.01)]
+
+def ring_matrix() -> RoadDistanceMatrix:
+    lats = np.array([lat for lat, _ in RING])
+    lngs = np.array([lng for _, lng in RING])
+    graph = RoadGraph(lats, lngs, np.array([0, 1, 2, 3]), np.array([1, 2, 3, 0]))
+    return RoadDistanceMatrix(RING, RoadRouter(graph))
+
+def test_distance_follows_one_way_direction():
+    m = ring_matrix()
+    back = m(1, 0)           # caches row 1
+    forward = m(0, 1)        # must not be answered from row 1
+    assert abs(forward - 1.11) < 0.01
+    assert abs(back - 3.34) < 0.01
+
+def test_pctsp_keeps_ring_direction():
+    m = ring_matrix()
+    prizes = [0.0, 10.0, 10.0, 10.0]
+    candidates = [1, 2, 3]
+    greedy = greedy_route(m, prizes, 0, 0, candidates, 3, 0.1)
+    route = pctsp_route(m, prizes, 0, 0, candidates, 3, 0.1)
+    assert route == [0, 1, 2, 3]
+    assert abs(route_length(route, m) - 3 * 1.11) < 0.03
+    assert route_score(route, prizes, m, 0.1, 0) >= route_score(greedy, prizes, m, 0.1, 0)
@@ -0,0 +1,61 @@
+"""
+/telemetry/batch against a live mongod: `python -m pytest backend/test_telemetry_batch.py`.
+Uses the scratch database MONGO_DB (default wastewise_test), which is dropped
+afterwards; skipped when no server answers at MONGO_URI.
+"""
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("MONGO_DB", "wastewise_test")
+
+from pymongo import MongoClient  # noqa: E402
+from pymongo.errors import PyMongoError  # noqa: E402
+
+try:
+    MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"), serverSelectionTimeoutMS=1000).admin.command("ping")
+except PyMongoError:
+    pytest.skip("no mongod at MONGO_URI", allow_module_level=True)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from db import MONGO_DB, sync_client, sync_db  # noqa: E402
+
+BIN = "order-test"
+
+@pytest.fixture
+def client():
+    sync_client.drop_database(MONGO_DB)
+    with TestClient(main.app) as c:
+        yield c
+    sync_client.drop_database(MONGO_DB)
+
+def reading(fill: float, ts: float) -> dict:
+    return {"bin_id": BIN, "distance_cm": 60.0 - fill / 2, "fill_percent": fill, "ts": ts}
+
+def test_older_batch_does_not_overwrite_newer_state(client):
+    t = time.time()
+    newer = client.post("/telemetry/batch", json=[reading(70.0, t - 60), reading(80.0, t)]).json()
+    assert newer["bins_updated"] == 1
+    # An outbox replay delivering an earlier batch afterwards
+    older = client.post("/telemetry/batch", json=[reading(20.0, t - 600), reading(30.0, t - 300)]).json()
+    assert older["bins_updated"] == 0
+    assert [r["status"] for r in older["results"]] == ["superseded", "superseded"]
+
+    stored = sync_db["bins"].find_one({"bin_id": BIN})
+    assert (stored["fill_percent"], stored["last_seen_at"]) == (80.0, t)
+    served = client.get(f"/bins/{BIN}").json()
+    assert served["fill_percent"] == 80.0
+    # History keeps every reading
+    assert sync_db["telemetry"].count_documents({"bin_id": BIN}) == 4
+
+def test_newer_state_written_by_another_worker_is_kept(client):
+    t = time.time()
+    client.post("/telemetry/batch", json=[reading(40.0, t - 600)])
+    # Another worker stores a newer reading; this process's registry hasn't seen it
+    sync_db["bins"].update_one({"bin_id": BIN}, {"$set": {"fill_percent": 90.0, "last_seen_at": t}})
+    client.post("/telemetry/batch", json=[reading(50.0, t - 300)])
+    stored = sync_db["bins"].find_one({"bin_id": BIN})
+    assert (stored["fill_percent"], stored["last_seen_at"]) == (90.0, t)
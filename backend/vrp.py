@@ -0,0 +1,391 @@
+"""
+Multi-vehicle, capacity-constrained route planning (CVRP).
+
+Every vehicle leaves its depot and returns to it. A bin's load is its fill
+fraction, so a full bin is 1.0, and a vehicle carries at most `capacity` of
+them. A route must also fit the vehicle's shift, counting driving time at
+`speed_kmh` plus a fixed service time per stop.
+
+Bins go to their nearest depot, and that depot's vehicles split them with a
+construction heuristic:
+  savings -- Clarke-Wright: start from one out-and-back trip per bin and merge
+             trips in order of the distance saved. Only near-neighbour pairs
+             are considered, which keeps it O(n * k) at 10k bins.
+  sweep   -- order bins by angle around the depot and fill vehicles in turn
+A time-bounded local search follows. It runs 2-opt within routes, moves bins
+between routes (next to one of their near neighbours), and inserts left-out
+bins, highest priority first, wherever they still fit.
+
+If the fleet cannot carry every bin, the bins with the lowest priority per
+unit of load are left out and returned as unassigned.
+
+Distances use a flat projection in km. Across a city it is within a fraction
+of a percent of great-circle distance and much cheaper in the scalar loops.
+"""
+import math
+import time
+
+import numpy as np
+
+from geo import EARTH_RADIUS_KM
+
+PLAN_METHODS = ("savings", "sweep")
+
+_EPS = 1e-9
+
+def project_km(lats: np.ndarray, lngs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Equirectangular (x, y) in km around the points' mean latitude."""
+    lat0 = math.radians(float(np.mean(lats))) if len(lats) else 0.0
+    x = np.radians(lngs) * EARTH_RADIUS_KM * math.cos(lat0)
+    y = np.radians(lats) * EARTH_RADIUS_KM
+    return x, y
+
+def nearest_neighbors(x: np.ndarray, y: np.ndarray, k: int) -> np.ndarray:
+    """
+    (n, k) indices of each point's k near neighbours, closest first.
+    Points are bucketed into square cells of about k points each, and each cell
+    is compared only with the block of cells around it (grown until it holds
+    k other points), so the cost is O(n * k) instead of O(n^2).
+    """
+    n = len(x)
+    k = min(k, n - 1)
+    out = np.empty((n, max(k, 0)), dtype=np.intp)
+    if k <= 0:
+        return out
+    w, h = float(np.ptp(x)), float(np.ptp(y))
+    cell = max(math.sqrt(w * h * k / n), max(w, h) * k / n, 1e-6)
+    cx = ((x - x.min()) / cell).astype(np.intp)
+    cy = ((y - y.min()) / cell).astype(np.intp)
+    order = np.lexsort((cy, cx))
+    keys = np.stack([cx[order], cy[order]], axis=1)
+    starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+    cells = {
+        (int(keys[a, 0]), int(keys[a, 1])): order[a:b]
+        for a, b in zip(np.r_[0, starts], np.r_[starts, n])
+    }
+    max_ring = int(max(cx.max(), cy.max())) + 1
+    for (i, j), pts in cells.items():
+        ring = 1
+        while True:
+            block = [cells[c] for c in ((a, b) for a in range(i - ring, i + ring + 1)
+                                        for b in range(j - ring, j + ring + 1)) if c in cells]
+            cand = np.concatenate(block)
+            if len(cand) > k or ring >= max_ring:
+                break
+            ring += 1
+        d2 = (x[pts, None] - x[None, cand]) ** 2 + (y[pts, None] - y[None, cand]) ** 2
+        d2[pts[:, None] == cand[None, :]] = np.inf
+        part = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        nearest = np.take_along_axis(d2, part, axis=1)
+        out[pts] = cand[np.take_along_axis(part, np.argsort(nearest, axis=1), axis=1)]
+    return out
+
+def route_duration_hours(length_km: float, stops: int, speed_kmh: float, service_hours: float) -> float:
+    return length_km / speed_kmh + service_hours * stops
+
+def plan_routes(
+    depots: list[tuple[float, float]],
+    bins: list[tuple[float, float]],
+    demands: list[float],
+    prizes: list[float],
+    vehicles: list[tuple[int, float, float]],
+    speed_kmh: float,
+    service_hours: float,
+    method: str = "savings",
+    time_budget_s: float = 1.0,
+    neighbors: int = 20,
+) -> tuple[list[list[int]], list[int]]:
+    """
+    `vehicles` are (depot index, capacity, shift hours). Returns each vehicle's
+    stops as bin indices, in driving order, and the bins left unassigned.
+    Module-level with plain arguments so it can run in a worker process.
+    """
+    if method not in PLAN_METHODS:
+        raise ValueError(f"Unknown method '{method}'")
+    deadline = time.perf_counter() + time_budget_s
+    n_depots = len(depots)
+    coords = np.asarray(list(depots) + list(bins), dtype=float).reshape(-1, 2)
+    x, y = project_km(coords[:, 0], coords[:, 1])
+    nbrs = nearest_neighbors(x[n_depots:], y[n_depots:], neighbors) + n_depots
+
+    plan = _Plan(x, y, n_depots, demands, prizes, vehicles, speed_kmh, service_hours, nbrs, deadline)
+    used = sorted({v[0] for v in vehicles})
+    if bins and used:
+        # Each bin belongs to the nearest depot that has vehicles
+        dx = x[n_depots:, None] - x[None, used]
+        dy = y[n_depots:, None] - y[None, used]
+        home = np.asarray(used)[np.argmin(dx * dx + dy * dy, axis=1)]
+        for depot in used:
+            group = (np.flatnonzero(home == depot) + n_depots).tolist()
+            if method == "savings":
+                plan.savings(depot, plan.fit_fleet(depot, group))
+            else:
+                plan.sweep(depot, plan.fit_fleet(depot, group))
+    else:
+        plan.unassigned.update(range(n_depots, n_depots + len(bins)))
+    plan.improve()
+    routes = [[b - n_depots for b in r[1:-1]] for r in plan.routes]
+    return routes, sorted(b - n_depots for b in plan.unassigned)
+
+class _Plan:
+    """
+    Working state for plan_routes. Nodes are depots (0..n_depots-1) then bins;
+    routes[r] is vehicle r's path including its depot at both ends.
+    """
+    def __init__(self, x, y, n_depots, demands, prizes, vehicles, speed_kmh, service_hours, nbrs, deadline):
+        # Python floats and lists for the scalar moves
+        self.x = x.tolist()
+        self.y = y.tolist()
+        self.demand = [0.0] * n_depots + list(demands)
+        self.prize = [0.0] * n_depots + list(prizes)
+        self.nbrs = [[]] * n_depots + nbrs.tolist()
+        self.speed = speed_kmh
+        self.service = service_hours
+        self.deadline = deadline
+        self.depot = [v[0] for v in vehicles]
+        self.cap = [v[1] for v in vehicles]
+        self.shift = [v[2] for v in vehicles]
+        self.routes = [[v[0], v[0]] for v in vehicles]
+        self.load = [0.0] * len(vehicles)
+        self.length = [0.0] * len(vehicles)
+        self.where: dict[int, tuple[int, int]] = {}  # routed bin -> (route, position)
+        self.unassigned: set[int] = set()
+
+    def d(self, a: int, b: int) -> float:
+        return math.hypot(self.x[a] - self.x[b], self.y[a] - self.y[b])
+
+    def expired(self) -> bool:
+        return time.perf_counter() >= self.deadline
+
+    def fits(self, r: int, extra_km: float, extra_load: float, extra_stops: int) -> bool:
+        if self.load[r] + extra_load > self.cap[r] + _EPS:
+            return False
+        stops = len(self.routes[r]) - 2 + extra_stops
+        hours = route_duration_hours(self.length[r] + extra_km, stops, self.speed, self.service)
+        return hours <= self.shift[r] + _EPS
+
+    def _reindex(self, r: int, start: int = 1):
+        p = self.routes[r]
+        for i in range(max(start, 1), len(p) - 1):
+            self.where[p[i]] = (r, i)
+
+    def _set_route(self, r: int, stops: list[int]):
+        depot = self.depot[r]
+        self.routes[r] = p = [depot, *stops, depot]
+        self.load[r] = sum(self.demand[b] for b in stops)
+        self.length[r] = sum(self.d(a, b) for a, b in zip(p, p[1:]))
+        self._reindex(r)
+
+    def _insert(self, r: int, pos: int, b: int, added_km: float):
+        self.routes[r].insert(pos, b)
+        self.load[r] += self.demand[b]
+        self.length[r] += added_km
+        self.unassigned.discard(b)
+        self._reindex(r, pos)
+
+    def _remove(self, r: int, pos: int, saved_km: float) -> int:
+        b = self.routes[r].pop(pos)
+        self.load[r] -= self.demand[b]
+        self.length[r] -= saved_km
+        del self.where[b]
+        self._reindex(r, pos)
+        return b
+
+    def _vehicles_at(self, depot: int) -> list[int]:
+        return [r for r, dep in enumerate(self.depot) if dep == depot]
+
+    def fit_fleet(self, depot: int, group: list[int]) -> list[int]:
+        """
+        Drop the lowest priority bins until the depot's fleet could carry the
+        rest (priority per unit of load breaks ties). Ranking by the ratio
+        alone would favor the emptiest bins, since load is the fill level.
+        """
+        capacity = sum(self.cap[r] for r in self._vehicles_at(depot))
+        if sum(self.demand[b] for b in group) <= capacity:
+            return group
+        kept, total = [], 0.0
+        for b in sorted(group, key=lambda b: (-self.prize[b], -self.prize[b] / max(self.demand[b], _EPS))):
+            if total + self.demand[b] <= capacity:
+                kept.append(b)
+                total += self.demand[b]
+            else:
+                self.unassigned.add(b)
+        return kept
+
+    def savings(self, depot: int, group: list[int]):
+        fleet = self._vehicles_at(depot)
+        max_cap = max(self.cap[r] for r in fleet)
+        max_shift = max(self.shift[r] for r in fleet)
+        members = set(group)
+        trip = {b: [b] for b in group}  # trip id (its first bin) -> bins
+        owner = {b: b for b in group}
+        load = {b: self.demand[b] for b in group}
+        length = {b: 2 * self.d(depot, b) for b in group}
+
+        pairs = []
+        for b in group:
+            db = self.d(depot, b)
+            for c in self.nbrs[b]:
+                if c > b and c in members:
+                    s = db + self.d(depot, c) - self.d(b, c)
+                    if s > _EPS:
+                        pairs.append((s, b, c))
+        pairs.sort(reverse=True)
+
+        for s, b, c in pairs:
+            tb, tc = owner[b], owner[c]
+            if tb == tc:
+                continue
+            B, C = trip[tb], trip[tc]
+            # Both bins must be at an end of their trips (next to the depot)
+            if b not in (B[0], B[-1]) or c not in (C[0], C[-1]):
+                continue
+            new_load = load[tb] + load[tc]
+            new_length = length[tb] + length[tc] - s
+            stops = len(B) + len(C)
+            if new_load > max_cap + _EPS:
+                continue
+            if route_duration_hours(new_length, stops, self.speed, self.service) > max_shift + _EPS:
+                continue
+            merged = (B if B[-1] == b else B[::-1]) + (C if C[0] == c else C[::-1])
+            for m in C:
+                owner[m] = tb
+            trip[tb] = merged
+            load[tb], length[tb] = new_load, new_length
+            del trip[tc], load[tc], length[tc]
+
+        # Highest-priority trips get vehicles first; each takes the smallest one it fits
+        free = sorted(fleet, key=lambda r: self.cap[r])
+        for t in sorted(trip, key=lambda t: -sum(self.prize[b] for b in trip[t])):
+            hours = route_duration_hours(length[t], len(trip[t]), self.speed, self.service)
+            r = next((r for r in free if load[t] <= self.cap[r] + _EPS and hours <= self.shift[r] + _EPS), None)
+            if r is None:
+                self.unassigned.update(trip[t])
+                continue
+            free.remove(r)
+            self._set_route(r, trip[t])
+
+    def sweep(self, depot: int, group: list[int]):
+        if not group:
+            return
+        angles = np.arctan2(
+            np.asarray([self.y[b] for b in group]) - self.y[depot],
+            np.asarray([self.x[b] for b in group]) - self.x[depot],
+        )
+        order = np.argsort(angles)
+        # Start just after the widest empty wedge so no route straddles it
+        gaps = np.diff(np.append(angles[order], angles[order][0] + 2 * math.pi))
+        order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+        fleet = sorted(self._vehicles_at(depot), key=lambda r: -self.cap[r])
+        v = 0
+        for k in order:
+            b = group[int(k)]
+            while v < len(fleet):
+                best = self._best_insertion(b, [fleet[v]])
+                if best is not None:
+                    added, r, pos = best
+                    self._insert(r, pos, b, added)
+                    break
+                v += 1
+            else:
+                self.unassigned.add(b)
+
+    def _best_insertion(self, b: int, routes: list[int]):
+        """Cheapest feasible (added km, route, position) for b, or None; tries route ends and b's neighbours."""
+        slots = set()
+        for r in routes:
+            slots.add((r, 1))
+            slots.add((r, len(self.routes[r]) - 1))
+        allowed = set(routes)
+        for v in self.nbrs[b]:
+            loc = self.where.get(v)
+            if loc is not None and loc[0] in allowed:
+                slots.add(loc)
+                slots.add((loc[0], loc[1] + 1))
+        best = None
+        for r, pos in slots:
+            p = self.routes[r]
+            a, c = p[pos - 1], p[pos]
+            added = self.d(a, b) + self.d(b, c) - self.d(a, c)
+            if (best is None or added < best[0]) and self.fits(r, added, self.demand[b], 1):
+                best = (added, r, pos)
+        return best
+
+    def improve(self):
+        improved = True
+        while improved and not self.expired():
+            improved = self._insert_unassigned()
+            improved |= self._relocate()
+            improved |= self._two_opt()
+
+    def _insert_unassigned(self) -> bool:
+        improved = False
+        everywhere = list(range(len(self.routes)))
+        for b in sorted(self.unassigned, key=lambda b: -self.prize[b]):
+            if self.expired():
+                break
+            best = self._best_insertion(b, everywhere)
+            if best is not None:
+                added, r, pos = best
+                self._insert(r, pos, b, added)
+                improved = True
+        return improved
+
+    def _relocate(self) -> bool:
+        """Move a bin next to a near neighbour on another route when that shortens the total."""
+        improved = False
+        for u in list(self.where):
+            if self.expired():
+                break
+            r, i = self.where[u]
+            p = self.routes[r]
+            saved = self.d(p[i - 1], u) + self.d(u, p[i + 1]) - self.d(p[i - 1], p[i + 1])
+            best_delta, best = -_EPS, None
+            for v in self.nbrs[u]:
+                loc = self.where.get(v)
+                if loc is None or loc[0] == r:
+                    continue
+                s, j = loc
+                q = self.routes[s]
+                for pos in (j, j + 1):
+                    a, c = q[pos - 1], q[pos]
+                    added = self.d(a, u) + self.d(u, c) - self.d(a, c)
+                    if added - saved < best_delta and self.fits(s, added, self.demand[u], 1):
+                        best_delta, best = added - saved, (s, pos, added)
+            if best is not None:
+                s, pos, added = best
+                self._remove(r, i, saved)
+                self._insert(s, pos, u, added)
+                improved = True
+        return improved
+
+    def _two_opt(self) -> bool:
+        """Reverse a segment so a bin ends up next to one of its near neighbours on the same route."""
+        improved = False
+        for u in list(self.where):
+            if self.expired():
+                break
+            for v in self.nbrs[u]:
+                r, i = self.where[u]
+                loc = self.where.get(v)
+                if loc is None or loc[0] != r:
+                    continue
+                j = loc[1]
+                p = self.routes[r]
+                if j > i + 1:
+                    # (u, p[i+1]) + (v, p[j+1]) -> (u, v) + (p[i+1], p[j+1])
+                    delta = self.d(u, v) + self.d(p[i + 1], p[j + 1]) - self.d(u, p[i + 1]) - self.d(v, p[j + 1])
+                    lo, hi = i + 1, j
+                elif j < i - 1:
+                    # (p[j-1], v) + (p[i-1], u) -> (p[j-1], p[i-1]) + (v, u)
+                    delta = self.d(v, u) + self.d(p[j - 1], p[i - 1]) - self.d(p[j - 1], v) - self.d(p[i - 1], u)
+                    lo, hi = j, i - 1
+                else:
+                    continue
+                if delta < -_EPS:
+                    p[lo:hi + 1] = p[lo:hi + 1][::-1]
+                    self.length[r] += delta
+                    for k in range(lo, hi + 1):
+                        self.where[p[k]] = (r, k)
+                    improved = True
+        return improved
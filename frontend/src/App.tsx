@@ -1,7 +1,7 @@
 import { useState, useEffect, useCallback, useMemo } from "react";
 import { APIProvider, Map as GoogleMap } from "@vis.gl/react-google-maps";
 import "./App.css";
-import { fetchBins, fetchRoute } from "./api";
+import { fetchBins, fetchRoute, isBinStreamOpen, subscribeBins } from "./api";
 import type { BinInfo, RouteOut } from "./types";
 import {
   fillSeverity,
@@ -48,8 +48,18 @@ function App() {
 
   useEffect(() => {
     loadBins();
-    const interval = setInterval(loadBins, POLL_INTERVAL);
-    return () => clearInterval(interval);
+    const unsubscribe = subscribeBins((data) => {
+      setBins(data);
+      setLoading(false);
+    });
+    // Poll only while the live stream is down
+    const interval = setInterval(() => {
+      if (!isBinStreamOpen()) loadBins();
+    }, POLL_INTERVAL);
+    return () => {
+      unsubscribe();
+      clearInterval(interval);
+    };
   }, [loadBins]);
 
   const stats = useMemo(() => {
@@ -1,11 +1,76 @@
-import type { BinInfo, RouteOut } from "./types";
+import type { BinInfo, BinsDelta, RouteOut } from "./types";
 
 const API_BASE = import.meta.env.VITE_API_URL || "http://localhost:8000";
 
+// Last bin list seen, so polls only transfer what changed
+let binCache = new Map<string, BinInfo>();
+let binList: BinInfo[] = [];
+// Cursor from X-Bins-Version (`<epoch>-<version>`), sent back as ?since=
+let binsVersion: string | null = null;
+let binsEtag: string | null = null;
+
 export async function fetchBins(): Promise<BinInfo[]> {
-  const res = await fetch(`${API_BASE}/bins`);
+  const url =
+    binsVersion === null
+      ? `${API_BASE}/bins`
+      : `${API_BASE}/bins?since=${encodeURIComponent(binsVersion)}`;
+  const headers: HeadersInit = binsEtag ? { "If-None-Match": binsEtag } : {};
+  const res = await fetch(url, { headers });
+  if (res.status === 304) return binList;
   if (!res.ok) throw new Error(`Failed to fetch bins: ${res.status}`);
-  return res.json();
+
+  if (binsVersion === null) {
+    const data: BinInfo[] = await res.json();
+    binCache = new Map(data.map((b) => [b.bin_id, b]));
+  } else {
+    const delta: BinsDelta = await res.json();
+    if (delta.full) binCache = new Map();
+    delta.bins.forEach((b) => binCache.set(b.bin_id, b));
+    delta.removed.forEach((id) => binCache.delete(id));
+  }
+  binsVersion = res.headers.get("X-Bins-Version");
+  binsEtag = res.headers.get("ETag");
+  binList = Array.from(binCache.values());
+  return binList;
+}
+
+let binStream: EventSource | null = null;
+
+export function isBinStreamOpen(): boolean {
+  return binStream !== null && binStream.readyState === EventSource.OPEN;
+}
+
+// Live updates from /bins/stream; returns an unsubscribe function
+export function subscribeBins(onBins: (bins: BinInfo[]) => void): () => void {
+  if (typeof EventSource === "undefined") return () => {};
+  const source = new EventSource(`${API_BASE}/bins/stream`);
+  binStream = source;
+
+  source.addEventListener("snapshot", (e) => {
+    const snap: { version: string; bins: BinInfo[] } = JSON.parse(
+      (e as MessageEvent).data
+    );
+    binCache = new Map(snap.bins.map((b) => [b.bin_id, b]));
+    binsVersion = snap.version;
+    binsEtag = null;
+    binList = Array.from(binCache.values());
+    onBins(binList);
+  });
+
+  source.addEventListener("bins", (e) => {
+    const delta: BinsDelta = JSON.parse((e as MessageEvent).data);
+    delta.bins.forEach((b) => binCache.set(b.bin_id, b));
+    delta.removed.forEach((id) => binCache.delete(id));
+    binsVersion = delta.version;
+    binsEtag = null;
+    binList = Array.from(binCache.values());
+    onBins(binList);
+  });
+
+  return () => {
+    source.close();
+    if (binStream === source) binStream = null;
+  };
 }
 
 export async function fetchRoute(
@@ -6,6 +6,16 @@ export interface BinInfo {
   distance_cm: number;
   fill_percent: number;
   ts: number;
+  last_emptied_at?: number | null;
+  confidence?: number | null;
+  predicted_full_at?: number | null;
+}
+
+export interface BinsDelta {
+  version: string;
+  full: boolean;
+  bins: BinInfo[];
+  removed: string[];
 }
 
 export type RoutePoint = {
@@ -21,6 +31,7 @@ export interface RouteStop {
   fill_percent: number;
   priority: number;
   order: number;
+  projected_fill_percent?: number | null;
 }
 
 export interface RouteOut {
@@ -2,13 +2,23 @@
 """
 Admin CLI for managing waste bins.
 Supports adding new bins with metadata and deleting bins.
+
+Non-interactive bulk import from CSV (bin_id,name,lat,lng[,fill_percent])
+or JSON (an array in .json, or one object per line in .jsonl/.ndjson):
+
+    python admin.py import bins.csv
 """
+import argparse
+import csv
+import itertools
+import json
 import os
 import requests
 import sys
 import time
 from datetime import datetime
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 # Load environment variables from .env file
 load_dotenv()
@@ -44,34 +54,56 @@ def send_to_backend(endpoint: str, method: str = "GET", data: dict = None) -> di
         print(f"❌ Error communicating with backend: {e}")
         sys.exit(1)
 
-def list_bins():
-    """List all bins in the system."""
-    print("\n📋 Fetching bin list...")
-    bins = send_to_backend("/bins")
+# Bins fetched per request when listing
+LIST_PAGE_SIZE = 500
 
-    if not bins:
-        print("No bins registered in the system.")
-        return
+def fetch_bin_pages(fields: str, page_size: int = LIST_PAGE_SIZE):
+    """Yield pages of bins (only `fields`), following the backend's X-Next-After cursor."""
+    after = None
+    while True:
+        params = {"limit": page_size, "fields": fields}
+        if after:
+            params["after"] = after
+        try:
+            response = requests.get(f"{BACKEND_URL}/bins", params=params, timeout=10)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error communicating with backend: {e}")
+            sys.exit(1)
+        yield response.json()
+        after = response.headers.get("X-Next-After")
+        if not after:
+            return
 
-    print(f"\n{'Bin ID':<15} {'Name':<25} {'Fill %':<8} {'Status':<10}")
-    print("=" * 70)
+def list_bins():
+    """List all bins in the system, a page at a time."""
+    print("\n📋 Fetching bin list...")
+    total = 0
+    for page in fetch_bin_pages("name,fill_percent"):
+        if total == 0:
+            if not page:
+                print("No bins registered in the system.")
+                return
+            print(f"\n{'Bin ID':<15} {'Name':<25} {'Fill %':<8} {'Status':<10}")
+            print("=" * 70)
 
-    for bin_data in bins:
-        bin_id = bin_data["bin_id"]
-        name = bin_data["name"]
-        fill = bin_data["fill_percent"]
+        for bin_data in page:
+            bin_id = bin_data["bin_id"]
+            name = bin_data["name"]
+            fill = bin_data["fill_percent"]
 
-        # Determine status based on fill level
-        if fill >= 80:
-            status = "🔴 FULL"
-        elif fill >= 50:
-            status = "🟡 MEDIUM"
-        else:
-            status = "🟢 OK"
+            # Determine status based on fill level
+            if fill >= 80:
+                status = "🔴 FULL"
+            elif fill >= 50:
+                status = "🟡 MEDIUM"
+            else:
+                status = "🟢 OK"
 
-        print(f"{bin_id:<15} {name:<25} {fill:<8.1f} {status:<10}")
+            print(f"{bin_id:<15} {name:<25} {fill:<8.1f} {status:<10}")
+        total += len(page)
 
-    print(f"\nTotal bins: {len(bins)}")
+    print(f"\nTotal bins: {total}")
 
 def add_bin():
     """Add a new bin with metadata."""
@@ -156,6 +188,91 @@ def delete_bin():
     result = send_to_backend(f"/bins/{bin_id}", method="DELETE")
     print(f"✅ {result['status'].capitalize()}: {bin_id}")
 
+# Bins per POST /bins/register/batch (the backend accepts up to 1000)
+IMPORT_CHUNK_SIZE = 500
+
+def read_bins(path: str):
+    """
+    Yield (line/item number, bin dict or error message) from a file.
+    CSV and JSON Lines are streamed; a .json array is read whole.
+    """
+    lines = path.endswith((".jsonl", ".ndjson"))
+    with open(path, newline="", encoding="utf-8") as f:
+        if lines:
+            rows = ((n, line) for n, line in enumerate(f, 1) if line.strip())
+        elif path.endswith(".json"):
+            rows = enumerate(json.load(f), 1)
+        else:
+            rows = enumerate(csv.DictReader(f), 2)  # line 1 is the header
+        for n, row in rows:
+            try:
+                if lines:
+                    row = json.loads(row)
+                bin_data = {
+                    "bin_id": str(row["bin_id"]).strip(),
+                    "name": str(row["name"]).strip(),
+                    "lat": float(row["lat"]),
+                    "lng": float(row["lng"]),
+                }
+                fill = row.get("fill_percent")
+                if fill not in (None, ""):
+                    bin_data["fill_percent"] = float(fill)
+            except (KeyError, TypeError, ValueError) as e:
+                yield n, f"invalid row ({e.__class__.__name__}: {e})"
+                continue
+            if not bin_data["bin_id"] or not bin_data["name"]:
+                yield n, "bin_id and name are required"
+            elif not (-90 <= bin_data["lat"] <= 90 and -180 <= bin_data["lng"] <= 180):
+                yield n, "lat/lng out of range"
+            else:
+                yield n, bin_data
+
+def import_bins(path: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> int:
+    """Register every bin in `path` in chunks over one pooled session; returns the number of errors."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    url = f"{BACKEND_URL}/bins/register/batch"
+    counts = {"created": 0, "updated": 0, "superseded": 0, "error": 0}
+    sent = 0
+    start = time.time()
+
+    print(f"📦 Importing {path} -> {url}")
+    rows = read_bins(path)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        valid = []
+        for n, item in chunk:
+            if isinstance(item, str):
+                counts["error"] += 1
+                print(f"\n❌ Row {n}: {item}")
+            else:
+                valid.append((n, item))
+        if not valid:
+            continue
+        try:
+            response = session.post(url, json=[b for _, b in valid], timeout=60)
+            response.raise_for_status()
+            results = response.json()["results"]
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            counts["error"] += len(valid)
+            print(f"\n❌ Rows {valid[0][0]}-{valid[-1][0]} failed: {e}")
+            continue
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            if result["status"] == "error":
+                print(f"\n❌ Row {valid[result['index']][0]} ({result['bin_id']}): rejected by backend")
+        sent += len(valid)
+        rate = sent / max(time.time() - start, 1e-9)
+        print(f"\r  {sent:,} bins sent ({rate:,.0f}/s) | created {counts['created']:,} | "
+              f"updated {counts['updated']:,} | errors {counts['error']:,}", end="", flush=True)
+
+    print(f"\n✅ Done in {time.time() - start:.1f}s: {counts['created']:,} created, {counts['updated']:,} updated, "
+          f"{counts['superseded']:,} duplicates, {counts['error']:,} errors")
+    return counts["error"]
+
 def show_menu():
     """Display the main menu."""
     print("\n" + "=" * 50)
@@ -168,9 +285,19 @@ def show_menu():
     print("=" * 50)
 
 def main():
-    """Main menu loop."""
+    """Main menu loop, or a subcommand when given one."""
     print(f"Backend URL: {BACKEND_URL}")
 
+    if len(sys.argv) > 1:
+        parser = argparse.ArgumentParser(description="Waste Management Admin Tool")
+        sub = parser.add_subparsers(dest="command", required=True)
+        imp = sub.add_parser("import", help="Register bins from a CSV or JSON file")
+        imp.add_argument("file")
+        imp.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+        args = parser.parse_args()
+        errors = import_bins(args.file, args.chunk_size)
+        sys.exit(1 if errors else 0)
+
     while True:
         show_menu()
         choice = input("\nSelect option (1-4): ").strip()
@@ -0,0 +1,85 @@
+"""
+Streaming distance estimator for the ultrasonic sensor.
+
+Raw echoes pass through a Hampel filter (rolling median / MAD over the last
+few samples), which drops lid openings and stray echoes without lagging a
+real level change: once most of the window sits at the new level, it is the
+median. Accepted samples feed a 1-D Kalman filter that carries the estimate
+across cycles, so fewer samples per cycle reach the accuracy a large median
+burst needed. A jump far outside the filter's uncertainty (the bin was
+emptied) resets it to the new level.
+
+Memory and work per sample are constant.
+"""
+import math
+from collections import deque
+from typing import Optional
+
+# Scale factor turning a MAD into a standard deviation for Gaussian noise
+MAD_TO_STD = 1.4826
+
+class HampelFilter:
+    def __init__(self, window: int = 7, k: float = 3.0, min_dev_cm: float = 1.5):
+        self.k = k
+        self.min_dev_cm = min_dev_cm
+        self._window: deque[float] = deque(maxlen=window)
+
+    def accept(self, x: float) -> bool:
+        """True if x is consistent with the recent samples; x joins the window either way."""
+        ok = True
+        if len(self._window) >= 3:
+            values = sorted(self._window)
+            median = values[len(values) // 2]
+            mad = sorted(abs(v - median) for v in values)[len(values) // 2]
+            ok = abs(x - median) <= self.k * max(MAD_TO_STD * mad, self.min_dev_cm)
+        self._window.append(x)
+        return ok
+
+class Kalman1D:
+    """Constant-level model: the level drifts by process noise `q` (cm^2/s); samples have noise `r` (cm^2)."""
+    def __init__(self, q: float = 0.002, r: float = 1.0, gate: float = 5.0):
+        self.q = q
+        self.r = r
+        self.gate = gate
+        self.x: Optional[float] = None
+        self.p = r
+        self._t: Optional[float] = None
+
+    def predict(self, t: float):
+        if self._t is not None and t > self._t:
+            self.p += self.q * (t - self._t)
+        self._t = t
+
+    def update(self, z: float, t: float) -> float:
+        self.predict(t)
+        if self.x is None or abs(z - self.x) > self.gate * math.sqrt(self.p + self.r):
+            # First sample, or a step change the model can't explain: restart at the new level
+            self.x, self.p = z, self.r
+            return self.x
+        gain = self.p / (self.p + self.r)
+        self.x += gain * (z - self.x)
+        self.p *= 1 - gain
+        return self.x
+
+class FillEstimator:
+    """Turns each burst of raw distances into (estimate cm, confidence 0-1)."""
+    def __init__(self, window: int = 7, k: float = 3.0, q: float = 0.002, r: float = 1.0):
+        self.hampel = HampelFilter(window, k)
+        self.kalman = Kalman1D(q, r)
+
+    def update(self, samples: list[Optional[float]], t: float) -> tuple[Optional[float], float]:
+        """
+        `samples` are one cycle's readings (None for missed echoes) taken at time t.
+        Confidence combines the share of samples that were accepted with how
+        settled the filter is; it is 0 when nothing usable was measured.
+        """
+        total = len(samples)
+        accepted = 0
+        for z in samples:
+            if z is not None and self.hampel.accept(z):
+                self.kalman.update(z, t)
+                accepted += 1
+        if not accepted:
+            return None, 0.0
+        settled = self.kalman.r / (self.kalman.r + self.kalman.p)
+        return self.kalman.x, round(accepted / total * settled, 3)
@@ -1,10 +1,12 @@
 import os
 import time
-import statistics
-import RPi.GPIO as GPIO
-import requests
 from dotenv import load_dotenv
 
+from estimator import FillEstimator
+from outbox import Outbox, Uploader
+from reporting import AdaptiveReporter
+from ultrasonic import GPIOEchoDriver, Sampler, SimulatedBin, SimulatedEchoDriver
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -18,126 +20,98 @@ ECHO_PIN = 24   # BCM GPIO24 (physical pin 18) <-- use a voltage divider/level s
 EMPTY_DISTANCE_CM = 60.0
 FULL_DISTANCE_CM = 10.0
 
-# Sampling
-SAMPLES = 7
+# Sampling: the estimator carries accuracy across cycles, so a few samples per cycle suffice
+SAMPLES = int(os.environ.get("SAMPLES", "3"))
 SAMPLE_DELAY = 0.08  # seconds between samples
 
 # Env-var driven config
+SENSOR_DRIVER = os.environ.get("SENSOR_DRIVER", "gpio")  # "gpio" on a Pi, "sim" anywhere else
 SEND_HTTP = True
 BACKEND_URL = os.environ.get("BACKEND_URL", "https://shpec4c-production.up.railway.app/telemetry")
+# Accept either the API base URL or the full /telemetry URL
+TELEMETRY_URL = BACKEND_URL.rstrip("/") if BACKEND_URL.rstrip("/").endswith("/telemetry") else BACKEND_URL.rstrip("/") + "/telemetry"
+BATCH_URL = TELEMETRY_URL + "/batch"
 BIN_ID = os.environ.get("BIN_ID", "bin-01")
-POST_INTERVAL = float(os.environ.get("POST_INTERVAL", "30"))  # seconds between backend posts
-READ_INTERVAL = 5.0  # seconds between sensor readings (keeps sensor responsive)
 
-# HC-SR04-ish constants
-SPEED_OF_SOUND_CM_S = 34300.0  # cm/s at ~20°C
-TIMEOUT_S = 0.03               # ~30ms covers up to ~5m round trip; you can lower since bins are close
+# Change-driven reporting: post when fill moves more than DEADBAND_PCT since the
+# last post, otherwise once per HEARTBEAT_INTERVAL so the backend knows we're alive
+DEADBAND_PCT = float(os.environ.get("DEADBAND_PCT", "2.0"))
+HEARTBEAT_INTERVAL = float(os.environ.get("HEARTBEAT_INTERVAL", "600"))  # seconds
 
-# ----------------------------
-# GPIO SETUP
-# ----------------------------
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(TRIG_PIN, GPIO.OUT)
-GPIO.setup(ECHO_PIN, GPIO.IN)
+# Seconds between sensor readings; shortens while the bin is filling quickly
+READ_INTERVAL_MIN = float(os.environ.get("READ_INTERVAL_MIN", "2"))
+READ_INTERVAL_MAX = float(os.environ.get("READ_INTERVAL_MAX", "60"))
 
-GPIO.output(TRIG_PIN, GPIO.LOW)
-time.sleep(0.1)  # settle sensor
+# Store-and-forward queue: readings wait here until the backend acknowledges them
+OUTBOX_PATH = os.environ.get("OUTBOX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox.db"))
+OUTBOX_MAX_ROWS = int(os.environ.get("OUTBOX_MAX_ROWS", "100000"))  # ~1 month at 30s posts
+UPLOAD_MAX_BACKOFF = float(os.environ.get("UPLOAD_MAX_BACKOFF", "60"))  # seconds
 
 def clamp(x, lo, hi):
     return max(lo, min(hi, x))
 
-def distance_cm():
-    """
-    Trigger ultrasonic pulse and measure echo time.
-    Returns distance in cm, or None on timeout.
-    """
-    # Send 10us trigger pulse
-    GPIO.output(TRIG_PIN, GPIO.HIGH)
-    time.sleep(0.00001)
-    GPIO.output(TRIG_PIN, GPIO.LOW)
-
-    # Wait for echo to go HIGH (start)
-    start_wait = time.time()
-    while GPIO.input(ECHO_PIN) == 0:
-        if time.time() - start_wait > TIMEOUT_S:
-            return None
-    pulse_start = time.time()
-
-    # Wait for echo to go LOW (end)
-    end_wait = time.time()
-    while GPIO.input(ECHO_PIN) == 1:
-        if time.time() - end_wait > TIMEOUT_S:
-            return None
-    pulse_end = time.time()
-
-    pulse_duration = pulse_end - pulse_start  # seconds
-
-    # Distance: (time * speed_of_sound) / 2
-    d_cm = (pulse_duration * SPEED_OF_SOUND_CM_S) / 2.0
-
-    # Basic sanity filter (tweak if needed)
-    if d_cm <= 0 or d_cm > 400:  # many sensors are reliable up to ~400cm
-        return None
-
-    return d_cm
-
-def smoothed_distance_cm():
-    readings = []
-    for _ in range(SAMPLES):
-        d = distance_cm()
-        if d is not None:
-            readings.append(d)
-        time.sleep(SAMPLE_DELAY)
-
-    if not readings:
-        return None
-
-    return statistics.median(readings)
-
 def fill_percent_from_distance(d_cm):
     if d_cm is None:
         return None
     fill = (EMPTY_DISTANCE_CM - d_cm) / (EMPTY_DISTANCE_CM - FULL_DISTANCE_CM) * 100.0
     return clamp(fill, 0.0, 100.0)
 
-def send_to_backend(d_cm, fill_pct):
+def make_driver():
+    if SENSOR_DRIVER == "sim":
+        return SimulatedEchoDriver(SimulatedBin(EMPTY_DISTANCE_CM, FULL_DISTANCE_CM))
+    return GPIOEchoDriver(TRIG_PIN, ECHO_PIN)
+
+def send_to_backend(outbox, uploader, d_cm, fill_pct, confidence, ts):
+    """Queue a reading locally; the uploader thread delivers it when the backend is reachable."""
     payload = {
         "bin_id": BIN_ID,
         "distance_cm": d_cm,
         "fill_percent": fill_pct,
-        "ts": time.time(),
+        "confidence": confidence,
+        "ts": ts,
     }
-    try:
-        r = requests.post(BACKEND_URL, json=payload, timeout=3)
-        r.raise_for_status()
-        print(f"Sent: {payload}")
-    except Exception as e:
-        print(f"Send failed: {e}")
+    outbox.put(payload)
+    uploader.notify()
+    print(f"Queued: {payload}")
 
 def main():
-    print(f"Starting ultrasonic monitoring (RPi.GPIO)...")
-    print(f"Reading every {READ_INTERVAL}s, posting every {POST_INTERVAL}s")
-    last_post_time = 0  # Force initial post
+    print(f"Starting ultrasonic monitoring ({SENSOR_DRIVER} driver)...")
+    print(f"Reading every {READ_INTERVAL_MIN}-{READ_INTERVAL_MAX}s, posting on >{DEADBAND_PCT}% change "
+          f"or every {HEARTBEAT_INTERVAL}s")
+    reporter = AdaptiveReporter(DEADBAND_PCT, HEARTBEAT_INTERVAL, READ_INTERVAL_MIN, READ_INTERVAL_MAX)
+
+    outbox = Outbox(OUTBOX_PATH, max_rows=OUTBOX_MAX_ROWS)
+    uploader = Uploader(outbox, BATCH_URL, max_backoff=UPLOAD_MAX_BACKOFF)
+    uploader.start()
+    if len(outbox):
+        print(f"Resuming with {len(outbox)} queued readings")
+
+    driver = make_driver()
+    sampler = Sampler(driver, SAMPLES, SAMPLE_DELAY, interval=reporter.read_interval, estimator=FillEstimator())
+    sampler.start()
 
     try:
         while True:
-            d = smoothed_distance_cm()
+            # Blocks until the sampler thread finishes its next burst
+            ts, d, confidence = sampler.readings.get()
             fill = fill_percent_from_distance(d)
-            current_time = time.time()
 
             if d is None or fill is None:
                 print("No valid reading")
             else:
-                print(f"Distance: {d:6.1f} cm | Fill: {fill:5.1f}%")
-
-                # Only post if enough time has elapsed since last post
-                if SEND_HTTP and (current_time - last_post_time >= POST_INTERVAL):
-                    send_to_backend(d, fill)
-                    last_post_time = current_time
-
-            time.sleep(READ_INTERVAL)
+                # Monotonic so a clock sync after boot can't skip or force a heartbeat
+                send = reporter.observe(fill, time.monotonic())
+                print(f"Distance: {d:6.1f} cm | Fill: {fill:5.1f}% | Confidence: {confidence:.2f} "
+                      f"| next read in {reporter.read_interval:.0f}s")
+                if send and SEND_HTTP:
+                    send_to_backend(outbox, uploader, d, fill, confidence, ts)
+
+            sampler.interval = reporter.read_interval
     finally:
-        GPIO.cleanup()
+        sampler.stop()
+        uploader.stop()
+        sampler.join(timeout=2)
+        driver.close()
 
 if __name__ == "__main__":
     main()
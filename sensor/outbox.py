@@ -0,0 +1,139 @@
+"""
+Store-and-forward buffer for sensor readings.
+
+Readings are written to a local SQLite file first, so they survive reboots
+and network outages. A background thread drains the oldest readings to
+POST /telemetry/batch over one keep-alive session, backing off (bounded)
+while the backend is unreachable. The sampling loop only ever does a local
+insert and never waits on the network.
+"""
+import json
+import random
+import sqlite3
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Readings per POST; the backend accepts up to MAX_TELEMETRY_BATCH (1000)
+BATCH_SIZE = 500
+
+# Responses that mean the readings themselves are bad. Anything else (auth,
+# proxy, wrong URL, server errors) is retried with backoff and keeps the rows.
+REJECTED_STATUSES = (400, 413, 422)
+
+class Outbox:
+    """Persistent FIFO of reading payloads, oldest dropped beyond `max_rows`."""
+    def __init__(self, path: str, max_rows: int = 100_000):
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS readings ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+
+    def put(self, payload: dict):
+        with self._lock:
+            self._db.execute("INSERT INTO readings (payload) VALUES (?)", (json.dumps(payload),))
+            # Bound disk use during a long outage: the oldest readings go first
+            self._db.execute(
+                "DELETE FROM readings WHERE id <= (SELECT MAX(id) FROM readings) - ?", (self.max_rows,)
+            )
+
+    def peek(self, limit: int) -> list[tuple[int, dict]]:
+        with self._lock:
+            rows = self._db.execute("SELECT id, payload FROM readings ORDER BY id LIMIT ?", (limit,)).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def ack(self, ids: list[int]):
+        if not ids:
+            return
+        with self._lock:
+            self._db.executemany("DELETE FROM readings WHERE id = ?", [(i,) for i in ids])
+
+    def retry_later(self, ids: list[int], max_attempts: int):
+        """Count a failed attempt; readings that keep failing are dropped so they can't block the queue."""
+        if not ids:
+            return
+        with self._lock:
+            self._db.executemany("UPDATE readings SET attempts = attempts + 1 WHERE id = ?", [(i,) for i in ids])
+            self._db.execute("DELETE FROM readings WHERE attempts >= ?", (max_attempts,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class Uploader(threading.Thread):
+    """Drains an Outbox to the backend's batch endpoint."""
+    def __init__(self, outbox: Outbox, url: str, timeout: float = 5.0,
+                 max_backoff: float = 60.0, max_attempts: int = 5):
+        super().__init__(daemon=True, name="outbox-uploader")
+        self.outbox = outbox
+        self.url = url
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._backoff = 0.0
+
+    def notify(self):
+        """Wake the uploader after a new reading was queued."""
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                sent = self.drain_once()
+            except requests.RequestException as e:
+                self._back_off(f"Upload failed ({e})")
+                continue
+            if sent:
+                self._backoff = 0.0
+            elif len(self.outbox):
+                # Queue is not empty but nothing was delivered
+                self._back_off("Backend did not store readings")
+            else:
+                self._wake.wait()
+
+    def _back_off(self, reason: str):
+        self._backoff = min(self.max_backoff, max(1.0, self._backoff * 2))
+        print(f"{reason}; {len(self.outbox)} queued, retrying in ~{self._backoff:.0f}s")
+        # Jitter so a fleet coming back online doesn't reconnect in lockstep
+        self._stopping.wait(self._backoff * random.uniform(0.5, 1.0))
+
+    def drain_once(self) -> int:
+        """Send one batch; returns how many readings were delivered (0 if the queue was empty)."""
+        batch = self.outbox.peek(BATCH_SIZE)
+        if not batch:
+            return 0
+        r = self.session.post(self.url, json=[payload for _, payload in batch], timeout=self.timeout)
+        if r.status_code in REJECTED_STATUSES:
+            # The backend rejected the readings themselves; resending won't help
+            print(f"Backend rejected {len(batch)} readings ({r.status_code}): {r.text[:200]}")
+            self.outbox.retry_later([row_id for row_id, _ in batch], self.max_attempts)
+            return 0
+        r.raise_for_status()
+
+        failed = {res["index"] for res in r.json().get("results", []) if res.get("status") == "error"}
+        self.outbox.ack([row_id for i, (row_id, _) in enumerate(batch) if i not in failed])
+        self.outbox.retry_later([row_id for i, (row_id, _) in enumerate(batch) if i in failed], self.max_attempts)
+        print(f"Sent {len(batch) - len(failed)} readings ({len(failed)} failed)")
+        return len(batch) - len(failed)
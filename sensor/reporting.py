@@ -0,0 +1,46 @@
+"""
+Change-driven reporting for the sensor loop.
+
+A reading is sent when the fill level has moved by more than the deadband
+since the last sent reading, or when the heartbeat interval has passed
+without one. The read interval adapts to how fast the bin is filling: it
+aims to sample about twice per deadband's worth of change, so idle bins are
+read rarely and busy ones quickly.
+"""
+
+class AdaptiveReporter:
+    def __init__(self, deadband_pct: float, heartbeat_s: float,
+                 min_interval_s: float, max_interval_s: float, smoothing: float = 0.3):
+        self.deadband_pct = deadband_pct
+        self.heartbeat_s = heartbeat_s
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.smoothing = smoothing
+        self.rate = 0.0  # EWMA of |fill change| in %/s
+        self._last_fill = None
+        self._last_time = None
+        self._sent_fill = None
+        self._sent_time = None
+
+    def observe(self, fill: float, now: float) -> bool:
+        """Record a reading; True if it should be sent (and it is then counted as sent)."""
+        if self._last_time is not None and now > self._last_time:
+            inst = abs(fill - self._last_fill) / (now - self._last_time)
+            self.rate = self.smoothing * inst + (1 - self.smoothing) * self.rate
+        self._last_fill, self._last_time = fill, now
+
+        send = (
+            self._sent_time is None
+            or abs(fill - self._sent_fill) > self.deadband_pct
+            or now - self._sent_time >= self.heartbeat_s
+        )
+        if send:
+            self._sent_fill, self._sent_time = fill, now
+        return send
+
+    @property
+    def read_interval(self) -> float:
+        """Seconds until the next reading."""
+        if self.rate <= 0:
+            return self.max_interval_s
+        return max(self.min_interval_s, min(self.max_interval_s, self.deadband_pct / 2 / self.rate))
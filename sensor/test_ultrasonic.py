@@ -0,0 +1,76 @@
+"""
+Off-Pi tests for the sampling path: `python -m pytest sensor/test_ultrasonic.py`.
+(test.py is the hardware check for a wired HC-SR04.)
+"""
+import threading
+
+from estimator import FillEstimator
+from ultrasonic import GPIOEchoDriver, Sampler, SimulatedBin, SimulatedEchoDriver
+
+def run_sampler(driver, estimator=None, cycles: int = 3, **kwargs):
+    sampler = Sampler(driver, samples=5, sample_delay=0.005, interval=0.02, estimator=estimator, **kwargs)
+    sampler.start()
+    try:
+        return [sampler.readings.get(timeout=5) for _ in range(cycles)]
+    finally:
+        sampler.stop()
+        sampler.join(timeout=2)
+
+def test_sampler_median_tracks_simulated_bin():
+    model = SimulatedBin(empty_cm=60.0, full_cm=10.0, rate_pct_h=0.0, bags_per_h=0.0, seed=1)
+    expected = model.distance_cm(0.0)
+    readings = run_sampler(SimulatedEchoDriver(model, noise_cm=0.2, dropout=0.0))
+    for ts, d_cm, confidence in readings:
+        assert ts > 0
+        assert confidence is None
+        # The echo round trip is slept, so its width rounds down by at most a few microseconds
+        assert abs(d_cm - expected) < 1.0
+
+def test_sampler_with_estimator_reports_confidence():
+    model = SimulatedBin(rate_pct_h=0.0, bags_per_h=0.0, seed=2)
+    expected = model.distance_cm(0.0)
+    readings = run_sampler(SimulatedEchoDriver(model, noise_cm=0.5, dropout=0.0), FillEstimator())
+    _, d_cm, confidence = readings[-1]
+    assert abs(d_cm - expected) < 1.0
+    assert 0.0 < confidence <= 1.0
+
+def test_sampler_reports_missing_echoes():
+    model = SimulatedBin(seed=3)
+    readings = run_sampler(SimulatedEchoDriver(model, dropout=1.0), FillEstimator(), cycles=1, timeout_s=0.001)
+    assert readings[0][1:] == (None, 0.0)
+
+def test_sampler_burst_counts_dropouts_as_none():
+    model = SimulatedBin(seed=4)
+    sampler = Sampler(SimulatedEchoDriver(model, dropout=1.0), samples=4, sample_delay=0.0, timeout_s=0.001)
+    assert sampler.burst() == [None] * 4
+
+def edge_driver() -> GPIOEchoDriver:
+    """A GPIOEchoDriver with its edge state but no GPIO chip, for feeding _on_edge directly."""
+    driver = GPIOEchoDriver.__new__(GPIOEchoDriver)
+    driver._rise_ns = None
+    driver._width_ns = None
+    driver._done = threading.Event()
+    return driver
+
+def test_gpio_width_comes_from_edge_timestamps():
+    driver = edge_driver()
+    driver._on_edge(0, 24, 1, 1_000_000)
+    driver._on_edge(0, 24, 0, 3_500_000)
+    assert driver._done.is_set()
+    assert driver._width_ns == 2_500_000
+
+def test_gpio_ignores_fall_before_rise_and_later_edges():
+    driver = edge_driver()
+    driver._on_edge(0, 24, 0, 500_000)      # tail of a previous echo
+    assert not driver._done.is_set()
+    driver._on_edge(0, 24, 1, 1_000_000)
+    driver._on_edge(0, 24, 0, 2_000_000)
+    driver._on_edge(0, 24, 1, 2_100_000)    # a second echo after the measured one
+    driver._on_edge(0, 24, 0, 9_000_000)
+    assert driver._width_ns == 1_000_000
+
+def test_gpio_ignores_watchdog_alerts():
+    driver = edge_driver()
+    driver._on_edge(0, 24, 1, 1_000_000)
+    driver._on_edge(0, 24, 2, 5_000_000)    # lgpio watchdog timeout, not an edge
+    assert not driver._done.is_set()
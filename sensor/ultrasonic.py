@@ -0,0 +1,199 @@
+"""
+Ultrasonic (HC-SR04) sampling.
+
+Drivers implement one call, `ping(timeout_s)`, which fires the sensor and
+returns the echo pulse width in nanoseconds (None on timeout):
+
+- GPIOEchoDriver takes the echo's rising and falling edges from lgpio
+  alerts, which carry the level and the kernel's timestamp of each edge, so
+  no core is burned polling the pin and a late callback thread doesn't
+  stretch or shrink the pulse.
+- SimulatedEchoDriver produces echoes from a SimulatedBin fill model, so the
+  agent runs and can be tested off-Pi.
+
+Sampler runs bursts on its own thread, reduces each to one estimate (an
+estimator.FillEstimator, or the burst median), and hands finished readings to
+the main loop through a queue, so sampling overlaps network I/O.
+"""
+import queue
+import random
+import statistics
+import threading
+import time
+from typing import Optional
+
+SPEED_OF_SOUND_CM_S = 34300.0  # cm/s at ~20°C
+MAX_RANGE_CM = 400.0           # many sensors are reliable up to ~400cm
+TIMEOUT_S = 0.06               # trigger-to-falling-edge; ~30ms covers up to ~5m round trip
+
+def pulse_to_cm(width_ns: Optional[int]) -> Optional[float]:
+    """Distance for an echo pulse width, or None if missing or out of range."""
+    if width_ns is None:
+        return None
+    # Distance: (time * speed_of_sound) / 2
+    d_cm = width_ns * 1e-9 * SPEED_OF_SOUND_CM_S / 2.0
+    if d_cm <= 0 or d_cm > MAX_RANGE_CM:
+        return None
+    return d_cm
+
+class GPIOEchoDriver:
+    """HC-SR04 on a Raspberry Pi. Use a voltage divider/level shifter if echo is 5V."""
+    def __init__(self, trig_pin: int, echo_pin: int, chip: int = 0):
+        import lgpio  # only importable on a Pi
+        self.lgpio = lgpio
+        self.trig_pin = trig_pin
+        self.echo_pin = echo_pin
+        self._rise_ns: Optional[int] = None
+        self._width_ns: Optional[int] = None
+        self._done = threading.Event()
+
+        self._handle = lgpio.gpiochip_open(chip)
+        lgpio.gpio_claim_output(self._handle, trig_pin, 0)
+        lgpio.gpio_claim_alert(self._handle, echo_pin, lgpio.BOTH_EDGES)
+        time.sleep(0.1)  # settle sensor
+        self._callback = lgpio.callback(self._handle, echo_pin, lgpio.BOTH_EDGES, self._on_edge)
+
+    def _on_edge(self, chip, gpio, level, timestamp_ns):
+        # level and timestamp describe the edge itself, not when this thread got to it
+        if level == 1:
+            if self._width_ns is None:
+                self._rise_ns = timestamp_ns
+        elif level == 0 and self._rise_ns is not None and self._width_ns is None:
+            # A fall before any rise is the tail of an earlier echo; skip it
+            self._width_ns = timestamp_ns - self._rise_ns
+            self._done.set()
+
+    def ping(self, timeout_s: float = TIMEOUT_S) -> Optional[int]:
+        self._rise_ns = None
+        self._width_ns = None
+        self._done.clear()
+        # Send 10us trigger pulse
+        self.lgpio.gpio_write(self._handle, self.trig_pin, 1)
+        time.sleep(0.00001)
+        self.lgpio.gpio_write(self._handle, self.trig_pin, 0)
+        if not self._done.wait(timeout_s):
+            return None
+        return self._width_ns
+
+    def close(self):
+        self._callback.cancel()
+        self.lgpio.gpiochip_close(self._handle)
+
+class SimulatedBin:
+    """
+    Fill model for off-Pi runs: fills steadily at `rate_pct_h` with occasional
+    bursts (a bag dropped in), and is emptied once it gets close to full.
+    """
+    def __init__(self, empty_cm: float = 60.0, full_cm: float = 10.0,
+                 rate_pct_h: Optional[float] = None, bags_per_h: float = 0.5, seed: Optional[int] = None,
+                 rng: Optional[random.Random] = None):
+        # Pass a shared rng when simulating many bins (each Random holds ~2.5KB of state)
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.empty_cm = empty_cm
+        self.full_cm = full_cm
+        self.rate_pct_h = rate_pct_h if rate_pct_h is not None else self.rng.uniform(1.0, 10.0)
+        self.bags_per_h = bags_per_h
+        self.fill = self.rng.uniform(0.0, 30.0)
+        self._t: Optional[float] = None
+
+    def advance(self, now: float) -> float:
+        """Fill percent at `now` (seconds on any monotonic clock)."""
+        if self._t is not None and now > self._t:
+            dt = now - self._t
+            self.fill += self.rate_pct_h * dt / 3600.0
+            if self.rng.random() < self.bags_per_h * dt / 3600.0:
+                self.fill += self.rng.uniform(2.0, 8.0)
+            if self.fill >= 95.0:
+                self.fill = self.rng.uniform(0.0, 5.0)
+        self._t = now
+        self.fill = min(self.fill, 100.0)
+        return self.fill
+
+    def distance_cm(self, now: float) -> float:
+        return self.empty_cm - self.advance(now) / 100.0 * (self.empty_cm - self.full_cm)
+
+class SimulatedEchoDriver:
+    """Echoes for a SimulatedBin, with sensor noise and occasional missed echoes."""
+    def __init__(self, model: SimulatedBin, noise_cm: float = 0.5, dropout: float = 0.02):
+        self.model = model
+        self.noise_cm = noise_cm
+        self.dropout = dropout
+
+    def ping(self, timeout_s: float = TIMEOUT_S) -> Optional[int]:
+        if self.model.rng.random() < self.dropout:
+            time.sleep(timeout_s)
+            return None
+        d_cm = self.model.distance_cm(time.monotonic()) + self.model.rng.gauss(0.0, self.noise_cm)
+        width_s = 2.0 * d_cm / SPEED_OF_SOUND_CM_S
+        time.sleep(width_s)
+        return int(width_s * 1e9)
+
+    def close(self):
+        pass
+
+class Sampler(threading.Thread):
+    """
+    Takes a burst of `samples` pings every `interval` seconds and queues
+    (wall-clock ts, distance cm or None, confidence or None). `interval` may
+    be changed while running.
+    """
+    def __init__(self, driver, samples: int = 7, sample_delay: float = 0.08,
+                 timeout_s: float = TIMEOUT_S, interval: float = 5.0, estimator=None):
+        super().__init__(daemon=True, name="ultrasonic-sampler")
+        self.driver = driver
+        self.estimator = estimator
+        self.samples = samples
+        self.sample_delay = sample_delay
+        self.timeout_s = timeout_s
+        self._interval = interval
+        self.readings: queue.Queue = queue.Queue(maxsize=16)
+        self._stopping = threading.Event()
+        self._retime = threading.Event()
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    @interval.setter
+    def interval(self, seconds: float):
+        # Applies to the wait already in progress, measured from the last burst's start
+        self._interval = seconds
+        self._retime.set()
+
+    def burst(self) -> list[Optional[float]]:
+        """One cycle's distances, None for missed echoes."""
+        readings = []
+        for _ in range(self.samples):
+            readings.append(pulse_to_cm(self.driver.ping(self.timeout_s)))
+            # Let the previous echo die out before the next ping
+            if self._stopping.wait(self.sample_delay):
+                break
+        return readings
+
+    def estimate(self, readings: list[Optional[float]]) -> tuple[Optional[float], Optional[float]]:
+        if self.estimator is not None:
+            return self.estimator.update(readings, time.monotonic())
+        valid = [d for d in readings if d is not None]
+        return (statistics.median(valid) if valid else None), None
+
+    def run(self):
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            ts = time.time()
+            reading = (ts, *self.estimate(self.burst()))
+            try:
+                self.readings.put_nowait(reading)
+            except queue.Full:
+                # Consumer is behind; keep the newest readings
+                self.readings.get_nowait()
+                self.readings.put_nowait(reading)
+            while not self._stopping.is_set():
+                remaining = started + self._interval - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._retime.wait(remaining)
+                self._retime.clear()
+
+    def stop(self):
+        self._stopping.set()
+        self._retime.set()